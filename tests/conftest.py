@@ -0,0 +1,32 @@
+import json
+import os
+
+import pytest
+
+from user_behavior_simulator.simulator import UserBehaviorSimulator
+
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), '..', 'user_behavior_simulator', 'default-config.json')
+
+
+@pytest.fixture
+def make_simulator(tmp_path):
+    def factory(**overrides):
+        with open(DEFAULT_CONFIG) as f:
+            config = json.load(f)
+        config['save_paths'] = {name: str(tmp_path) for name in config.get('save_paths', {})}
+        config.update(overrides)
+
+        config_file = tmp_path / 'config.json'
+        config_file.write_text(json.dumps(config))
+        return UserBehaviorSimulator(str(config_file))
+
+    return factory
+
+
+@pytest.fixture
+def smtp_sink():
+    server = UserBehaviorSimulator.start_smtp_sink('127.0.0.1', 0)
+    yield server
+    server.shutdown()
+    server.server_close()
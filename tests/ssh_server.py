@@ -0,0 +1,131 @@
+import os
+import socket
+import threading
+import time
+
+import paramiko
+
+
+class StandInServer(paramiko.ServerInterface):
+    def __init__(self, stats):
+        self.stats = stats
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.run_command, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    def run_command(self, channel, command):
+        # Commands: "echo <text>", "sleep <seconds>", "big <stdout bytes> <stderr bytes>", "exit <status>".
+        # Give the transport time to acknowledge the exec request before any output or close.
+        time.sleep(0.05)
+        with self.stats['lock']:
+            self.stats['channels'] += 1
+            self.stats['running'] += 1
+            self.stats['max_running'] = max(self.stats['max_running'], self.stats['running'])
+        name, _, argument = command.partition(' ')
+        status = 0
+        try:
+            if name == 'echo':
+                channel.sendall(argument.encode() + b'\n')
+            elif name == 'sleep':
+                time.sleep(float(argument))
+            elif name == 'big':
+                stdout_bytes, stderr_bytes = (int(value) for value in argument.split())
+                channel.sendall(b'o' * stdout_bytes)
+                channel.sendall_stderr(b'e' * stderr_bytes)
+            elif name == 'exit':
+                status = int(argument)
+            channel.send_exit_status(status)
+            channel.shutdown_write()
+            channel.close()
+        except (OSError, EOFError):
+            pass
+        finally:
+            with self.stats['lock']:
+                self.stats['running'] -= 1
+
+
+class StandInHandle(paramiko.SFTPHandle):
+    def stat(self):
+        f = getattr(self, 'readfile', None) or self.writefile
+        return paramiko.SFTPAttributes.from_stat(os.fstat(f.fileno()))
+
+
+def make_sftp_interface(root):
+    class StandInSFTP(paramiko.SFTPServerInterface):
+        def local_path(self, path):
+            return os.path.join(root, os.path.basename(path))
+
+        def canonicalize(self, path):
+            return '/' + path.lstrip('./')
+
+        def list_folder(self, path):
+            entries = []
+            for name in os.listdir(root):
+                attr = paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(root, name)))
+                attr.filename = name
+                entries.append(attr)
+            return entries
+
+        def stat(self, path):
+            return paramiko.SFTPAttributes.from_stat(os.stat(self.local_path(path)))
+
+        lstat = stat
+
+        def open(self, path, flags, attr):
+            handle = StandInHandle(flags)
+            if flags & (os.O_WRONLY | os.O_RDWR):
+                handle.writefile = open(self.local_path(path), 'wb')
+            else:
+                handle.readfile = open(self.local_path(path), 'rb')
+            return handle
+
+    return StandInSFTP
+
+
+HOST_KEY = paramiko.RSAKey.generate(2048)
+
+
+class StandInSSHServer:
+    """Loopback SSH server with exec channels and an SFTP subsystem rooted at ``root``."""
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.stats = {'lock': threading.Lock(), 'transports': 0, 'channels': 0, 'running': 0, 'max_running': 0}
+        self.transports = []
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(client)
+            transport.add_server_key(HOST_KEY)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, make_sftp_interface(self.root))
+            transport.start_server(server=StandInServer(self.stats))
+            with self.stats['lock']:
+                self.stats['transports'] += 1
+            self.transports.append(transport)
+
+    def server_config(self, username='u'):
+        return {'host': '127.0.0.1', 'port': self.port, 'username': username, 'password': 'p'}
+
+    def close(self):
+        self.listener.close()
+        for transport in self.transports:
+            transport.close()
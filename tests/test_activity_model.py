@@ -0,0 +1,86 @@
+import random
+from collections import Counter
+
+import pytest
+
+from user_behavior_simulator.simulator import ActivityModel, AliasTable
+
+
+def test_alias_table_matches_weights():
+    table = AliasTable(['a', 'b', 'c'], [1, 3, 6])
+    rng = random.Random(7)
+    counts = Counter(table.sample(rng) for _ in range(60000))
+
+    assert counts['a'] / 60000 == pytest.approx(0.1, abs=0.01)
+    assert counts['b'] / 60000 == pytest.approx(0.3, abs=0.01)
+    assert counts['c'] / 60000 == pytest.approx(0.6, abs=0.01)
+
+
+def test_alias_table_never_returns_zero_weight_items():
+    table = AliasTable(['a', 'b', 'c'], [0, 1, 0])
+    rng = random.Random(1)
+    assert {table.sample(rng) for _ in range(1000)} == {'b'}
+
+
+def test_alias_table_rejects_empty_weights():
+    with pytest.raises(ValueError):
+        AliasTable(['a', 'b'], [0, 0])
+    with pytest.raises(ValueError):
+        AliasTable([], [])
+
+
+def test_transition_rows_override_base_weights():
+    model = ActivityModel(['browse', 'email', 'files'], weights={'browse': 1, 'email': 1, 'files': 1},
+                          transitions={'email': {'email': 0, 'files': 0}, 'unknown': {'browse': 5}})
+    rng = random.Random(3)
+
+    assert {model.next_task('email', rng) for _ in range(500)} == {'browse'}
+    assert {model.next_task('browse', rng) for _ in range(500)} == {'browse', 'email', 'files'}
+    assert 'unknown' not in model.transitions
+
+
+def test_all_zero_weights_fall_back_to_uniform():
+    model = ActivityModel(['a', 'b'], weights={'a': 0, 'b': 0})
+    assert model.base == [1.0, 1.0]
+
+
+def test_stationary_mix_of_a_two_state_chain():
+    model = ActivityModel(['a', 'b'], transitions={'a': {'a': 9, 'b': 1}, 'b': {'a': 1, 'b': 1}})
+    mix = model.stationary_mix()
+
+    assert mix['a'] == pytest.approx(5 / 6, abs=1e-6)
+    assert mix['b'] == pytest.approx(1 / 6, abs=1e-6)
+
+
+def test_dwell_distributions():
+    rng = random.Random(5)
+    model = ActivityModel(['a', 'b', 'c'], dwell={
+        'a': {'distribution': 'fixed', 'seconds': 12},
+        'b': {'distribution': 'exponential', 'mean_seconds': 1000, 'max_seconds': 50},
+        'default': {'distribution': 'uniform', 'min_seconds': 10, 'max_seconds': 20}
+    })
+
+    assert model.sample_dwell('a', rng) == 12
+    assert all(0 <= model.sample_dwell('b', rng) <= 50 for _ in range(200))
+    assert all(10 <= model.sample_dwell('c', rng) <= 20 for _ in range(200))
+    assert ActivityModel(['a']).sample_dwell('a', rng) is None
+
+
+def test_run_task_counts_errors_but_lets_interrupts_through(make_simulator, monkeypatch):
+    simulator = make_simulator()
+
+    def failing():
+        raise ValueError("boom")
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(simulator, 'get_task_methods', lambda: {'fail': failing, 'stop': interrupted})
+
+    simulator.run_task('fail')
+    assert simulator.metrics.snapshot()['task_errors'] == 1
+
+    with pytest.raises(KeyboardInterrupt):
+        simulator.run_task('stop')
+    assert simulator.metrics.snapshot()['task_errors'] == 1
+    assert not simulator.current_tasks
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="desktop entry discovery is Linux-only")
+
+
+def write_executable(path, mode=0o755):
+    path.write_text('#!/bin/sh\n')
+    path.chmod(mode)
+    return path
+
+
+def write_desktop_entry(directory, name, **fields):
+    fields = {'Type': 'Application', **fields}
+    lines = ['[Desktop Entry]'] + [f'{key}={value}' for key, value in fields.items()]
+    (directory / f'{name}.desktop').write_text('\n'.join(lines) + '\n')
+
+
+@pytest.fixture
+def app_dirs(tmp_path, monkeypatch):
+    bin_first, bin_second, data_home = tmp_path / 'bin1', tmp_path / 'bin2', tmp_path / 'share'
+    for directory in (bin_first, bin_second, data_home / 'applications'):
+        directory.mkdir(parents=True)
+
+    monkeypatch.setenv('PATH', os.pathsep.join([str(bin_first), str(tmp_path / 'missing'), str(bin_second)]))
+    monkeypatch.setenv('XDG_DATA_HOME', str(data_home))
+    monkeypatch.setenv('XDG_DATA_DIRS', str(tmp_path / 'no-share'))
+    return bin_first, bin_second, data_home / 'applications'
+
+
+def test_path_index_keeps_the_first_executable_on_path(make_simulator, app_dirs):
+    bin_first, bin_second, _ = app_dirs
+    first = write_executable(bin_first / 'nano')
+    write_executable(bin_second / 'nano')
+    write_executable(bin_second / 'gedit')
+    write_executable(bin_second / 'notes.txt', mode=0o644)
+    (bin_second / 'subdir').mkdir()
+
+    index = make_simulator().build_path_index()
+
+    assert index == {'nano': str(first), 'gedit': str(bin_second / 'gedit')}
+
+
+def test_desktop_entry_parser_reads_only_the_main_group(make_simulator, tmp_path):
+    path = tmp_path / 'editor.desktop'
+    path.write_text("# comment\n[Desktop Entry]\nName=Editor\nName[de]=Bearbeiter\nExec=editor %F\n"
+                    "Exec=ignored\nTerminal=true\n\n[Desktop Action new]\nExec=editor --new\n")
+
+    entry = make_simulator().parse_desktop_entry(str(path))
+
+    assert entry == {'Name': 'Editor', 'Exec': 'editor %F', 'Terminal': 'true'}
+
+
+def test_linux_discovery_filters_desktop_entries(make_simulator, app_dirs):
+    bin_first, _, applications = app_dirs
+    write_executable(bin_first / 'editor')
+    write_desktop_entry(applications, 'editor', Name='Editor', Exec='editor', TryExec='editor', Categories='Utility;')
+    write_desktop_entry(applications, 'console', Exec='console', Terminal='true')
+    write_desktop_entry(applications, 'helper', Exec='helper', NoDisplay='true')
+    write_desktop_entry(applications, 'removed', Exec='removed', Hidden='true')
+    write_desktop_entry(applications, 'missing', Exec='missing', TryExec='missing')
+    write_desktop_entry(applications, 'absolute', Exec='absolute', TryExec=str(bin_first / 'editor'))
+    write_desktop_entry(applications, 'link', Exec='link', Type='Link')
+
+    apps = {app['name']: app for app in make_simulator().discover_linux_apps() if app['type'] == 'desktop'}
+
+    assert sorted(apps) == ['absolute', 'console', 'editor']
+    assert apps['editor']['display_name'] == 'Editor'
+    assert apps['editor']['categories'] == ['Utility']
+    assert apps['console']['terminal'] is True
+    assert apps['editor']['terminal'] is False
+
+
+def test_catalog_is_reused_until_a_source_directory_changes(make_simulator, app_dirs, monkeypatch):
+    _, bin_second, applications = app_dirs
+    write_desktop_entry(applications, 'editor', Exec='editor')
+    simulator = make_simulator()
+
+    first = simulator.discover_system_applications()
+    assert os.path.exists(simulator.get_app_catalog_path())
+
+    reloaded = make_simulator()
+    monkeypatch.setattr(reloaded, 'discover_linux_apps', lambda: pytest.fail("catalog should be loaded from disk"))
+    assert reloaded.discover_system_applications() == first
+
+    write_desktop_entry(applications, 'viewer', Exec='viewer')
+    mtime = os.stat(applications).st_mtime + 10
+    os.utime(applications, (mtime, mtime))
+
+    rebuilt = make_simulator()
+    names = [app['name'] for app in rebuilt.discover_system_applications()]
+    assert 'viewer' in names
+    assert rebuilt.load_app_catalog(rebuilt.get_discovery_sources()) == rebuilt.app_catalog[1]
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+resource = pytest.importorskip('resource')
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="rlimits are applied on Linux only")
+
+
+def test_limits_are_applied_to_the_launched_process(make_simulator):
+    simulator = make_simulator(app_execution={
+        'resource_limits': {
+            'enabled': True,
+            'use_cgroups': False,
+            'app': {'cpu_seconds': 30, 'memory_mb': 512, 'nice': 5}
+        }
+    })
+
+    process = simulator.launch_linux_app({'type': 'executable', 'path': ['sleep', '5'], 'name': 'sleep'})
+    try:
+        assert process is not None
+        assert resource.prlimit(process.pid, resource.RLIMIT_CPU) == (30, 35)
+        assert resource.prlimit(process.pid, resource.RLIMIT_AS)[0] == 512 * 1024 * 1024
+        assert os.getpriority(os.PRIO_PROCESS, process.pid) == os.getpriority(os.PRIO_PROCESS, 0) + 5
+        assert os.getsid(process.pid) == process.pid
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_no_limits_when_disabled(make_simulator):
+    simulator = make_simulator()
+    process = subprocess.Popen(['sleep', '5'])
+    try:
+        before = resource.prlimit(process.pid, resource.RLIMIT_CPU)
+        simulator.apply_app_limits(process, {'type': 'executable', 'name': 'sleep'})
+        assert resource.prlimit(process.pid, resource.RLIMIT_CPU) == before
+    finally:
+        process.kill()
+        process.wait()
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def streaming_simulator(make_simulator, tmp_path, smtp_sink):
+    def factory(max_cache_mb):
+        simulator = make_simulator(smtp_config={
+            'enabled': True,
+            'provider': 'sink',
+            'sink': {'server': '127.0.0.1', 'port': smtp_sink.server_address[1],
+                     'username': 'sender@example.com', 'use_tls': False},
+            'recipients': ['recipient@example.com'],
+            'attachment_cache': {'max_cache_mb': max_cache_mb, 'stream_threshold_kb': 1024,
+                                 'cache_dir': str(tmp_path / 'cache')},
+            'attachments_per_email': [0, 0],
+        })
+        return simulator
+
+    return factory
+
+
+def write_file(path, size):
+    with open(path, 'wb') as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+
+def build_message(simulator, *filepaths):
+    provider, server_config = simulator.get_smtp_server_config()
+    msg, _ = simulator.build_smtp_message(server_config, 'recipient@example.com', 'body', 'subject',
+                                          candidates=([], []), attachments_count=0)
+    for filepath in filepaths:
+        simulator.attach_file_to_email(msg, filepath)
+    return provider, server_config, msg
+
+
+def stream_paths(msg):
+    return [part.stream_path for part in msg.walk() if getattr(part, 'stream_path', None)]
+
+
+def test_evicted_stream_survives_until_pending_message_is_sent(streaming_simulator, tmp_path, smtp_sink):
+    simulator = streaming_simulator(max_cache_mb=6)
+    first = write_file(tmp_path / 'first.bin', 3 * 1024 * 1024)
+    second = write_file(tmp_path / 'second.bin', 3 * 1024 * 1024)
+
+    provider, server_config, msg = build_message(simulator, first, second)
+    first_stream, second_stream = stream_paths(msg)
+
+    assert first_stream in simulator.attachment_streams_evicted
+    assert os.path.exists(first_stream)
+
+    simulator.deliver_smtp_message(provider, server_config, msg)
+    simulator.close_smtp_sessions()
+
+    assert smtp_sink.counters['messages'] == 1
+    assert smtp_sink.counters['bytes'] > 8 * 1024 * 1024
+    assert not os.path.exists(first_stream)
+    assert os.path.exists(second_stream)
+    assert simulator.attachment_stream_refs == {}
+
+
+def test_attachment_larger_than_cache_is_kept_while_in_use(streaming_simulator, tmp_path, smtp_sink):
+    simulator = streaming_simulator(max_cache_mb=1)
+    large = write_file(tmp_path / 'large.bin', 2 * 1024 * 1024)
+
+    provider, server_config, msg = build_message(simulator, large)
+    other_provider, other_config, other_msg = build_message(simulator, large)
+    (stream_path,) = stream_paths(msg)
+
+    assert os.path.exists(stream_path)
+    assert simulator.attachment_stream_refs[stream_path] == 2
+
+    simulator.deliver_smtp_message(provider, server_config, msg)
+    simulator.deliver_smtp_message(other_provider, other_config, other_msg)
+    simulator.close_smtp_sessions()
+
+    assert smtp_sink.counters['messages'] == 2
+    assert os.path.exists(stream_path)
+    assert simulator.attachment_stream_refs == {}
+
+
+def test_failed_delivery_still_releases_attachments(streaming_simulator, tmp_path):
+    simulator = streaming_simulator(max_cache_mb=6)
+    first = write_file(tmp_path / 'first.bin', 3 * 1024 * 1024)
+    second = write_file(tmp_path / 'second.bin', 3 * 1024 * 1024)
+
+    provider, server_config, msg = build_message(simulator, first, second)
+    first_stream = stream_paths(msg)[0]
+    server_config = dict(server_config, port=1)
+
+    with pytest.raises(OSError):
+        simulator.deliver_smtp_message(provider, server_config, msg)
+
+    assert simulator.attachment_stream_refs == {}
+    assert not os.path.exists(first_stream)
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from user_behavior_simulator import simulator as simulator_module
+
+
+@pytest.fixture
+def background(make_simulator, monkeypatch):
+    simulator = make_simulator(concurrency={'enabled': True, 'max_workers': 4, 'max_background_per_persona': 2,
+                                            'background_tasks': ['download_media']})
+    release = threading.Event()
+    started = []
+    foreground = []
+
+    def download_media():
+        started.append(threading.current_thread().name)
+        if threading.current_thread() is threading.main_thread():
+            foreground.append(True)
+            return
+        release.wait(5)
+
+    monkeypatch.setattr(simulator, 'get_task_methods', lambda: {'download_media': download_media,
+                                                                'browse_websites': lambda: None})
+    simulator.is_running = True
+    yield simulator, release, foreground
+    release.set()
+    simulator.is_running = False
+    simulator.stop()
+
+
+def wait_for_idle(simulator):
+    simulator.background_pool.shutdown(wait=True)
+    simulator.background_pool = None
+
+
+def test_background_slots_are_limited_per_persona(background):
+    simulator, release, _ = background
+
+    assert simulator.submit_background_task('download_media')
+    assert simulator.submit_background_task('download_media')
+    assert not simulator.submit_background_task('download_media')
+    assert simulator.get_background_status() == {'default': ['download_media', 'download_media']}
+
+    assert simulator.run_as_persona('other', simulator.submit_background_task, 'download_media')
+    assert simulator.get_background_status()['other'] == ['download_media']
+
+    release.set()
+    wait_for_idle(simulator)
+    assert simulator.get_background_status() == {}
+    assert simulator.submit_background_task('download_media')
+
+
+def test_only_listed_tasks_run_in_the_background(background):
+    simulator, _, _ = background
+    assert not simulator.submit_background_task('browse_websites')
+    simulator.config['concurrency']['enabled'] = False
+    assert not simulator.submit_background_task('download_media')
+
+
+def test_dispatch_falls_back_to_the_foreground_when_slots_are_full(background, monkeypatch):
+    simulator, release, foreground = background
+    monkeypatch.setattr(simulator_module.time, 'sleep', lambda seconds: None)
+
+    simulator.dispatch_task('download_media', 0)
+    simulator.dispatch_task('download_media', 0)
+    assert foreground == []
+
+    simulator.dispatch_task('download_media', 0)
+    assert foreground == [True]
+
+
+def test_rejected_submit_releases_the_slot(background, monkeypatch):
+    simulator, _, _ = background
+
+    class ClosedPool:
+        def submit(self, fn):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    monkeypatch.setattr(simulator, 'get_background_pool', lambda: ClosedPool())
+    for _ in range(3):
+        assert not simulator.submit_background_task('download_media')
+    assert simulator.get_background_status() == {}
+    assert simulator.persona_semaphores['default'].acquire(blocking=False)
+    assert simulator.persona_semaphores['default'].acquire(blocking=False)
+
+
+def test_foreground_wait_after_a_background_submit_uses_the_think_multiplier(background, monkeypatch):
+    simulator, _, _ = background
+    sleeps = []
+    monkeypatch.setattr(simulator_module.time, 'sleep', sleeps.append)
+    simulator.think_multipliers['download_media'] = 0.25
+
+    simulator.dispatch_task('download_media', 40)
+
+    assert sleeps == [10]
+    assert getattr(simulator.persona_context, 'task', None) is None
@@ -0,0 +1,134 @@
+import re
+import time
+from datetime import datetime
+
+import pytest
+
+from user_behavior_simulator import simulator as simulator_module
+
+
+@pytest.fixture
+def make_checkpointed(make_simulator, tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state' / 'simulator_state.db')
+
+    def factory(**overrides):
+        overrides.setdefault('checkpoint', {'enabled': True, 'path': state_path, 'resume_window_hours': 12,
+                                            'catch_up_minutes': 60})
+        simulator = make_simulator(**overrides)
+        monkeypatch.setattr(simulator, 'wait_for_active_hours', lambda: None)
+        monkeypatch.setattr(simulator, 'is_within_active_hours', lambda: True)
+        simulator.is_running = True
+        return simulator
+
+    return factory
+
+
+def stop_after_first_task(simulator, monkeypatch):
+    def dispatch(task_name, dwell_seconds=None):
+        simulator.is_running = False
+
+    monkeypatch.setattr(simulator, 'dispatch_task', dispatch)
+
+
+def test_random_cycle_resumes_mid_session(make_checkpointed, monkeypatch, capsys):
+    first = make_checkpointed(session_duration_minutes=[500, 500])
+    stop_after_first_task(first, monkeypatch)
+    first.random_behavior_cycle()
+    saved = first.load_state('random_cycle')
+    assert saved['session'] == 0 and saved['phase'] == 'session'
+    assert saved['until'] == pytest.approx(time.time() + 500 * 60, abs=5)
+    capsys.readouterr()
+
+    second = make_checkpointed(session_duration_minutes=[5, 5])
+    stop_after_first_task(second, monkeypatch)
+    second.random_behavior_cycle()
+
+    output = capsys.readouterr().out
+    assert "Resuming random cycle at session 1/" in output
+    minutes = int(re.search(r"Starting session 1/\d+ for (\d+) minutes", output).group(1))
+    assert minutes >= 498
+    assert second.load_state('random_cycle') == saved
+
+
+def test_random_cycle_resumes_mid_break(make_checkpointed, monkeypatch):
+    first = make_checkpointed(session_duration_minutes=[0, 0], daily_sessions=3)
+    slept = []
+
+    def sleep_until(timestamp, simulator):
+        slept.append(timestamp)
+        simulator.is_running = False
+
+    monkeypatch.setattr(first, 'sleep_until', lambda timestamp: sleep_until(timestamp, first))
+    first.random_behavior_cycle()
+    saved = first.load_state('random_cycle')
+    assert saved['phase'] == 'break' and saved['session'] == 0
+    assert slept == [saved['until']]
+
+    second = make_checkpointed(session_duration_minutes=[0, 0], daily_sessions=3)
+    monkeypatch.setattr(second, 'sleep_until', lambda timestamp: sleep_until(timestamp, second))
+    second.random_behavior_cycle()
+    assert slept == [saved['until'], saved['until']]
+
+
+def test_stale_cycle_is_not_resumed(make_checkpointed, monkeypatch, capsys):
+    simulator = make_checkpointed()
+    simulator.save_state('random_cycle', {'session': 2, 'daily_sessions': 3, 'phase': 'break',
+                                          'until': time.time() - 13 * 3600})
+    stop_after_first_task(simulator, monkeypatch)
+    simulator.random_behavior_cycle()
+
+    assert "Resuming" not in capsys.readouterr().out
+    assert simulator.load_state('random_cycle')['session'] == 0
+
+
+class FixedDateTime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 3, 5, 12, 0, 0)
+
+
+def test_scheduled_task_missed_within_the_window_is_caught_up(make_checkpointed, monkeypatch):
+    monkeypatch.setattr(simulator_module, 'datetime', FixedDateTime)
+    tasks = [
+        {'time': '11:30', 'task': 'browse_websites', 'enabled': True},
+        {'time': '09:00', 'task': 'send_smtp_email', 'enabled': True},
+        {'time': '11:45', 'task': 'ftp_operations', 'enabled': True},
+        {'time': '12:30', 'task': 'ssh_operations', 'enabled': True},
+        {'time': '11:50', 'task': 'imap_operations', 'enabled': False}
+    ]
+    first = make_checkpointed(scheduled_tasks={'enabled': True, 'tasks': tasks})
+    first.save_state('scheduled_runs', {'11:45 ftp_operations': '2024-03-05'})
+
+    second = make_checkpointed(scheduled_tasks={'enabled': True, 'tasks': tasks})
+    ran = []
+    monkeypatch.setattr(second, 'execute_task_by_name', ran.append)
+    monkeypatch.setattr(second, 'get_next_scheduled_task', lambda: None)
+    monkeypatch.setattr(simulator_module.time, 'sleep', lambda seconds: setattr(second, 'is_running', False))
+    second.scheduled_behavior_cycle()
+
+    assert ran == ['browse_websites']
+    runs = second.load_state('scheduled_runs')
+    assert runs == {'11:45 ftp_operations': '2024-03-05', '11:30 browse_websites': '2024-03-05'}
+    assert make_checkpointed(scheduled_tasks={'enabled': True, 'tasks': tasks}).get_missed_scheduled_tasks(runs) == []
+
+
+def test_counters_and_visited_urls_survive_restarts_without_double_counting(make_checkpointed):
+    first = make_checkpointed()
+    first.record_metric('http_requests', 3)
+    first.record_metric('emails_sent')
+    with first.visited_urls_lock:
+        first.visited_urls.append([time.time(), 'default', 'https://example.com/a'])
+    first.checkpoint_state()
+
+    second = make_checkpointed()
+    second.restore_state()
+    second.record_metric('http_requests')
+    with second.visited_urls_lock:
+        second.visited_urls.append([time.time(), 'default', 'https://example.com/b'])
+    second.checkpoint_state()
+    second.checkpoint_state()
+
+    third = make_checkpointed()
+    third.restore_state()
+    assert third.metrics.snapshot() == {'http_requests': 4, 'emails_sent': 1}
+    assert [entry[2] for entry in third.visited_urls] == ['https://example.com/a', 'https://example.com/b']
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+
+DAY = date(2024, 3, 5)
+
+
+def planner(**overrides):
+    config = {'enabled': True, 'seed': 42}
+    config.update(overrides)
+    return config
+
+
+def test_seeded_plans_are_reproducible_per_persona(make_simulator):
+    simulator = make_simulator(day_planner=planner())
+
+    first = simulator.build_day_plan('office_worker', DAY)
+    assert simulator.build_day_plan('office_worker', DAY) == first
+    assert simulator.build_day_plan('developer', DAY) != first
+    assert simulator.build_day_plan('office_worker', date(2024, 3, 6)) != first
+
+
+def test_sessions_stay_within_the_day_and_respect_breaks(make_simulator):
+    simulator = make_simulator(day_planner=planner(min_break_minutes=30), active_hours={'enabled': False})
+    day_start = datetime(DAY.year, DAY.month, DAY.day).timestamp()
+
+    for seed in range(20):
+        simulator.config['day_planner']['seed'] = seed
+        sessions = simulator.build_day_plan('office_worker', DAY)['sessions']
+        assert sessions
+        for session in sessions:
+            assert day_start <= session['start'] < session['end'] <= day_start + 86400
+            assert session['end'] - session['start'] >= 60
+        for previous, current in zip(sessions, sessions[1:]):
+            assert current['start'] - previous['end'] >= 30 * 60
+
+
+def test_session_starts_follow_active_hours(make_simulator):
+    simulator = make_simulator(day_planner=planner(sessions={'distribution': 'fixed', 'value': 1}),
+                               active_hours={'enabled': True, 'start_hour': 9, 'end_hour': 17})
+
+    for seed in range(30):
+        simulator.config['day_planner']['seed'] = seed
+        session, = simulator.build_day_plan('office_worker', DAY)['sessions']
+        assert 9 <= datetime.fromtimestamp(session['start']).hour < 17
+
+
+def test_think_times_are_clipped_and_capped(make_simulator):
+    simulator = make_simulator(day_planner=planner(
+        think_seconds={'distribution': 'exponential', 'mean': 300, 'min': 20, 'max': 60},
+        max_tasks_per_session=25))
+
+    for session in simulator.build_day_plan('office_worker', DAY)['sessions']:
+        assert 0 < len(session['think_seconds']) <= 25
+        assert all(20 <= value <= 60 for value in session['think_seconds'])
+
+
+def test_diurnal_weights_fall_back_to_flat_when_everything_is_inactive(make_simulator):
+    simulator = make_simulator(day_planner=planner(diurnal_curve=[0] * 24), active_hours={'enabled': False})
+    assert simulator.get_diurnal_weights() == [1.0] * 24
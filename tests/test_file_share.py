@@ -0,0 +1,34 @@
+import os
+import socket
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_fan_out_delivers_the_file_to_every_peer(make_simulator, tmp_path):
+    simulator = make_simulator(file_share_port=free_port(),
+                               file_share_fan_out={'enabled': True, 'max_peers': 3, 'max_concurrency': 3,
+                                                   'max_bandwidth_kbps': 0})
+    source = tmp_path / 'outgoing'
+    source.mkdir()
+    payload = os.urandom(300000)
+    (source / 'shared.bin').write_bytes(payload)
+
+    simulator.is_running = True
+    receiver = simulator.start_file_receiver()
+    receiver.start()
+    try:
+        peers = ['127.0.0.1', '127.0.0.2', '127.0.0.3']
+        results = simulator.share_file_fan_out(str(source / 'shared.bin'), peers)
+    finally:
+        simulator.is_running = False
+        receiver.join(5)
+
+    assert sorted(results) == peers
+    assert all(stats['success'] and stats['bytes'] == len(payload) for stats in results.values())
+    assert all(stats['attempts'] == 1 for stats in results.values())
+    assert (tmp_path / 'shared.bin').read_bytes() == payload
+    assert simulator.metrics.snapshot()['file_share_bytes'] == 3 * len(payload)
@@ -0,0 +1,209 @@
+import ftplib
+import io
+import time
+
+import pytest
+
+SERVER = {'host': 'ftp.test', 'port': 2121, 'username': 'u', 'password': 'p'}
+
+
+class FakeFTP:
+    def __init__(self, stored, drop_after=None, size_error=None):
+        self.stored = stored
+        self.drop_after = drop_after
+        self.size_error = size_error
+        self.commands = []
+
+    def voidcmd(self, command):
+        self.commands.append(command)
+        return '200 OK'
+
+    def size(self, name):
+        self.commands.append(f'SIZE {name}')
+        if self.size_error:
+            raise self.size_error
+        return len(self.stored.get(name, b''))
+
+    def storbinary(self, command, payload, blocksize, callback=None, rest=None):
+        name = command.split(' ', 1)[1]
+        self.commands.append((command, rest))
+        data = self.stored.get(name, b'')[:rest or 0]
+        while True:
+            block = payload.read(blocksize)
+            if not block:
+                break
+            data += block
+            self.stored[name] = data
+            if self.drop_after is not None and len(data) >= self.drop_after:
+                raise ConnectionResetError("connection dropped")
+
+
+class PooledFTP:
+    def __init__(self):
+        self.opened.append(self)
+        self.commands = []
+        self.dead = False
+        self.closed = False
+
+    def connect(self, host, port, timeout=None):
+        self.address = (host, port)
+
+    def login(self, username, password):
+        self.commands.append('LOGIN')
+
+    def set_pasv(self, passive):
+        pass
+
+    def voidcmd(self, command):
+        self.commands.append(command)
+        if self.dead:
+            raise EOFError("connection closed by server")
+        return '200 OK'
+
+    def nlst(self):
+        self.commands.append('NLST')
+        return ['a.bin', 'b.bin']
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+@pytest.fixture
+def pooled_ftp(monkeypatch):
+    monkeypatch.setattr(PooledFTP, 'opened', [], raising=False)
+    monkeypatch.setattr(ftplib, 'FTP', PooledFTP)
+    return PooledFTP.opened
+
+
+def pool_simulator(make_simulator, **session_pool):
+    simulator = make_simulator(ftp_config={'servers': [SERVER], 'session_pool': session_pool})
+    simulator.is_running = True
+    return simulator
+
+
+def pooled(simulator):
+    return [ftp for ftp, _ in simulator.ftp_sessions.get(simulator.get_ftp_server_key(SERVER), [])]
+
+
+def age_pooled_sessions(simulator, seconds):
+    key = simulator.get_ftp_server_key(SERVER)
+    simulator.ftp_sessions[key] = [(ftp, last_used - seconds) for ftp, last_used in simulator.ftp_sessions[key]]
+
+
+def test_released_session_is_reused(make_simulator, pooled_ftp):
+    simulator = pool_simulator(make_simulator, keepalive_seconds=60)
+
+    ftp = simulator.checkout_ftp_session(SERVER)
+    simulator.release_ftp_session(SERVER, ftp)
+
+    assert simulator.checkout_ftp_session(SERVER) is ftp
+    assert len(pooled_ftp) == 1
+    assert ftp.commands == ['LOGIN']
+
+
+def test_broken_and_surplus_sessions_are_closed(make_simulator, pooled_ftp):
+    simulator = pool_simulator(make_simulator, max_idle_per_server=1)
+    first, second, third = (simulator.checkout_ftp_session(SERVER) for _ in range(3))
+
+    simulator.release_ftp_session(SERVER, first, broken=True)
+    simulator.release_ftp_session(SERVER, second)
+    simulator.release_ftp_session(SERVER, third)
+
+    assert first.closed and third.closed and not second.closed
+    assert pooled(simulator) == [second]
+
+
+def test_dead_session_is_evicted_on_checkout(make_simulator, pooled_ftp):
+    simulator = pool_simulator(make_simulator, keepalive_seconds=60)
+    ftp = simulator.checkout_ftp_session(SERVER)
+    simulator.release_ftp_session(SERVER, ftp)
+    age_pooled_sessions(simulator, 120)
+    ftp.dead = True
+
+    replacement = simulator.checkout_ftp_session(SERVER)
+
+    assert replacement is not ftp
+    assert ftp.commands[-1] == 'NOOP' and ftp.closed
+    assert len(pooled_ftp) == 2
+
+
+def test_keepalive_thread_pings_idle_sessions_and_drops_dead_ones(make_simulator, pooled_ftp):
+    simulator = pool_simulator(make_simulator, keepalive_seconds=0, max_idle_seconds=600)
+    alive, dead, stale = (simulator.checkout_ftp_session(SERVER) for _ in range(3))
+    simulator.release_ftp_session(SERVER, stale)
+    age_pooled_sessions(simulator, 900)
+    simulator.release_ftp_session(SERVER, alive)
+    simulator.release_ftp_session(SERVER, dead)
+    dead.dead = True
+
+    thread = simulator.start_ftp_keepalive()
+    thread.start()
+    try:
+        deadline = time.time() + 5
+        while not (dead.closed and pooled(simulator) == [alive]) and time.time() < deadline:
+            time.sleep(0.05)
+        assert pooled(simulator) == [alive]
+    finally:
+        simulator.is_running = False
+        thread.join(5)
+
+    assert dead.closed and stale.closed
+    assert 'NOOP' not in stale.commands
+    assert alive.closed and not simulator.ftp_sessions
+
+
+def test_listing_is_cached_until_the_ttl_expires(make_simulator, pooled_ftp):
+    simulator = pool_simulator(make_simulator, listing_ttl_seconds=30)
+    ftp = simulator.checkout_ftp_session(SERVER)
+
+    assert simulator.ftp_list_files(SERVER, ftp) == ['a.bin', 'b.bin']
+    assert simulator.ftp_list_files(SERVER, ftp) == ['a.bin', 'b.bin']
+    assert ftp.commands.count('NLST') == 1
+
+    key = simulator.get_ftp_server_key(SERVER)
+    files, listed_at = simulator.ftp_listing_cache[key]
+    simulator.ftp_listing_cache[key] = (files, listed_at - 31)
+    simulator.ftp_list_files(SERVER, ftp)
+    assert ftp.commands.count('NLST') == 2
+
+    simulator.invalidate_ftp_listing(SERVER)
+    simulator.ftp_list_files(SERVER, ftp)
+    assert ftp.commands.count('NLST') == 3
+
+
+def resumable_simulator(make_simulator, monkeypatch, sessions):
+    simulator = make_simulator()
+    simulator.is_running = True
+    released = []
+    monkeypatch.setattr(simulator, 'checkout_ftp_session', lambda server: sessions.pop(0))
+    monkeypatch.setattr(simulator, 'release_ftp_session',
+                        lambda server, ftp, broken=False: released.append((ftp, broken)))
+    return simulator, released
+
+
+def test_upload_resumes_from_the_size_the_server_reports(make_simulator, monkeypatch):
+    stored = {}
+    first, second = FakeFTP(stored, drop_after=4), FakeFTP(stored)
+    simulator, released = resumable_simulator(make_simulator, monkeypatch, [first, second])
+
+    resumes = simulator.ftp_upload_resumable({'host': 'ftp.test'}, 'a.bin', io.BytesIO(b'0123456789'), 4, 3)
+
+    assert resumes == 1
+    assert stored['a.bin'] == b'0123456789'
+    assert second.commands == ['TYPE I', 'SIZE a.bin', ('STOR a.bin', 4)]
+    assert released == [(first, True), (second, False)]
+
+
+def test_upload_restarts_at_zero_when_size_is_refused(make_simulator, monkeypatch):
+    stored = {}
+    first = FakeFTP(stored, drop_after=4)
+    second = FakeFTP(stored, size_error=ftplib.error_perm('550 a.bin: No such file or directory'))
+    simulator, released = resumable_simulator(make_simulator, monkeypatch, [first, second])
+
+    resumes = simulator.ftp_upload_resumable({'host': 'ftp.test'}, 'a.bin', io.BytesIO(b'0123456789'), 4, 3)
+
+    assert resumes == 1
+    assert stored['a.bin'] == b'0123456789'
+    assert second.commands == ['TYPE I', 'SIZE a.bin', ('STOR a.bin', None)]
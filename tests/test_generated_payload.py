@@ -0,0 +1,43 @@
+from user_behavior_simulator.simulator import GeneratedPayload
+
+
+def test_reads_exactly_size_bytes_across_block_boundaries():
+    size = GeneratedPayload.block_size * 2 + 123
+    payload = GeneratedPayload(size, seed=7)
+
+    chunks = []
+    while True:
+        chunk = payload.read(300000)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    data = b''.join(chunks)
+    assert len(data) == size
+    assert payload.tell() == size
+    assert data[:GeneratedPayload.block_size] == data[GeneratedPayload.block_size:2 * GeneratedPayload.block_size]
+
+
+def test_same_seed_gives_same_content():
+    assert GeneratedPayload(4096, seed=1).read() == GeneratedPayload(4096, seed=1).read()
+    assert GeneratedPayload(4096, seed=1).read() != GeneratedPayload(4096, seed=2).read()
+
+
+def test_seek_resumes_at_offset():
+    full = GeneratedPayload(10000, seed=3).read()
+    payload = GeneratedPayload(10000, seed=3)
+
+    assert payload.seek(4000) == 4000
+    assert payload.read(100) == full[4000:4100]
+    assert payload.seek(-50, 2) == 9950
+    assert payload.read() == full[9950:]
+    assert payload.seek(-20, 1) == 9980
+
+
+def test_seek_is_clamped_and_read_past_end_is_empty():
+    payload = GeneratedPayload(10, seed=4)
+
+    assert payload.seek(100) == 10
+    assert payload.read(5) == b''
+    assert payload.seek(-100) == 0
+    assert len(payload.read(None)) == 10
@@ -0,0 +1,65 @@
+class FakeMail:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def fetch(self, message_set, items):
+        self.calls.append(('fetch', message_set, items))
+        return self.responses['fetch']
+
+    def status(self, folder, items):
+        self.calls.append(('status', folder, items))
+        return self.responses['status']
+
+
+def test_message_set_compresses_runs(make_simulator):
+    simulator = make_simulator()
+
+    assert simulator.imap_message_set([b'7', b'1', b'2', b'3', b'5', b'6', b'10']) == '1:3,5:7,10'
+    assert simulator.imap_message_set(['4', '4']) == '4'
+    assert simulator.imap_message_set([]) == ''
+
+
+def test_status_parses_counts_and_quotes_folders(make_simulator):
+    simulator = make_simulator()
+    mail = FakeMail({'status': ('OK', [b'"Sent Items" (MESSAGES 42 UNSEEN 3)'])})
+
+    assert simulator.imap_status(mail, 'Sent Items') == {'MESSAGES': 42, 'UNSEEN': 3}
+    assert mail.calls == [('status', '"Sent Items"', '(MESSAGES UNSEEN)')]
+
+
+def test_status_failure_returns_none(make_simulator):
+    mail = FakeMail({'status': ('NO', [b'no such mailbox'])})
+
+    assert make_simulator().imap_status(mail, 'Missing') is None
+
+
+def test_fetch_summaries_uses_one_batched_header_only_fetch(make_simulator):
+    simulator = make_simulator()
+    mail = FakeMail({'fetch': ('OK', [
+        (b'3 (BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {60}',
+         b'From: alice@example.com\r\nSubject: =?utf-8?q?Caf=C3=A9?=\r\n\r\n'),
+        (b' BODY[TEXT]<0> {11}', b'hello there'),
+        b')',
+        (b'1 (BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {40}',
+         b'From: bob@example.com\r\nSubject: Hi\r\nDate: Mon, 1 Jan 2024 10:00:00 +0000\r\n\r\n'),
+        (b' BODY[TEXT]<0> {5}', b'short'),
+        b')',
+    ])})
+
+    summaries = simulator.imap_fetch_summaries(mail, [b'1', b'3', b'2'], preview_bytes=64)
+
+    assert len(mail.calls) == 1
+    _, message_set, items = mail.calls[0]
+    assert message_set == '1:3'
+    assert 'BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)]' in items and 'BODY.PEEK[TEXT]<0.64>' in items
+    assert [summary['id'] for summary in summaries] == ['1', '3']
+    assert summaries[0]['from'] == 'bob@example.com' and summaries[0]['preview'] == 'short'
+    assert summaries[1]['subject'] == 'Café' and summaries[1]['date'] is None
+
+
+def test_fetch_summaries_of_nothing_does_not_hit_server(make_simulator):
+    mail = FakeMail({})
+
+    assert make_simulator().imap_fetch_summaries(mail, []) == []
+    assert mail.calls == []
@@ -0,0 +1,247 @@
+import datetime
+import imaplib
+import socketserver
+import ssl
+import threading
+import time
+
+import pytest
+
+from user_behavior_simulator.simulator import IMAPIdleConnection
+
+
+class FakeIdleHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        write = self.wfile.write
+        write(b"* OK fake\r\n")
+        idle_tag = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            self.server.commands.append(line.strip())
+            parts = line.decode().strip().split(' ', 2)
+            if parts[0] == 'DONE':
+                if self.server.stall_done:
+                    self.server.stalled.wait(10)
+                    return
+                write(f"{idle_tag} OK idle done\r\n".encode())
+                continue
+
+            tag, command = parts[0], parts[1].upper()
+            if command == 'CAPABILITY':
+                write(b"* CAPABILITY IMAP4rev1 IDLE\r\n")
+            elif command == 'SELECT':
+                write(b"* %d EXISTS\r\n" % self.server.exists)
+            elif command == 'IDLE':
+                idle_tag = tag
+                write(b"+ idling\r\n" + self.server.with_continuation)
+                self.server.idling.append(self.wfile)
+                continue
+            elif command == 'FETCH':
+                header = b"From: a@b.c\r\nSubject: Hello\r\n\r\n"
+                body = b"x" * self.server.body_size
+                response = (b"* %d FETCH (BODY[HEADER.FIELDS (FROM SUBJECT DATE)] {%d}\r\n%s BODY[TEXT]<0> {%d}\r\n%s)\r\n"
+                            % (self.server.exists, len(header), header, len(body), body))
+                split = response.index(body) + len(body) // 3
+                write(response[:split])
+                time.sleep(0.05)
+                write(response[split:])
+            elif command == 'LOGOUT':
+                write(b"* BYE\r\n")
+                write(f"{tag} OK done\r\n".encode())
+                return
+            write(f"{tag} OK done\r\n".encode())
+
+
+class FakeIdleServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, stall_done=False, ssl_context=None):
+        super().__init__(('127.0.0.1', 0), FakeIdleHandler)
+        self.stall_done = stall_done
+        self.ssl_context = ssl_context
+        self.with_continuation = b''
+        self.body_size = 4
+        self.stalled = threading.Event()
+        self.exists = 3
+        self.commands = []
+        self.idling = []
+
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        return sock, address
+
+    def deliver(self):
+        self.exists += 1
+        for wfile in self.idling:
+            wfile.write(b"* %d EXISTS\r\n" % self.exists)
+
+    def stored(self):
+        return any(b' STORE ' in command for command in self.commands)
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop(server):
+    server.stalled.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def idle_servers():
+    servers = [serve(FakeIdleServer()), serve(FakeIdleServer(stall_done=True))]
+    yield servers
+    for server in servers:
+        stop(server)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def start_watch_loop(simulator):
+    watchers = simulator.get_imap_watchers()
+    simulator.is_running = True
+    thread = threading.Thread(target=simulator.imap_watch_loop, args=(watchers,), daemon=True)
+    thread.start()
+    return watchers, thread
+
+
+@pytest.fixture(scope='module')
+def server_ssl_context(tmp_path_factory):
+    x509 = pytest.importorskip('cryptography.x509')
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(x509.oid.NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.utcnow()
+    certificate = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                   .serial_number(x509.random_serial_number()).not_valid_before(now)
+                   .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256()))
+
+    directory = tmp_path_factory.mktemp('tls')
+    cert_file, key_file = directory / 'cert.pem', directory / 'key.pem'
+    cert_file.write_bytes(certificate.public_bytes(serialization.Encoding.PEM))
+    key_file.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                           serialization.NoEncryption()))
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(cert_file), str(key_file))
+    return context
+
+
+def make_watch_simulator(make_simulator, servers, use_ssl=False):
+    return make_simulator(imap_config={
+        'servers': [{'server': '127.0.0.1', 'port': server.server_address[1], 'username': 'u', 'password': 'p',
+                     'use_ssl': use_ssl} for server in servers],
+        'idle_watch': {
+            'reaction_delay_seconds': [0, 0],
+            'read_probability': 1,
+            'mark_read_probability': 1,
+            'socket_timeout_seconds': 3,
+            'reconnect_seconds': 60
+        }
+    })
+
+
+def test_stalled_server_does_not_hold_up_other_watchers(make_simulator, idle_servers):
+    healthy, stalled = idle_servers
+    simulator = make_watch_simulator(make_simulator, idle_servers)
+    watchers, thread = start_watch_loop(simulator)
+    try:
+        assert wait_for(lambda: healthy.idling and stalled.idling)
+
+        stalled.deliver()
+        assert wait_for(lambda: b'DONE' in stalled.commands)
+        healthy.deliver()
+
+        assert wait_for(healthy.stored, timeout=2)
+        assert not stalled.stored()
+    finally:
+        simulator.is_running = False
+        stalled.stalled.set()
+        thread.join(10)
+    assert not thread.is_alive()
+
+
+def test_reaction_error_only_drops_that_connection(make_simulator, idle_servers, monkeypatch):
+    healthy, broken = idle_servers
+    broken.stall_done = False
+    simulator = make_watch_simulator(make_simulator, idle_servers)
+    react = simulator.imap_watcher_react
+
+    def flaky_react(watcher):
+        if watcher['server_config']['port'] == broken.server_address[1]:
+            raise ValueError("unparseable FETCH response")
+        return react(watcher)
+
+    monkeypatch.setattr(simulator, 'imap_watcher_react', flaky_react)
+    watchers, thread = start_watch_loop(simulator)
+    try:
+        assert wait_for(lambda: healthy.idling and broken.idling)
+
+        broken.deliver()
+        assert wait_for(lambda: watchers[1]['mail'] is None and watchers[1]['retry_at'] > time.time())
+        healthy.deliver()
+
+        assert wait_for(healthy.stored)
+        assert thread.is_alive()
+    finally:
+        simulator.is_running = False
+        thread.join(10)
+
+
+def test_literal_split_across_writes_survives_an_idle_cycle():
+    server = serve(FakeIdleServer())
+    server.body_size = 3000
+    try:
+        mail = imaplib.IMAP4('127.0.0.1', server.server_address[1])
+        mail.login('u', 'p')
+        mail.select('INBOX')
+        lines = []
+        idle = IMAPIdleConnection(mail, timeout=5)
+
+        idle.start(lines.append)
+        assert wait_for(lambda: server.idling)
+        server.deliver()
+        assert wait_for(lambda: idle.read_available(lines.append) or lines)
+        idle.done(lines.append)
+
+        status, data = mail.fetch('4', '(BODY.PEEK[TEXT])')
+        assert status == 'OK'
+        assert len(data[1][1]) == 3000
+        assert mail.noop()[0] == 'OK'
+        mail.logout()
+    finally:
+        stop(server)
+
+
+def test_responses_in_the_continuation_record_are_seen_over_tls(make_simulator, server_ssl_context):
+    server = serve(FakeIdleServer(ssl_context=server_ssl_context))
+    server.with_continuation = b"* 4 EXISTS\r\n"
+    server.body_size = 3000
+    simulator = make_watch_simulator(make_simulator, [server], use_ssl=True)
+    simulator.config['imap_config']['idle_watch']['idle_refresh_seconds'] = 1500
+
+    watchers, thread = start_watch_loop(simulator)
+    try:
+        assert wait_for(server.stored)
+        assert watchers[0]['exists'] == 4
+    finally:
+        simulator.is_running = False
+        thread.join(10)
+        stop(server)
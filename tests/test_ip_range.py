@@ -0,0 +1,75 @@
+import ipaddress
+
+import pytest
+
+from user_behavior_simulator.simulator import IPRangeSet
+
+
+def test_cidr_uses_host_bounds():
+    pool = IPRangeSet(['10.0.0.0/30'])
+
+    assert list(pool) == ['10.0.0.1', '10.0.0.2']
+    assert '10.0.0.0' not in pool
+    assert '10.0.0.3' not in pool
+
+
+def test_point_to_point_and_single_host_cidrs_keep_every_address():
+    assert list(IPRangeSet(['10.0.0.0/31'])) == ['10.0.0.0', '10.0.0.1']
+    assert list(IPRangeSet(['10.0.0.7/32'])) == ['10.0.0.7']
+
+
+def test_ranges_merge_and_exclusions_split_segments():
+    pool = IPRangeSet(
+        [{'start': '192.168.1.10', 'end': '192.168.1.20'}, '192.168.1.15-192.168.1.25'],
+        ['192.168.1.12', '192.168.1.18-192.168.1.19'])
+
+    assert pool.size == 16 - 1 - 2
+    assert '192.168.1.12' not in pool
+    assert '192.168.1.25' in pool
+    assert pool[0] == '192.168.1.10'
+    assert pool[-1] == '192.168.1.25'
+    assert pool.address_at(2) == '192.168.1.13'
+
+
+def test_huge_ipv6_range_reports_size_and_samples():
+    pool = IPRangeSet(['2001:db8::/64'])
+
+    assert pool.size == 2 ** 64 - 1
+    assert pool
+    sample = pool.sample(50)
+    assert len(set(sample)) == 50
+    network = ipaddress.ip_network('2001:db8::/64')
+    assert all(ipaddress.ip_address(ip) in network and ip != '2001:db8::' for ip in sample)
+
+
+def test_sample_without_replacement_caps_at_size():
+    pool = IPRangeSet(['10.1.0.0/29'], ['10.1.0.3'])
+
+    sample = pool.sample(100)
+
+    assert sorted(sample, key=ipaddress.ip_address) == list(pool)
+    assert '10.1.0.0' not in sample and '10.1.0.7' not in sample
+
+
+def test_empty_range_is_falsy():
+    pool = IPRangeSet(['10.0.0.1'], ['10.0.0.0/24'])
+
+    assert not pool
+    assert pool.sample(3) == []
+    with pytest.raises(IndexError):
+        pool.address_at(0)
+
+
+def test_mixed_version_range_is_rejected():
+    with pytest.raises(ValueError):
+        IPRangeSet([{'start': '10.0.0.1', 'end': '::1'}])
+
+
+def test_simulator_helpers_accept_lists_and_range_sets(make_simulator):
+    simulator = make_simulator()
+    pool = IPRangeSet(['10.2.0.0/16'])
+
+    assert simulator.count_ips(pool) == 65534
+    assert len(simulator.sample_ips(pool, 10)) == 10
+    assert simulator.count_ips(['10.0.0.1', '10.0.0.2']) == 2
+    assert simulator.sample_ips(['10.0.0.1'], 5) == ['10.0.0.1']
@@ -0,0 +1,61 @@
+import struct
+
+
+def test_tcp_and_icmp_results_are_cached_separately(make_simulator):
+    simulator = make_simulator()
+    tcp_kind = simulator.get_tcp_probe_kind()
+
+    simulator.update_reachability('10.0.0.5', False, tcp_kind)
+
+    assert simulator.get_cached_reachability('10.0.0.5', tcp_kind) is False
+    assert simulator.get_cached_reachability('10.0.0.5', 'icmp') is None
+
+
+def test_reachability_cache_is_bounded(make_simulator):
+    simulator = make_simulator(liveness_probe={'max_cache_entries': 3, 'cache_ttl_seconds': 60})
+
+    for index in range(10):
+        simulator.update_reachability(f'10.0.0.{index}', True, 'icmp')
+
+    assert len(simulator.reachability_cache) == 3
+    assert simulator.get_cached_reachability('10.0.0.9', 'icmp') is True
+    assert simulator.get_cached_reachability('10.0.0.0', 'icmp') is None
+
+
+def test_expired_reachability_entries_are_evicted(make_simulator):
+    simulator = make_simulator(liveness_probe={'cache_ttl_seconds': 0})
+
+    simulator.update_reachability('10.0.0.1', True, 'icmp')
+    simulator.update_reachability('10.0.0.2', True, 'icmp')
+
+    assert simulator.get_cached_reachability('10.0.0.2', 'icmp') is None
+    assert len(simulator.reachability_cache) == 0
+
+
+def test_icmp_reply_parsing_with_and_without_ip_header(make_simulator):
+    simulator = make_simulator()
+    reply = struct.pack('!BBHHH', 0, 0, 0, 1, 1) + b'ubs-liveness'
+    ip_header = bytes([0x45]) + bytes(19)
+
+    assert simulator.parse_icmp_reply_type(reply) == 0
+    assert simulator.parse_icmp_reply_type(ip_header + reply) == 0
+    assert simulator.parse_icmp_reply_type(bytes([3, 1]) + bytes(6)) == 3
+
+
+def test_icmp_failure_falls_back_to_tcp_once(make_simulator, monkeypatch, capsys):
+    simulator = make_simulator(liveness_probe={'method': 'icmp', 'tcp_ports': [9], 'cache_ttl_seconds': 0})
+    attempts = []
+
+    def icmp_probe_batch(ips, timeout):
+        attempts.append(ips)
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr(simulator, 'icmp_probe_batch', icmp_probe_batch)
+    monkeypatch.setattr(simulator, 'tcp_probe', lambda ip, port, timeout: ip == '10.0.0.1')
+
+    assert simulator.probe_hosts(['10.0.0.1', '10.0.0.2']) == {'10.0.0.1': True, '10.0.0.2': False}
+    assert simulator.probe_hosts(['10.0.0.1']) == {'10.0.0.1': True}
+
+    assert len(attempts) == 1
+    assert capsys.readouterr().out.count("ICMP probing not permitted") == 1
+    assert simulator.get_probe_kind() == simulator.get_tcp_probe_kind()
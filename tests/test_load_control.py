@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+
+TARGETS = [
+    {'metric': 'http_requests', 'per_second': 10, 'tasks': ['browse_websites']},
+    {'metric': 'emails_sent', 'per_second': 2, 'tasks': ['send_smtp_email']}
+]
+
+
+@pytest.fixture
+def controlled(make_simulator, monkeypatch):
+    simulator = make_simulator(load_targets={
+        'enabled': True, 'gain': 0.5, 'tolerance': 0.1, 'min_multiplier': 0.01, 'max_multiplier': 10,
+        'initial_concurrency': 1, 'max_concurrency': 3, 'window_seconds': 60, 'targets': TARGETS
+    })
+    rates = {}
+    monkeypatch.setattr(simulator.metrics, 'rate', lambda name, window_seconds=60: rates.get(name, 0.0))
+    simulator.load_concurrency = 1
+    return simulator, rates
+
+
+def test_targets_are_normalised_to_per_second(make_simulator):
+    simulator = make_simulator(load_targets={'targets': [
+        {'metric': 'a', 'per_minute': 120, 'tasks': ['x']},
+        {'metric': 'b', 'per_hour': 3600},
+        {'metric': 'c', 'mbit_per_second': 8},
+        {'metric': 'd'},
+        {'per_second': 5}
+    ]})
+    assert [(target['metric'], target['rate']) for target in simulator.get_load_targets()] == [
+        ('a', 2.0), ('b', 1.0), ('c', 1000000.0)]
+
+
+def test_multipliers_follow_the_achieved_ratio(controlled):
+    simulator, rates = controlled
+    rates.update({'http_requests': 2.5, 'emails_sent': 8})
+
+    status = simulator.adjust_load(simulator.get_load_targets())
+
+    assert simulator.get_think_multiplier('browse_websites') == pytest.approx(0.5)
+    assert simulator.get_think_multiplier('send_smtp_email') == pytest.approx(2.0)
+    assert [item['ratio'] for item in status] == [0.25, 4.0]
+
+
+def test_multipliers_are_clamped(controlled):
+    simulator, rates = controlled
+    rates.update({'http_requests': 0, 'emails_sent': 1000})
+
+    for _ in range(20):
+        simulator.adjust_load(simulator.get_load_targets())
+
+    assert simulator.get_think_multiplier('browse_websites') == 0.01
+    assert simulator.get_think_multiplier('send_smtp_email') == 10
+
+
+def test_concurrency_grows_only_once_think_times_are_exhausted(controlled):
+    simulator, rates = controlled
+    rates.update({'http_requests': 1, 'emails_sent': 2})
+    targets = simulator.get_load_targets()
+
+    simulator.adjust_load(targets)
+    assert simulator.get_load_concurrency() == 1
+
+    for _ in range(10):
+        simulator.adjust_load(targets)
+    assert simulator.get_think_multiplier('browse_websites') == 0.01
+    assert simulator.get_load_concurrency() == 3
+
+
+def test_concurrency_shrinks_to_the_initial_level_when_every_target_is_exceeded(controlled):
+    simulator, rates = controlled
+    simulator.load_concurrency = 3
+    targets = simulator.get_load_targets()
+
+    rates.update({'http_requests': 20, 'emails_sent': 2})
+    simulator.adjust_load(targets)
+    assert simulator.get_load_concurrency() == 3
+
+    rates.update({'http_requests': 20, 'emails_sent': 4})
+    for _ in range(5):
+        simulator.adjust_load(targets)
+    assert simulator.get_load_concurrency() == 1
+
+
+def test_workers_follow_the_concurrency_level(controlled, monkeypatch):
+    simulator, _ = controlled
+    runs = []
+    monkeypatch.setattr(simulator, 'get_enabled_tasks', lambda: ['browse_websites'])
+    monkeypatch.setattr(simulator, 'get_task_methods',
+                        lambda: {'browse_websites': lambda: runs.append(threading.get_ident()) or time.sleep(0.01)})
+    simulator.is_running = True
+    workers = {}
+
+    try:
+        with simulator.load_control_lock:
+            simulator.load_concurrency = 2
+        simulator.start_load_workers(workers, 'default')
+        assert sorted(workers) == [0, 1]
+        time.sleep(0.2)
+        assert len(set(runs)) == 2
+
+        with simulator.load_control_lock:
+            simulator.load_concurrency = 1
+        workers[1].join(2)
+        assert not workers[1].is_alive()
+        assert workers[0].is_alive()
+
+        simulator.start_load_workers(workers, 'default')
+        assert not workers[1].is_alive()
+    finally:
+        simulator.is_running = False
+        for worker in workers.values():
+            worker.join(2)
@@ -0,0 +1,66 @@
+import pytest
+
+
+LINUX_OUTPUT = """PING 192.168.1.1 (192.168.1.1) 56(84) bytes of data.
+64 bytes from 192.168.1.1: icmp_seq=1 ttl=64 time=0.412 ms
+
+--- 192.168.1.1 ping statistics ---
+4 packets transmitted, 3 received, 25% packet loss, time 3004ms
+rtt min/avg/max/mdev = 0.380/0.421/0.470/0.037 ms
+"""
+
+MACOS_OUTPUT = """--- 10.0.0.1 ping statistics ---
+2 packets transmitted, 2 packets received, 0.0% packet loss
+round-trip min/avg/max/stddev = 1.101/1.250/1.399/0.149 ms
+"""
+
+WINDOWS_OUTPUT = """Ping statistics for 10.0.0.2:
+    Packets: Sent = 4, Received = 2, Lost = 2 (50% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 1ms, Maximum = 9ms, Average = 4ms
+"""
+
+
+def test_parse_linux_ping_output(make_simulator):
+    stats = make_simulator().parse_ping_output(LINUX_OUTPUT)
+
+    assert stats == {'transmitted': 4, 'received': 3, 'loss_pct': 25.0,
+                     'rtt_min': 0.38, 'rtt_avg': 0.421, 'rtt_max': 0.47, 'rtt_mdev': 0.037}
+
+
+def test_parse_macos_ping_output(make_simulator):
+    stats = make_simulator().parse_ping_output(MACOS_OUTPUT)
+
+    assert (stats['transmitted'], stats['received'], stats['loss_pct']) == (2, 2, 0.0)
+    assert stats['rtt_avg'] == pytest.approx(1.25)
+    assert stats['rtt_mdev'] == pytest.approx(0.149)
+
+
+def test_parse_windows_ping_output(make_simulator):
+    stats = make_simulator().parse_ping_output(WINDOWS_OUTPUT)
+
+    assert (stats['transmitted'], stats['received'], stats['loss_pct']) == (4, 2, 50.0)
+    assert (stats['rtt_min'], stats['rtt_avg'], stats['rtt_max']) == (1.0, 4.0, 9.0)
+    assert stats['rtt_mdev'] is None
+
+
+def test_parse_unreachable_output(make_simulator):
+    stats = make_simulator().parse_ping_output("ping: connect: Network is unreachable\n")
+
+    assert all(value is None for value in stats.values())
+
+
+def test_results_store_lives_in_data_directory(make_simulator, tmp_path):
+    simulator = make_simulator()
+    simulator.store_results(
+        "INSERT INTO ping_results (ts, ip, persona, transmitted, received, loss_pct, rtt_min, rtt_avg, "
+        "rtt_max, rtt_mdev, returncode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(3600.0, '10.0.0.1', 'default', 4, 4, 0.0, 1.0, 2.0, 3.0, 0.5, 0),
+         (3700.0, '10.0.0.1', 'default', 4, 2, 50.0, 3.0, 4.0, 5.0, 0.5, 0)])
+
+    assert simulator.get_results_db_path() == str(tmp_path / 'simulator_results.db')
+    rows = simulator.query_ping_latency(ip='10.0.0.1', bucket_minutes=60)
+    assert len(rows) == 1
+    assert rows[0]['samples'] == 2
+    assert rows[0]['rtt_avg'] == pytest.approx(3.0)
+    assert rows[0]['loss_pct'] == pytest.approx(25.0)
@@ -0,0 +1,97 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from user_behavior_simulator.simulator import ProcessSupervisor
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith('win'), reason="uses POSIX signals and pipes")
+
+
+class Signals:
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, process, app, force=False):
+        self.sent.append(force)
+        if force:
+            process.kill()
+        else:
+            process.terminate()
+
+
+def run(supervisor, timeout=10):
+    deadline = time.monotonic() + timeout
+    supervisor.run(lambda: time.monotonic() < deadline)
+
+
+def test_app_is_terminated_at_its_deadline():
+    signals = Signals()
+    finished = []
+    supervisor = ProcessSupervisor(signals, grace_seconds=2, poll_interval=0.05, on_finish=finished.append)
+    process = subprocess.Popen(['sleep', '30'])
+
+    started = time.monotonic()
+    supervisor.add(process, {'name': 'sleep'}, 0.3)
+    run(supervisor)
+
+    assert signals.sent == [False]
+    assert process.returncode == -15
+    assert 0.25 <= time.monotonic() - started < 2
+    assert finished[0]['app'] == {'name': 'sleep'}
+
+
+def test_app_ignoring_sigterm_is_killed_after_the_grace_period():
+    signals = Signals()
+    supervisor = ProcessSupervisor(signals, grace_seconds=0.3, poll_interval=0.05)
+    process = subprocess.Popen(
+        [sys.executable, '-c', 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)'])
+
+    started = time.monotonic()
+    supervisor.add(process, 'stubborn', 1.0)
+    run(supervisor)
+
+    assert signals.sent == [False, True]
+    assert process.returncode == -9
+    assert 1.2 <= time.monotonic() - started < 5
+
+
+def test_deadline_counts_from_the_launch_time():
+    supervisor = ProcessSupervisor(Signals(), poll_interval=0.05)
+    process = subprocess.Popen(['sleep', '30'])
+    launched_at = time.monotonic() - 10
+
+    started = time.monotonic()
+    supervisor.add(process, 'sleep', 10.2, launched_at)
+    run(supervisor)
+
+    assert time.monotonic() - started < 2
+
+
+def test_captured_output_is_capped():
+    finished = []
+    supervisor = ProcessSupervisor(Signals(), capture_bytes=1000, poll_interval=0.05, on_finish=finished.append)
+    process = subprocess.Popen(['yes'], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    supervisor.add(process, 'yes', 0.3)
+    run(supervisor)
+
+    entry = finished[0]
+    assert len(entry['output']) == 1000
+    assert entry['output'].startswith(b'y\ny\n')
+    assert entry['output_bytes'] > 1000
+    assert process.stdout.closed
+
+
+def test_stopping_the_simulator_terminates_every_app():
+    signals = Signals()
+    supervisor = ProcessSupervisor(signals, poll_interval=0.05)
+    processes = [subprocess.Popen(['sleep', '30']) for _ in range(3)]
+    for process in processes:
+        supervisor.add(process, 'sleep', 60)
+
+    supervisor.run(lambda: False)
+
+    assert signals.sent == [False] * 3
+    assert all(process.returncode == -15 for process in processes)
@@ -0,0 +1,53 @@
+import os
+import signal
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason="profiling signals need SIGUSR1/SIGUSR2")
+
+
+@pytest.fixture
+def restore_signals():
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGUSR1, signal.SIGUSR2)}
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+def test_signals_are_off_by_default(make_simulator):
+    assert make_simulator().config['profiling']['signals'] is False
+
+
+def test_signal_handlers_only_queue_requests(make_simulator, restore_signals, tmp_path):
+    simulator = make_simulator(profiling={'output_dir': str(tmp_path / 'profiles'), 'sample_interval_ms': 5})
+    assert simulator.install_profiling_signals()
+
+    os.kill(os.getpid(), signal.SIGUSR1)
+    os.kill(os.getpid(), signal.SIGUSR2)
+    time.sleep(0.1)
+    assert list(simulator.profiling_requests) == ['toggle', 'memory snapshot']
+    assert simulator.profiler is None
+
+    simulator.is_running = True
+    handler = simulator.start_profiling_request_handler()
+    handler.start()
+    try:
+        deadline = time.time() + 5
+        while simulator.profiling_requests and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.1)
+        assert simulator.get_profiling_status()['cpu'] == 'running'
+
+        simulator.profiling_requests.append('toggle')
+        deadline = time.time() + 5
+        while simulator.profiler is not None and time.time() < deadline:
+            time.sleep(0.05)
+        assert simulator.profiler is None
+    finally:
+        simulator.is_running = False
+        handler.join(5)
+        simulator.stop_memory_tracing()
+
+    written = sorted(name.split('-')[0] for name in os.listdir(tmp_path / 'profiles'))
+    assert written == ['cpu', 'tasks', 'wall']
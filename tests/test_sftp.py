@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+paramiko = pytest.importorskip('paramiko')
+
+from .ssh_server import StandInSSHServer  # noqa: E402
+
+
+@pytest.fixture
+def sftp_server(tmp_path):
+    root = tmp_path / 'remote'
+    root.mkdir()
+    server = StandInSSHServer(root)
+    yield server.server_config(), root
+    server.close()
+
+
+@pytest.fixture
+def sftp_simulator(make_simulator, sftp_server):
+    server_config, _ = sftp_server
+    simulator = make_simulator(sftp_config={'servers': [server_config], 'chunk_size_kb': 32, 'random_reads': 4,
+                                            'random_read_kb': 8, 'operation_delay_seconds': [0, 0],
+                                            'payload_size_mb': [0.1, 0.2]})
+    simulator.is_running = True
+    yield simulator
+    simulator.close_ssh_clients()
+
+
+def test_upload_list_download_and_random_read(sftp_simulator, sftp_server):
+    server_config, root = sftp_server
+    sftp = sftp_simulator.open_sftp_client(server_config)
+    try:
+        name, uploaded = sftp_simulator.sftp_upload(sftp, 300000)
+        assert uploaded == 300000
+        assert (root / name).stat().st_size == 300000
+
+        files = sftp_simulator.sftp_list_files(sftp)
+        assert [entry.filename for entry in files] == [name]
+
+        entry = sftp_simulator.sftp_pick_file(sftp)
+        assert sftp_simulator.sftp_download(sftp, entry) == 300000
+        assert sftp_simulator.sftp_random_read(sftp, entry) == 4 * 8 * 1024
+    finally:
+        sftp.close()
+
+
+def test_download_falls_back_when_prefetch_has_no_concurrency_argument(sftp_simulator, sftp_server, monkeypatch):
+    server_config, root = sftp_server
+    (root / 'ubs_sftp_old.bin').write_bytes(os.urandom(100000))
+    original_prefetch = paramiko.SFTPFile.prefetch
+
+    def prefetch(self, file_size=None):
+        return original_prefetch(self, file_size)
+
+    monkeypatch.setattr(paramiko.SFTPFile, 'prefetch', prefetch)
+    sftp = sftp_simulator.open_sftp_client(server_config)
+    try:
+        assert sftp_simulator.sftp_download(sftp, sftp_simulator.sftp_pick_file(sftp)) == 100000
+    finally:
+        sftp.close()
+
+
+def test_server_session_records_transfers(sftp_simulator, sftp_server):
+    server_config, root = sftp_server
+    sftp_simulator.sftp_server_session(server_config, ['upload', 'list', 'download', 'random_read'])
+
+    uploaded = [path for path in root.iterdir() if path.name.startswith('ubs_sftp_')]
+    assert len(uploaded) == 1
+    assert sftp_simulator.metrics.snapshot()['sftp_bytes'] > uploaded[0].stat().st_size
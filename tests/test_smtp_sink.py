@@ -0,0 +1,157 @@
+import smtplib
+import socket
+from email.message import EmailMessage
+
+
+def sink_config(smtp_sink, **campaign):
+    return {
+        'enabled': True,
+        'provider': 'sink',
+        'sink': {'server': '127.0.0.1', 'port': smtp_sink.server_address[1],
+                 'username': 'sender@example.com', 'use_tls': False},
+        'recipients': ['a@example.com', 'b@example.com'],
+        'session_pool': {'enabled': True, 'max_messages_per_session': 20},
+        'campaign': dict({'enabled': True, 'sessions': 4, 'rate_per_second': 0, 'duration_seconds': 30,
+                          'attachment_probability': 0, 'body_pool_size': 5}, **campaign),
+    }
+
+
+def test_sink_accepts_and_counts_messages(smtp_sink):
+    msg = EmailMessage()
+    msg['From'] = 'sender@example.com'
+    msg['To'] = 'recipient@example.com'
+    msg['Subject'] = 'hello'
+    msg.set_content('line one\n.line starting with a dot\n')
+
+    with smtplib.SMTP(*smtp_sink.server_address, timeout=10) as client:
+        assert client.noop()[0] == 250
+        client.send_message(msg)
+        client.send_message(msg)
+
+    assert smtp_sink.counters['messages'] == 2
+    assert smtp_sink.counters['bytes'] > 2 * len('line one')
+
+
+def test_campaign_delivers_every_message_to_sink(make_simulator, smtp_sink, monkeypatch):
+    simulator = make_simulator(smtp_config=sink_config(smtp_sink, messages=60))
+    monkeypatch.setattr(simulator, 'get_random_text_from_api', lambda: 'api text')
+    simulator.is_running = True
+
+    provider, server_config = simulator.get_smtp_server_config()
+    report = simulator.run_email_campaign(provider, server_config)
+    simulator.close_smtp_sessions()
+
+    assert report['sent'] == 60
+    assert report['errors'] == 0 and report['rejected'] == 0
+    assert smtp_sink.counters['messages'] == 60
+    assert simulator.metrics.snapshot()['emails_sent'] == 60
+    assert report['latency_p50_ms'] <= report['latency_p99_ms']
+
+
+def make_message(index=0):
+    msg = EmailMessage()
+    msg['From'] = 'sender@example.com'
+    msg['To'] = 'a@example.com'
+    msg['Subject'] = f'message {index}'
+    msg.set_content('hello')
+    return msg
+
+
+def pool_simulator(make_simulator, smtp_sink, monkeypatch, **session_pool):
+    config = sink_config(smtp_sink)
+    config['session_pool'] = dict({'enabled': True}, **session_pool)
+    simulator = make_simulator(smtp_config=config)
+    simulator.is_running = True
+
+    opened = []
+    open_smtp_session = simulator.open_smtp_session
+
+    def counting_open(server_config):
+        opened.append(open_smtp_session(server_config))
+        return opened[-1]
+
+    monkeypatch.setattr(simulator, 'open_smtp_session', counting_open)
+    return simulator, config['sink'], opened
+
+
+def age_pooled_sessions(simulator, seconds):
+    simulator.smtp_sessions['sink'] = [(server, sent, last_used - seconds)
+                                       for server, sent, last_used in simulator.smtp_sessions['sink']]
+
+
+def test_session_is_recycled_after_the_message_cap(make_simulator, smtp_sink, monkeypatch):
+    simulator, server_config, opened = pool_simulator(make_simulator, smtp_sink, monkeypatch,
+                                                      max_messages_per_session=3)
+
+    for index in range(7):
+        simulator.send_smtp_message_with_retry('sink', server_config, make_message(index))
+    simulator.close_smtp_sessions()
+
+    assert len(opened) == 3
+    assert smtp_sink.counters['messages'] == 7
+
+
+def test_session_limit_reply_reconnects_and_retries(make_simulator, smtp_sink, monkeypatch):
+    simulator, server_config, opened = pool_simulator(make_simulator, smtp_sink, monkeypatch)
+    simulator.send_smtp_message_with_retry('sink', server_config, make_message())
+
+    def session_limit(msg):
+        raise smtplib.SMTPDataError(421, b'4.7.0 Too many messages in this session')
+
+    opened[0].send_message = session_limit
+    simulator.send_smtp_message_with_retry('sink', server_config, make_message(1))
+
+    assert len(opened) == 2
+    assert opened[0].sock is None
+    assert smtp_sink.counters['messages'] == 2
+    assert [server for server, _, _ in simulator.smtp_sessions['sink']] == [opened[1]]
+    simulator.close_smtp_sessions()
+
+
+def test_session_limit_replies_are_recognised(make_simulator):
+    simulator = make_simulator()
+
+    assert simulator.is_smtp_session_limit(smtplib.SMTPDataError(421, b'Service closing'))
+    assert simulator.is_smtp_session_limit(smtplib.SMTPDataError(452, 'Too many recipients this session'))
+    assert not simulator.is_smtp_session_limit(smtplib.SMTPDataError(451, b'Temporary local problem'))
+    assert not simulator.is_smtp_session_limit(smtplib.SMTPDataError(554, b'Too many hops'))
+
+
+def test_idle_sessions_are_probed_and_expired(make_simulator, smtp_sink, monkeypatch):
+    simulator, server_config, opened = pool_simulator(make_simulator, smtp_sink, monkeypatch,
+                                                      noop_after_seconds=30, idle_timeout_seconds=120)
+    server, _ = simulator.checkout_smtp_session('sink', server_config)
+    simulator.release_smtp_session('sink', server, 1)
+
+    noops = []
+    noop = server.noop
+    monkeypatch.setattr(server, 'noop', lambda: noops.append(1) or noop())
+
+    assert simulator.checkout_smtp_session('sink', server_config) == (server, 1)
+    assert noops == []
+    simulator.release_smtp_session('sink', server, 1)
+
+    age_pooled_sessions(simulator, 60)
+    assert simulator.checkout_smtp_session('sink', server_config) == (server, 1)
+    assert noops == [1]
+    simulator.release_smtp_session('sink', server, 1)
+
+    age_pooled_sessions(simulator, 300)
+    replacement, sent_count = simulator.checkout_smtp_session('sink', server_config)
+    assert replacement is not server and sent_count == 0
+    assert server.sock is None and noops == [1]
+    simulator.close_smtp_session(replacement)
+
+
+def test_dead_idle_session_is_replaced(make_simulator, smtp_sink, monkeypatch):
+    simulator, server_config, opened = pool_simulator(make_simulator, smtp_sink, monkeypatch, noop_after_seconds=30)
+    server, _ = simulator.checkout_smtp_session('sink', server_config)
+    simulator.release_smtp_session('sink', server, 1)
+    age_pooled_sessions(simulator, 60)
+    server.sock.shutdown(socket.SHUT_RDWR)
+
+    replacement, sent_count = simulator.checkout_smtp_session('sink', server_config)
+
+    assert replacement is not server and sent_count == 0
+    assert len(opened) == 2
+    simulator.close_smtp_session(replacement)
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+paramiko = pytest.importorskip('paramiko')
+
+from .ssh_server import StandInSSHServer  # noqa: E402
+
+
+@pytest.fixture
+def ssh_server(tmp_path):
+    server = StandInSSHServer(tmp_path)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_ssh_simulator(make_simulator, ssh_server):
+    simulators = []
+
+    def factory(servers=None, pool=None, output=None, commands=None):
+        session_pool = {'enabled': True, 'keepalive_seconds': 0, 'max_channels_per_host': 4,
+                        'max_parallel_servers': 4}
+        session_pool.update(pool or {})
+        simulator = make_simulator(ssh_config={
+            'enabled': True,
+            'servers': servers or [ssh_server.server_config()],
+            'commands': commands or ['echo hi'],
+            'commands_per_session': [1, 1],
+            'command_delay_seconds': [0, 0],
+            'session_pool': session_pool,
+            'output': output or {'capture_kb': 256, 'chunk_kb': 32, 'command_timeout_seconds': 30}
+        }, scheduled_tasks={'enabled': True})
+        simulator.is_running = True
+        simulators.append(simulator)
+        return simulator
+
+    yield factory
+    for simulator in simulators:
+        simulator.close_ssh_clients()
+
+
+def test_pooled_client_is_reused(make_ssh_simulator, ssh_server):
+    simulator = make_ssh_simulator()
+    server_config = ssh_server.server_config()
+
+    first = simulator.get_ssh_client(server_config)
+    assert simulator.get_ssh_client(dict(server_config)) is first
+    assert ssh_server.stats['transports'] == 1
+
+
+def test_dead_transport_is_replaced(make_ssh_simulator, ssh_server):
+    simulator = make_ssh_simulator()
+    server_config = ssh_server.server_config()
+
+    first = simulator.get_ssh_client(server_config)
+    first.get_transport().close()
+    second = simulator.get_ssh_client(server_config)
+
+    assert second is not first
+    assert second.get_transport().is_active()
+    assert ssh_server.stats['transports'] == 2
+
+
+def test_concurrent_checkouts_open_one_transport_per_key(make_ssh_simulator, ssh_server):
+    simulator = make_ssh_simulator()
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(simulator.get_ssh_client(ssh_server.server_config())))
+               for _ in range(8)]
+    threads.append(threading.Thread(
+        target=lambda: clients.append(simulator.get_ssh_client(ssh_server.server_config('other')))))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert len(clients) == 9
+    assert len({id(client) for client in clients}) == 2
+    assert ssh_server.stats['transports'] == 2
+
+
+def test_pool_can_be_disabled(make_ssh_simulator, ssh_server):
+    simulator = make_ssh_simulator(pool={'enabled': False})
+    first = simulator.get_ssh_client(ssh_server.server_config())
+    second = simulator.get_ssh_client(ssh_server.server_config())
+    try:
+        assert first is not second
+        assert simulator.ssh_clients == {}
+    finally:
+        first.close()
+        second.close()
+
+
+def test_commands_fan_out_over_channels_of_one_transport(make_ssh_simulator, ssh_server):
+    simulator = make_ssh_simulator(pool={'max_channels_per_host': 4})
+
+    started = time.monotonic()
+    simulator.ssh_server_session(ssh_server.server_config(), ['sleep 0.5'] * 4)
+
+    assert time.monotonic() - started < 1.5
+    assert ssh_server.stats['max_running'] == 4
+    assert ssh_server.stats['transports'] == 1
+    assert len(simulator.query_ssh_commands()) == 4
+
+
+def test_channel_fan_out_is_capped_per_host(make_ssh_simulator, ssh_server):
+    simulator = make_ssh_simulator(pool={'max_channels_per_host': 2})
+    simulator.ssh_server_session(ssh_server.server_config(), ['sleep 0.2'] * 6)
+
+    assert ssh_server.stats['max_running'] == 2
+    assert ssh_server.stats['channels'] == 6
+
+
+def test_servers_run_in_parallel(make_ssh_simulator, ssh_server):
+    servers = [ssh_server.server_config(name) for name in ('a', 'b', 'c')]
+    simulator = make_ssh_simulator(servers=servers, commands=['sleep 0.5'])
+
+    started = time.monotonic()
+    simulator.ssh_operations()
+
+    assert time.monotonic() - started < 1.5
+    assert ssh_server.stats['transports'] == 3
+    assert sorted(row['username'] for row in simulator.query_ssh_commands()) == ['a', 'b', 'c']
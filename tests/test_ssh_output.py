@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+paramiko = pytest.importorskip('paramiko')
+
+from .ssh_server import StandInSSHServer  # noqa: E402
+
+
+@pytest.fixture
+def ssh_run(make_simulator, tmp_path):
+    server = StandInSSHServer(tmp_path)
+    simulators = []
+
+    def run(command, **output):
+        settings = {'capture_kb': 256, 'chunk_kb': 32, 'command_timeout_seconds': 30}
+        settings.update(output)
+        simulator = make_simulator(ssh_config={'servers': [], 'output': settings,
+                                               'session_pool': {'keepalive_seconds': 0}})
+        simulators.append(simulator)
+        server_config = server.server_config()
+        simulator.ssh_run_command(simulator.get_ssh_client(server_config), server_config, command)
+        return simulator.query_ssh_commands(include_output=True)[0]
+
+    yield run
+    for simulator in simulators:
+        simulator.close_ssh_clients()
+    server.close()
+
+
+def test_output_round_trips_through_the_results_store(ssh_run):
+    row = ssh_run('echo hello world')
+
+    assert row['stdout'] == 'hello world\n'
+    assert row['stderr'] == ''
+    assert row['exit_status'] == 0
+    assert row['stdout_bytes'] == 12
+    assert not row['truncated'] and not row['timed_out']
+
+
+def test_capture_is_capped_but_totals_are_counted(ssh_run):
+    row = ssh_run('big 300000 5000', capture_kb=1, chunk_kb=1)
+
+    assert row['stdout'] == 'o' * 1024
+    assert row['stderr'] == 'e' * 1024
+    assert row['stdout_bytes'] == 300000
+    assert row['stderr_bytes'] == 5000
+    assert row['truncated'] == 1
+
+
+def test_exit_status_is_recorded(ssh_run):
+    assert ssh_run('exit 3')['exit_status'] == 3
+
+
+def test_timeout_leaves_exit_status_empty(ssh_run):
+    started = time.monotonic()
+    row = ssh_run('sleep 5', command_timeout_seconds=0.5)
+
+    assert row['timed_out'] == 1
+    assert row['exit_status'] is None
+    assert 0.5 <= row['duration'] < 2
+    assert time.monotonic() - started < 3
+
+
+def test_idle_command_does_not_spin(ssh_run, monkeypatch):
+    import select
+
+    calls = []
+    real_select = select.select
+    monkeypatch.setattr(select, 'select', lambda *args: calls.append(args) or real_select(*args))
+
+    ssh_run('sleep 1')
+
+    assert len(calls) < 5
@@ -0,0 +1,32 @@
+import threading
+
+
+def test_status_is_consistent_while_tasks_run_concurrently(make_simulator, monkeypatch):
+    simulator = make_simulator()
+    monkeypatch.setattr(simulator, 'get_task_methods', lambda: {'noop': lambda: None})
+    stop = threading.Event()
+    errors = []
+
+    def worker():
+        while not stop.is_set():
+            simulator.run_task('noop')
+
+    def reader():
+        try:
+            while not stop.is_set():
+                simulator.get_status()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)] + [threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    stop.wait(1)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert not errors
+    assert not simulator.current_tasks
+    assert simulator.get_status()['recent_tasks']
@@ -0,0 +1,72 @@
+import pytest
+
+from user_behavior_simulator import simulator as simulator_module
+from user_behavior_simulator.simulator import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(simulator_module, 'time', fake)
+    return fake
+
+
+def test_burst_is_free_then_deficit_sleeps(clock):
+    bucket = TokenBucket(1000, burst_bytes=2000)
+
+    bucket.consume(2000)
+    assert clock.sleeps == []
+
+    bucket.consume(500)
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_sustained_rate_matches_configured_rate(clock):
+    bucket = TokenBucket(10000, burst_bytes=10000)
+    start = clock.now
+
+    for _ in range(100):
+        bucket.consume(5000)
+
+    elapsed = clock.now - start
+    assert (100 * 5000 - 10000) / elapsed == pytest.approx(10000, rel=0.01)
+
+
+def test_zero_rate_is_unshaped_but_counted(clock):
+    bucket = TokenBucket(0)
+
+    bucket.consume(10 ** 9)
+
+    assert clock.sleeps == []
+    assert bucket.total_bytes == 10 ** 9
+
+
+def test_set_rate_clamps_tokens_to_new_capacity(clock):
+    bucket = TokenBucket(100000, burst_bytes=100000)
+    bucket.set_rate(1000, burst_bytes=1000)
+
+    bucket.consume(2000)
+
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_take_window_resets_byte_counter(clock):
+    bucket = TokenBucket(0)
+    bucket.consume(300)
+    clock.now += 2
+
+    assert bucket.take_window() == (300, pytest.approx(2))
+    assert bucket.take_window()[0] == 0
@@ -1,4 +1,5 @@
 import sys
+import time
 import argparse
 import os
 from .simulator import UserBehaviorSimulator
@@ -14,9 +15,24 @@ def main():
     parser.add_argument('--create-config', 
                        action='store_true',
                        help='Create a default configuration file')
+    parser.add_argument('--smtp-sink',
+                       metavar='PORT',
+                       type=int,
+                       help='Run a local SMTP sink on PORT for testing email campaigns')
     
     args = parser.parse_args()
     
+    if args.smtp_sink:
+        server = UserBehaviorSimulator.start_smtp_sink('127.0.0.1', args.smtp_sink)
+        try:
+            while True:
+                time.sleep(10)
+                print(f"SMTP sink: {server.counters['messages']} messages, {server.counters['bytes']} bytes received")
+        except KeyboardInterrupt:
+            server.shutdown()
+            print("\nSMTP sink stopped.")
+        return
+    
     if args.create_config:
         if os.path.exists(args.config):
             print(f"Configuration file '{args.config}' already exists.")
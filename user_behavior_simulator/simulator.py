@@ -14,6 +14,700 @@ from urllib.parse import urlparse
 import tempfile
 import shutil
 import re
+import bisect
+import heapq
+import ipaddress
+import math
+import selectors
+import sqlite3
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class TokenBucket:
+    def __init__(self, rate_bytes_per_second, burst_bytes=None):
+        self.rate = float(rate_bytes_per_second)
+        self.capacity = float(burst_bytes or max(self.rate, 65536))
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        self.window_bytes = 0
+        self.window_start = self.timestamp
+
+    def set_rate(self, rate_bytes_per_second, burst_bytes=None):
+        with self.lock:
+            self.rate = float(rate_bytes_per_second)
+            self.capacity = float(burst_bytes or max(self.rate, 65536))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def consume(self, amount):
+        with self.lock:
+            self.total_bytes += amount
+            self.window_bytes += amount
+
+            if self.rate <= 0:
+                return
+
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            self.tokens -= amount
+            deficit = -self.tokens
+            rate = self.rate
+
+        if deficit > 0:
+            time.sleep(deficit / rate)
+
+    def take_window(self):
+        with self.lock:
+            now = time.monotonic()
+            window_bytes, elapsed = self.window_bytes, now - self.window_start
+            self.window_bytes = 0
+            self.window_start = now
+        return window_bytes, elapsed
+
+
+class IPRangeSet:
+    def __init__(self, specs=(), exclude=()):
+        included = self.merge_segments([self.parse_spec(spec) for spec in specs])
+        excluded = self.merge_segments([self.parse_spec(spec) for spec in exclude])
+        self.segments = self.subtract_segments(included, excluded)
+
+        self.offsets = []
+        total = 0
+        for version, start, end in self.segments:
+            self.offsets.append(total)
+            total += end - start + 1
+        self.size = total
+
+    @staticmethod
+    def parse_spec(spec):
+        if isinstance(spec, dict):
+            start = ipaddress.ip_address(spec['start'])
+            end = ipaddress.ip_address(spec['end'])
+        elif '/' in spec:
+            network = ipaddress.ip_network(spec.strip(), strict=False)
+            start, end = network.network_address, network.broadcast_address
+            if network.num_addresses > 2:
+                start += 1
+                if network.version == 4:
+                    end -= 1
+        elif '-' in spec:
+            start_text, end_text = spec.split('-', 1)
+            start = ipaddress.ip_address(start_text.strip())
+            end = ipaddress.ip_address(end_text.strip())
+        else:
+            start = end = ipaddress.ip_address(spec.strip())
+
+        if start.version != end.version:
+            raise ValueError(f"IP range {spec} mixes IPv4 and IPv6 addresses")
+        if start > end:
+            start, end = end, start
+        return start.version, int(start), int(end)
+
+    @staticmethod
+    def merge_segments(segments):
+        merged = []
+        for version, start, end in sorted(segments):
+            if merged and merged[-1][0] == version and start <= merged[-1][2] + 1:
+                if end > merged[-1][2]:
+                    merged[-1] = (version, merged[-1][1], end)
+            else:
+                merged.append((version, start, end))
+        return merged
+
+    @staticmethod
+    def subtract_segments(included, excluded):
+        result = []
+        for version, start, end in included:
+            current = start
+            for ex_version, ex_start, ex_end in excluded:
+                if ex_version != version or ex_end < current or ex_start > end:
+                    continue
+                if ex_start > current:
+                    result.append((version, current, ex_start - 1))
+                current = ex_end + 1
+                if current > end:
+                    break
+            if current <= end:
+                result.append((version, current, end))
+        return result
+
+    def address_at(self, index):
+        if index < 0:
+            index += self.size
+        if index < 0 or index >= self.size:
+            raise IndexError("IP range index out of range")
+
+        position = bisect.bisect_right(self.offsets, index) - 1
+        version, start, end = self.segments[position]
+        value = start + index - self.offsets[position]
+        if version == 4:
+            return str(ipaddress.IPv4Address(value))
+        return str(ipaddress.IPv6Address(value))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.address_at(i) for i in range(*index.indices(self.size))]
+        return self.address_at(index)
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self.address_at(index)
+
+    def __contains__(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+
+        value = int(address)
+        for version, start, end in self.segments:
+            if version == address.version and start <= value <= end:
+                return True
+        return False
+
+    def sample(self, k):
+        k = min(k, self.size)
+        if k * 2 > self.size:
+            return [self.address_at(i) for i in random.sample(range(self.size), k)]
+
+        chosen = set()
+        while len(chosen) < k:
+            chosen.add(random.randrange(self.size))
+        return [self.address_at(i) for i in chosen]
+
+
+class GeneratedPayload:
+    block_size = 1024 * 1024
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.position = 0
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.block = random.Random(self.seed).getrandbits(self.block_size * 8).to_bytes(self.block_size, 'little')
+
+    def read(self, n=-1):
+        remaining = self.size - self.position
+        if n is None or n < 0 or n > remaining:
+            n = remaining
+        if n <= 0:
+            return b''
+
+        start = self.position % self.block_size
+        if start + n <= self.block_size:
+            data = self.block[start:start + n]
+        else:
+            parts = []
+            needed = n
+            while needed > 0:
+                piece = self.block[start:start + needed]
+                parts.append(piece)
+                needed -= len(piece)
+                start = 0
+            data = b''.join(parts)
+
+        self.position += n
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            offset += self.size
+        self.position = max(0, min(offset, self.size))
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+class ProcessSupervisor:
+    def __init__(self, signal_process, grace_seconds=2.0, capture_bytes=0, poll_interval=0.5, on_finish=None):
+        self.signal_process = signal_process
+        self.on_finish = on_finish
+        self.grace_seconds = grace_seconds
+        self.capture_bytes = capture_bytes
+        self.poll_interval = poll_interval
+        self.selector = selectors.DefaultSelector()
+        self.entries = {}
+        self.timers = []
+        self.sequence = 0
+
+    def add(self, process, app, duration, started=None):
+        if started is None:
+            started = time.monotonic()
+        self.sequence += 1
+        entry = {
+            'id': self.sequence,
+            'process': process,
+            'app': app,
+            'kill_at': None,
+            'pidfd': None,
+            'output': bytearray(),
+            'output_bytes': 0,
+            'rusage': None,
+            'started': started
+        }
+
+        if hasattr(os, 'pidfd_open'):
+            try:
+                entry['pidfd'] = os.pidfd_open(process.pid)
+                self.selector.register(entry['pidfd'], selectors.EVENT_READ, ('exit', entry))
+            except OSError:
+                entry['pidfd'] = None
+
+        if process.stdout is not None:
+            os.set_blocking(process.stdout.fileno(), False)
+            self.selector.register(process.stdout, selectors.EVENT_READ, ('output', entry))
+
+        self.entries[entry['id']] = entry
+        self.schedule(started + duration, entry, 'terminate')
+
+    def schedule(self, when, entry, action):
+        heapq.heappush(self.timers, (when, entry['id'], action))
+
+    def terminate(self, entry, now):
+        if entry['kill_at'] is not None:
+            return
+        entry['kill_at'] = now + self.grace_seconds
+        self.schedule(entry['kill_at'], entry, 'kill')
+        self.signal_process(entry['process'], entry['app'], force=False)
+
+    def reap(self, entry):
+        process = entry['process']
+        if process.returncode is not None:
+            return True
+        if not hasattr(os, 'wait4'):
+            return process.poll() is not None
+
+        try:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        except ChildProcessError:
+            return process.poll() is not None
+        if pid == 0:
+            return False
+
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+        entry['rusage'] = rusage
+        return True
+
+    def read_output(self, entry):
+        stream = entry['process'].stdout
+        while True:
+            try:
+                data = os.read(stream.fileno(), 65536)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b''
+
+            if not data:
+                self.selector.unregister(stream)
+                stream.close()
+                return
+
+            entry['output_bytes'] += len(data)
+            room = self.capture_bytes - len(entry['output'])
+            if room > 0:
+                entry['output'] += data[:room]
+
+    def finish(self, entry):
+        process = entry['process']
+        if process.stdout is not None and not process.stdout.closed:
+            self.read_output(entry)
+            if not process.stdout.closed:
+                self.selector.unregister(process.stdout)
+                process.stdout.close()
+
+        if entry['pidfd'] is not None:
+            self.selector.unregister(entry['pidfd'])
+            os.close(entry['pidfd'])
+
+        del self.entries[entry['id']]
+        app_name = entry['app'].get('name', entry['app']) if isinstance(entry['app'], dict) else entry['app']
+        details = f"exit code {process.returncode}"
+        if entry['rusage'] is not None:
+            details += f", {entry['rusage'].ru_utime + entry['rusage'].ru_stime:.1f} CPU-s, peak RSS {entry['rusage'].ru_maxrss // 1024} MB"
+        if entry['output_bytes']:
+            first_line = entry['output'].split(b'\n', 1)[0].decode('utf-8', errors='replace')[:120]
+            details += f", {entry['output_bytes']} bytes of output: {first_line}"
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Closed {app_name} ({details})")
+        if self.on_finish:
+            self.on_finish(entry)
+
+    def run(self, should_continue):
+        while self.entries:
+            now = time.monotonic()
+            if not should_continue():
+                for entry in list(self.entries.values()):
+                    self.terminate(entry, now)
+
+            while self.timers and self.timers[0][0] <= now:
+                _, entry_id, action = heapq.heappop(self.timers)
+                entry = self.entries.get(entry_id)
+                if entry is None:
+                    continue
+                if action == 'terminate':
+                    self.terminate(entry, now)
+                elif not self.reap(entry):
+                    self.signal_process(entry['process'], entry['app'], force=True)
+
+            polling = False
+            for entry in list(self.entries.values()):
+                if entry['pidfd'] is None:
+                    polling = True
+                    if self.reap(entry):
+                        self.finish(entry)
+
+            timeout = 1.0
+            if self.timers:
+                timeout = min(timeout, max(0.0, self.timers[0][0] - now))
+            if polling:
+                timeout = min(timeout, self.poll_interval)
+
+            if not self.selector.get_map():
+                time.sleep(timeout)
+                continue
+
+            for key, _ in self.selector.select(timeout):
+                kind, entry = key.data
+                if entry['id'] not in self.entries:
+                    continue
+                if kind == 'output':
+                    self.read_output(entry)
+                elif self.reap(entry):
+                    self.finish(entry)
+
+        self.selector.close()
+
+
+class AliasTable:
+    def __init__(self, items, weights):
+        total = float(sum(weights))
+        if not items or total <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+
+        count = len(items)
+        self.items = list(items)
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+
+        scaled = [weight * count / total for weight in weights]
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def sample(self, rng=random):
+        index = int(rng.random() * len(self.items))
+        if rng.random() < self.probability[index]:
+            return self.items[index]
+        return self.items[self.alias[index]]
+
+
+class ActivityModel:
+    def __init__(self, tasks, weights=None, transitions=None, dwell=None, default_weight=1.0):
+        weights = weights or {}
+        self.tasks = list(tasks)
+        self.base = [max(0.0, float(weights.get(task, default_weight))) for task in self.tasks]
+        if not any(self.base):
+            self.base = [1.0] * len(self.tasks)
+
+        self.initial = AliasTable(self.tasks, self.base)
+        self.rows = {}
+        self.transitions = {}
+        for task, row in (transitions or {}).items():
+            if task not in self.tasks:
+                continue
+            merged = [max(0.0, float(row.get(target, self.base[index]))) for index, target in enumerate(self.tasks)]
+            if any(merged):
+                self.rows[task] = merged
+                self.transitions[task] = AliasTable(self.tasks, merged)
+
+        self.dwell = dwell or {}
+
+    def next_task(self, current=None, rng=random):
+        return self.transitions.get(current, self.initial).sample(rng)
+
+    def sample_dwell(self, task, rng=random):
+        spec = self.dwell.get(task) or self.dwell.get('default')
+        if not spec:
+            return None
+
+        distribution = spec.get('distribution', 'uniform')
+        if distribution == 'fixed':
+            seconds = spec.get('seconds', 0)
+        elif distribution == 'exponential':
+            seconds = rng.expovariate(1.0 / max(spec.get('mean_seconds', 60), 1e-9))
+        elif distribution == 'lognormal':
+            seconds = rng.lognormvariate(math.log(max(spec.get('median_seconds', 60), 1e-9)), spec.get('sigma', 0.5))
+        elif distribution == 'normal':
+            seconds = rng.gauss(spec.get('mean_seconds', 60), spec.get('stddev_seconds', 10))
+        else:
+            seconds = rng.uniform(spec.get('min_seconds', 60), spec.get('max_seconds', 300))
+
+        seconds = max(0.0, seconds)
+        if spec.get('max_seconds') and distribution != 'uniform':
+            seconds = min(seconds, spec['max_seconds'])
+        return seconds
+
+    def stationary_mix(self, iterations=500):
+        total = sum(self.base)
+        initial = [weight / total for weight in self.base]
+        rows = {}
+        for task in self.tasks:
+            row = self.rows.get(task, self.base)
+            row_total = sum(row)
+            rows[task] = [weight / row_total for weight in row]
+
+        mix = initial
+        for _ in range(iterations):
+            updated = [0.0] * len(self.tasks)
+            for index, task in enumerate(self.tasks):
+                share = mix[index]
+                if share:
+                    for target, probability in enumerate(rows[task]):
+                        updated[target] += share * probability
+            mix = updated
+
+        return dict(zip(self.tasks, mix))
+
+
+class MetricsRegistry:
+    def __init__(self, retention_seconds=3600):
+        self.retention_seconds = int(retention_seconds)
+        self.series = {}
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, value=1.0):
+        second = int(time.time())
+        with self.lock:
+            buckets = self.series.get(name)
+            if buckets is None:
+                buckets = self.series[name] = deque()
+
+            if buckets and buckets[-1][0] == second:
+                buckets[-1][1] += value
+            else:
+                buckets.append([second, value])
+                while buckets[0][0] <= second - self.retention_seconds:
+                    buckets.popleft()
+
+            self.totals[name] = self.totals.get(name, 0) + value
+
+    def restore(self, totals):
+        with self.lock:
+            for name, value in totals.items():
+                self.totals[name] = self.totals.get(name, 0) + value
+
+    def total(self, name, window_seconds):
+        cutoff = time.time() - window_seconds
+        amount = 0.0
+        with self.lock:
+            for second, value in reversed(self.series.get(name, ())):
+                if second < cutoff:
+                    break
+                amount += value
+        return amount
+
+    def rate(self, name, window_seconds=60):
+        return self.total(name, window_seconds) / window_seconds if window_seconds > 0 else 0.0
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.totals)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.cpu_stacks = {}
+        self.wall_stacks = {}
+        self.samples = 0
+        self.started = None
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.cpu_stacks = {}
+        self.wall_stacks = {}
+        self.samples = 0
+        self.started = time.time()
+        self.running = True
+        self.thread = threading.Thread(target=self.sample_loop, name='sampling-profiler')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def thread_cpu_time(self, ident):
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return None
+
+    def sample_loop(self):
+        own_ident = threading.get_ident()
+        cpu_times = {}
+
+        while self.running:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+
+                cpu_time = self.thread_cpu_time(ident)
+                on_cpu = cpu_time is None or cpu_time > cpu_times.get(ident, cpu_time)
+                if cpu_time is not None:
+                    cpu_times[ident] = cpu_time
+
+                self.wall_stacks[key] = self.wall_stacks.get(key, 0) + 1
+                if on_cpu:
+                    self.cpu_stacks[key] = self.cpu_stacks.get(key, 0) + 1
+
+            for ident in set(cpu_times) - set(frames):
+                del cpu_times[ident]
+            self.samples += 1
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        return {'samples': self.samples, 'seconds': time.time() - (self.started or time.time())}
+
+    def write_folded(self, path, stacks):
+        with open(path, 'w') as f:
+            for key, count in sorted(stacks.items(), key=lambda item: item[1], reverse=True):
+                f.write(f"{key} {count}\n")
+
+
+class IMAPIdleConnection:
+    # imaplib has no IDLE support. This is the only code that relies on its
+    # internals: _new_tag, tagged_commands and the buffered reader in mail.file.
+    # imaplib keeps its reader for every normal command; only the IDLE phase
+    # reads the raw socket, through this object's buffer.
+    def __init__(self, mail, timeout=30):
+        self.mail = mail
+        self.sock = mail.sock
+        self.timeout = timeout
+        self.sock.settimeout(timeout)
+        self.buffer = b''
+        self.tag = None
+
+    def set_blocking(self, blocking):
+        self.sock.settimeout(self.timeout if blocking else 0.0)
+
+    def readline(self):
+        index = self.buffer.find(b'\n')
+        if index >= 0:
+            line, self.buffer = self.buffer[:index + 1], self.buffer[index + 1:]
+            return line
+        line, self.buffer = self.buffer + self.mail.readline(), b''
+        return line
+
+    def take_buffered(self):
+        # Move whatever imaplib's reader already pulled off the socket into our
+        # buffer, without blocking, before switching to raw socket reads.
+        import ssl
+
+        self.set_blocking(False)
+        try:
+            pending = self.mail.file.peek()
+        except (BlockingIOError, ssl.SSLWantReadError):
+            pending = b''
+        if pending:
+            self.buffer += self.mail.file.read(len(pending))
+
+    def start(self, on_line):
+        tag = self.mail._new_tag()
+        self.mail.send(tag + b' IDLE\r\n')
+
+        while True:
+            line = self.readline()
+            if not line:
+                raise self.mail.abort("connection closed while entering IDLE")
+            if line.startswith(b'+'):
+                break
+            if line.startswith(tag):
+                self.mail.tagged_commands.pop(tag, None)
+                raise self.mail.error(f"IDLE rejected: {line.decode('utf-8', errors='ignore').strip()}")
+            on_line(line)
+
+        self.tag = tag
+        # Responses that arrived with the continuation (in imaplib's buffer or
+        # already decrypted inside the SSL object) will not wake the selector.
+        self.take_buffered()
+        self.read_available(on_line)
+
+    def done(self, on_line):
+        self.set_blocking(True)
+        self.mail.send(b'DONE\r\n')
+
+        while True:
+            line = self.readline()
+            if not line:
+                raise self.mail.abort("connection closed while leaving IDLE")
+            if line.startswith(self.tag):
+                break
+            on_line(line)
+
+        self.mail.tagged_commands.pop(self.tag, None)
+        self.tag = None
+
+    def read_available(self, on_line):
+        import ssl
+
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, ssl.SSLWantReadError):
+                break
+            if not data:
+                raise self.mail.abort("connection closed during IDLE")
+            self.buffer += data
+
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            on_line(line + b'\n')
+
+    def close(self):
+        if self.tag is None:
+            return
+        try:
+            self.set_blocking(True)
+            self.mail.send(b'DONE\r\n')
+        except Exception:
+            pass
+        self.tag = None
 
 
 class UserBehaviorSimulator:
@@ -22,6 +716,59 @@ class UserBehaviorSimulator:
         self.config = self.load_config(config_file)
         self.is_running = False
         self.threads = []
+        self.reachability_cache = OrderedDict()
+        self.reachability_lock = threading.Lock()
+        self.icmp_unavailable = False
+        self.persona_context = threading.local()
+        self.bandwidth_shapers = {}
+        self.bandwidth_lock = threading.Lock()
+        self.results_db = None
+        self.results_db_lock = threading.Lock()
+        self.results_db_writes = 0
+        self.ftp_sessions = {}
+        self.ftp_listing_cache = {}
+        self.ftp_sessions_lock = threading.Lock()
+        self.smtp_sessions = {}
+        self.smtp_sessions_lock = threading.Lock()
+        self.imap_sessions = {}
+        self.imap_sessions_lock = threading.Lock()
+        self.ssh_clients = {}
+        self.ssh_connect_locks = {}
+        self.ssh_clients_lock = threading.Lock()
+        self.app_catalog = None
+        self.app_catalog_lock = threading.Lock()
+        self.app_cgroups = {}
+        self.app_cgroups_lock = threading.Lock()
+        self.activity_models = {}
+        self.activity_models_lock = threading.Lock()
+        self.metrics = MetricsRegistry()
+        self.think_multipliers = {}
+        self.load_concurrency = 0
+        self.load_status = {}
+        self.load_control_lock = threading.Lock()
+        self.background_pool = None
+        self.background_tasks = {}
+        self.persona_semaphores = {}
+        self.background_lock = threading.Lock()
+        self.state_db = None
+        self.state_db_lock = threading.Lock()
+        self.visited_urls = deque(maxlen=self.config.get('checkpoint', {}).get('visited_urls', 500))
+        self.visited_urls_lock = threading.Lock()
+        self.profiler = None
+        self.task_timings = None
+        self.task_timings_started = None
+        self.profiling_lock = threading.Lock()
+        self.profiling_requests = deque()
+        self.control_server = None
+        self.dashboard_server = None
+        self.started_at = None
+        self.current_tasks = {}
+        self.recent_tasks = deque(maxlen=self.config.get('dashboard', {}).get('recent_tasks', 500))
+        self.attachment_cache = OrderedDict()
+        self.attachment_cache_bytes = 0
+        self.attachment_cache_lock = threading.Lock()
+        self.attachment_stream_refs = {}
+        self.attachment_streams_evicted = set()
 
     def load_config(self, config_file):
         if os.path.exists(config_file):
@@ -69,6 +816,97 @@ class UserBehaviorSimulator:
             "ssh_config": {"enabled": False}
         }
 
+    def get_persona_name(self):
+        return getattr(self.persona_context, 'name', None) or self.config.get('persona', 'default')
+
+    def run_as_persona(self, persona, func, *args, **kwargs):
+        previous = getattr(self.persona_context, 'name', None)
+        self.persona_context.name = persona
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.persona_context.name = previous
+
+    def get_bandwidth_target(self, persona, protocol):
+        shaping_config = self.config.get('bandwidth_shaping', {})
+        persona_config = shaping_config.get('personas', {}).get(persona, {})
+        base_kbps = persona_config.get(protocol, 0)
+        if not base_kbps:
+            return 0.0
+
+        curve = persona_config.get('time_of_day_curve') or shaping_config.get('time_of_day_curve')
+        multiplier = curve[datetime.now().hour % len(curve)] if curve else 1.0
+        return base_kbps * multiplier * 1024 / 8
+
+    def get_bandwidth_limiter(self, protocol):
+        if not self.config.get('bandwidth_shaping', {}).get('enabled', False):
+            return None
+
+        persona = self.get_persona_name()
+        key = (persona, protocol)
+        hour = datetime.now().hour
+
+        with self.bandwidth_lock:
+            entry = self.bandwidth_shapers.get(key)
+
+        if entry and entry[1] == hour:
+            return entry[0]
+
+        rate = self.get_bandwidth_target(persona, protocol)
+        if rate <= 0:
+            return None
+
+        burst_seconds = self.config['bandwidth_shaping'].get('burst_seconds', 1.0)
+        burst = max(rate * burst_seconds, 65536)
+
+        with self.bandwidth_lock:
+            entry = self.bandwidth_shapers.get(key)
+            if entry:
+                entry[0].set_rate(rate, burst)
+                limiter = entry[0]
+            else:
+                limiter = TokenBucket(rate, burst)
+            self.bandwidth_shapers[key] = (limiter, hour)
+
+        return limiter
+
+    def get_bandwidth_report(self):
+        with self.bandwidth_lock:
+            shapers = list(self.bandwidth_shapers.items())
+
+        report = []
+        for (persona, protocol), (limiter, hour) in shapers:
+            window_bytes, elapsed = limiter.take_window()
+            achieved_kbps = (window_bytes * 8 / 1024 / elapsed) if elapsed > 0 else 0.0
+            report.append({
+                'persona': persona,
+                'protocol': protocol,
+                'target_kbps': limiter.rate * 8 / 1024,
+                'achieved_kbps': achieved_kbps,
+                'window_seconds': elapsed,
+                'total_bytes': limiter.total_bytes
+            })
+        return report
+
+    def start_bandwidth_reporter(self):
+        def reporter():
+            interval = self.config.get('bandwidth_shaping', {}).get('report_interval_seconds', 300)
+            next_report = time.time() + interval
+
+            while self.is_running:
+                time.sleep(1)
+                if time.time() < next_report:
+                    continue
+                next_report = time.time() + interval
+
+                for entry in self.get_bandwidth_report():
+                    print(
+                        f"[{datetime.now().strftime('%H:%M:%S')}] Bandwidth {entry['persona']}/{entry['protocol']}: achieved {entry['achieved_kbps']:.1f} kbit/s vs target {entry['target_kbps']:.1f} kbit/s")
+
+        thread = threading.Thread(target=reporter)
+        thread.daemon = True
+        return thread
+
     def is_within_active_hours(self):
         if not self.config.get('active_hours', {}).get('enabled', False):
             return True
@@ -121,6 +959,10 @@ class UserBehaviorSimulator:
             system_apps = app_config.get('macos_system_apps', [])
 
         all_apps = available_apps + system_apps
+        if app_config.get('auto_discover', False):
+            configured_names = {app.get('name') for app in all_apps if isinstance(app, dict)}
+            all_apps += [app for app in self.discover_system_applications()
+                         if app.get('name') not in configured_names and not app.get('terminal')]
 
         if not all_apps:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] No applications configured for {current_os}")
@@ -138,10 +980,14 @@ class UserBehaviorSimulator:
                     process = self.launch_linux_app(app)
                 else:
                     process = self.launch_macos_app(app)
+                launched_at = time.monotonic()
 
                 if process:
                     run_duration = random.randint(*app_config.get('app_run_duration', [30, 300]))
-                    launched_processes.append((process, app, run_duration))
+                    wall_time = self.get_app_resource_limits(app).get('wall_time_seconds', 0)
+                    if wall_time:
+                        run_duration = min(run_duration, wall_time)
+                    launched_processes.append((process, app, run_duration, launched_at))
                     print(
                         f"[{datetime.now().strftime('%H:%M:%S')}] Launched {app}, will run for {run_duration} seconds")
 
@@ -163,28 +1009,24 @@ class UserBehaviorSimulator:
                 process = subprocess.Popen(
                     app['command'],
                     shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
             elif app.get('type') == 'executable':
                 process = subprocess.Popen(
                     app['path'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
             elif app.get('type') == 'system':
                 process = subprocess.Popen(
                     f"start {app['name']}",
                     shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
             else:
                 process = subprocess.Popen(
                     app,
                     shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
 
             return process
@@ -199,33 +1041,30 @@ class UserBehaviorSimulator:
                 process = subprocess.Popen(
                     app['command'],
                     shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    preexec_fn=os.setsid
+                    **self.get_app_stdio(),
+                    start_new_session=True
                 )
             elif app.get('type') == 'executable':
                 process = subprocess.Popen(
                     app['path'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    preexec_fn=os.setsid
+                    **self.get_app_stdio(),
+                    start_new_session=True
                 )
             elif app.get('type') == 'desktop':
                 process = subprocess.Popen(
                     ['gtk-launch', app['name']],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    preexec_fn=os.setsid
+                    **self.get_app_stdio(),
+                    start_new_session=True
                 )
             else:
                 process = subprocess.Popen(
                     app,
                     shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    preexec_fn=os.setsid
+                    **self.get_app_stdio(),
+                    start_new_session=True
                 )
 
+            self.apply_app_limits(process, app)
             return process
 
         except Exception as e:
@@ -237,21 +1076,18 @@ class UserBehaviorSimulator:
             if app.get('type') == 'application':
                 process = subprocess.Popen(
                     ['open', '-a', app['name']],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
             elif app.get('type') == 'command':
                 process = subprocess.Popen(
                     app['command'],
                     shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
             else:
                 process = subprocess.Popen(
                     ['open', '-a', app],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    **self.get_app_stdio()
                 )
 
             return process
@@ -260,122 +1096,464 @@ class UserBehaviorSimulator:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] macOS app launch error: {e}")
             return None
 
-    def manage_running_applications(self, launched_processes):
-        start_time = time.time()
+    def get_app_stdio(self):
+        capture_kb = self.config.get('app_execution', {}).get('capture_output_kb', 0)
+        if capture_kb and os.name != 'nt':
+            return {'stdin': subprocess.DEVNULL, 'stdout': subprocess.PIPE, 'stderr': subprocess.STDOUT}
+        return {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
 
-        while launched_processes and self.is_running:
-            current_time = time.time()
-
-            for i, (process, app_name, duration) in enumerate(launched_processes[:]):
-                elapsed = current_time - start_time
+    def manage_running_applications(self, launched_processes):
+        app_config = self.config.get('app_execution', {})
+        supervisor = ProcessSupervisor(
+            self.signal_application,
+            grace_seconds=app_config.get('terminate_grace_seconds', 2),
+            capture_bytes=int(app_config.get('capture_output_kb', 0) * 1024),
+            on_finish=self.record_app_run
+        )
 
-                if elapsed >= duration or process.poll() is not None:
-                    try:
-                        self.terminate_application(process, app_name)
-                        launched_processes.remove((process, app_name, duration))
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] Closed {app_name}")
-                    except Exception as e:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] Error closing {app_name}: {e}")
+        for process, app_name, duration, started in launched_processes:
+            supervisor.add(process, app_name, duration, started)
 
-            time.sleep(5)
+        supervisor.run(lambda: self.is_running)
 
-    def terminate_application(self, process, app_name):
+    def signal_application(self, process, app_name, force=False):
         try:
             current_os = platform.system()
 
             if current_os == "Windows":
-                process.terminate()
-                time.sleep(2)
-                if process.poll() is None:
+                if force:
                     process.kill()
-
-                if isinstance(app_name, dict) and app_name.get('type') == 'system':
-                    subprocess.run(f'taskkill /f /im {app_name["process_name"]}.exe', shell=True, capture_output=True)
+                    if isinstance(app_name, dict) and app_name.get('type') == 'system':
+                        subprocess.run(f'taskkill /f /im {app_name["process_name"]}.exe', shell=True,
+                                       capture_output=True)
+                else:
+                    process.terminate()
 
             elif current_os == "Linux":
                 import signal
                 try:
-                    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-                    time.sleep(2)
-                    if process.poll() is None:
-                        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+                    os.killpg(os.getpgid(process.pid), signal.SIGKILL if force else signal.SIGTERM)
                 except:
-                    process.terminate()
-                    time.sleep(2)
-                    if process.poll() is None:
+                    if force:
                         process.kill()
+                    else:
+                        process.terminate()
 
             else:
-                process.terminate()
-                time.sleep(2)
-                if process.poll() is None:
+                if force:
                     process.kill()
+                else:
+                    process.terminate()
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error terminating process: {e}")
 
-    def discover_system_applications(self):
-        current_os = platform.system()
-        discovered_apps = []
+    def get_app_resource_limits(self, app):
+        limits_config = self.config.get('app_execution', {}).get('resource_limits', {})
+        if not limits_config.get('enabled', False):
+            return {}
+
+        limits = dict(limits_config.get('app', {}))
+        app_name = app.get('name') if isinstance(app, dict) else app
+        limits.update(limits_config.get('apps', {}).get(app_name, {}))
+        if isinstance(app, dict):
+            limits.update(app.get('limits', {}))
+        return limits
 
+    def get_own_cgroup_dir(self):
         try:
-            if current_os == "Windows":
-                discovered_apps = self.discover_windows_apps()
-            elif current_os == "Linux":
-                discovered_apps = self.discover_linux_apps()
-            else:
-                discovered_apps = self.discover_macos_apps()
+            with open('/proc/self/cgroup', 'r') as f:
+                for line in f:
+                    if line.startswith('0::'):
+                        return os.path.join('/sys/fs/cgroup', line.strip()[3:].lstrip('/'))
+        except OSError:
+            pass
+        return None
+
+    def get_persona_cgroup(self, persona):
+        limits_config = self.config.get('app_execution', {}).get('resource_limits', {})
+        budgets = limits_config.get('persona_budgets', {})
+        budget = budgets.get(persona, budgets.get('default', {}))
+        if not limits_config.get('use_cgroups', True) or not any(budget.values()):
+            return None
+
+        with self.app_cgroups_lock:
+            if persona in self.app_cgroups:
+                return self.app_cgroups[persona]
+
+            root = limits_config.get('cgroup_root') or self.get_own_cgroup_dir()
+            path = None
+            try:
+                if not root or not os.path.exists(os.path.join(root, 'cgroup.controllers')):
+                    raise OSError("cgroup v2 hierarchy not available")
+
+                try:
+                    with open(os.path.join(root, 'cgroup.subtree_control'), 'w') as f:
+                        f.write("+cpu +memory +pids")
+                except OSError:
+                    pass
+
+                path = os.path.join(root, f"ubs-{persona}")
+                if not os.path.exists(path):
+                    os.makedirs(path)
+
+                settings = {}
+                if budget.get('cpu_percent'):
+                    settings['cpu.max'] = f"{int(budget['cpu_percent'] * 1000)} 100000"
+                if budget.get('memory_mb'):
+                    settings['memory.max'] = str(int(budget['memory_mb'] * 1024 * 1024))
+                if budget.get('max_processes'):
+                    settings['pids.max'] = str(int(budget['max_processes']))
+
+                for name, value in settings.items():
+                    with open(os.path.join(path, name), 'w') as f:
+                        f.write(value)
+
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Persona {persona} apps limited by cgroup {path}")
+
+            except OSError as e:
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] cgroup budget for persona {persona} unavailable ({e}), using per-app rlimits only")
+                path = None
+
+            self.app_cgroups[persona] = path
+            return path
+
+    def apply_app_limits(self, process, app):
+        # Limits are applied from the parent right after the fork instead of in a
+        # preexec_fn, which is not safe to run in a multi-threaded process.
+        limits_config = self.config.get('app_execution', {}).get('resource_limits', {})
+        if not limits_config.get('enabled', False):
+            return
+
+        limits = self.get_app_resource_limits(app)
+        cgroup = self.get_persona_cgroup(self.get_persona_name())
+        if cgroup:
+            try:
+                with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as f:
+                    f.write(str(process.pid))
+            except OSError:
+                pass
+
+        nice = limits.get('nice', 0)
+        if nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, process.pid, os.getpriority(os.PRIO_PROCESS, 0) + nice)
+            except OSError:
+                pass
+
+        import resource
+
+        if not hasattr(resource, 'prlimit'):
+            return
+
+        requested = [
+            (resource.RLIMIT_CPU, limits.get('cpu_seconds', 0), 5),
+            (resource.RLIMIT_AS, int(limits.get('memory_mb', 0) * 1024 * 1024), 0),
+            (resource.RLIMIT_NPROC, limits.get('max_processes', 0), 0)
+        ]
+        for resource_id, soft, headroom in requested:
+            if not soft:
+                continue
+            hard = soft + headroom
+            try:
+                _, current_hard = resource.prlimit(process.pid, resource_id)
+                if current_hard != resource.RLIM_INFINITY:
+                    soft, hard = min(soft, current_hard), min(hard, current_hard)
+                resource.prlimit(process.pid, resource_id, (soft, hard))
+            except (ValueError, OSError):
+                pass
 
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Discovered {len(discovered_apps)} applications")
-            return discovered_apps
+    def record_app_run(self, entry):
+        rusage = entry.get('rusage')
+        app = entry['app']
+        app_name = app.get('name', str(app)) if isinstance(app, dict) else str(app)
 
+        try:
+            self.store_results(
+                "INSERT INTO app_runs (ts, persona, app, exit_code, wall_seconds, cpu_seconds, peak_rss_kb, "
+                "output_bytes, terminated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(time.time(), self.get_persona_name(), app_name, entry['process'].returncode,
+                  time.monotonic() - entry['started'],
+                  rusage.ru_utime + rusage.ru_stime if rusage else None,
+                  rusage.ru_maxrss if rusage else None,
+                  entry['output_bytes'], int(entry['kill_at'] is not None))])
         except Exception as e:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error discovering applications: {e}")
-            return []
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error recording application run: {e}")
+
+    def get_app_catalog_path(self):
+        configured_path = self.config.get('app_execution', {}).get('catalog_path', '')
+        if configured_path:
+            return configured_path
+        return os.path.join(self.get_save_path("data"), "app_catalog.json")
+
+    def get_path_directories(self):
+        directories = []
+        for directory in os.environ.get('PATH', '').split(os.pathsep):
+            if directory and directory not in directories:
+                directories.append(directory)
+        return directories
+
+    def get_desktop_entry_directories(self):
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        data_dirs = os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share'
+
+        directories = []
+        for base in [data_home] + data_dirs.split(':'):
+            directory = os.path.join(base, 'applications')
+            if base and directory not in directories:
+                directories.append(directory)
+        return directories
+
+    def get_windows_program_directories(self):
+        return [
+            r"C:\Program Files",
+            r"C:\Program Files (x86)",
+            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Programs')
+        ]
+
+    def get_macos_application_directories(self):
+        return ['/Applications', '/System/Applications', os.path.expanduser('~/Applications')]
+
+    def get_discovery_sources(self):
+        current_os = platform.system()
+        if current_os == "Windows":
+            directories = self.get_path_directories() + self.get_windows_program_directories()
+        elif current_os == "Linux":
+            directories = self.get_path_directories() + self.get_desktop_entry_directories()
+        else:
+            directories = self.get_macos_application_directories()
+
+        sources = {}
+        for directory in directories:
+            try:
+                sources[directory] = os.stat(directory).st_mtime
+            except OSError:
+                sources[directory] = None
+        return sources
+
+    def build_path_index(self):
+        is_windows = platform.system() == "Windows"
+        extensions = [ext.lower() for ext in os.environ.get('PATHEXT', '.EXE;.BAT;.CMD').split(';') if ext]
+        index = {}
+
+        for directory in self.get_path_directories():
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+
+            for entry in entries:
+                name = entry.name.lower() if is_windows else entry.name
+                if name in index:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    if is_windows:
+                        if os.path.splitext(name)[1] not in extensions:
+                            continue
+                    elif not os.access(entry.path, os.X_OK):
+                        continue
+                except OSError:
+                    continue
+                index[name] = entry.path
+
+        return index
+
+    def parse_desktop_entry(self, path):
+        entry = {}
+        in_main_group = False
+
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('['):
+                    if in_main_group:
+                        break
+                    in_main_group = line == '[Desktop Entry]'
+                    continue
+                if in_main_group and '=' in line:
+                    key, value = line.split('=', 1)
+                    key = key.strip()
+                    if '[' not in key:
+                        entry.setdefault(key, value.strip())
+
+        return entry
+
+    def load_app_catalog(self, sources):
+        catalog_path = self.get_app_catalog_path()
+        if not os.path.exists(catalog_path):
+            return None
+
+        try:
+            with open(catalog_path, 'r') as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if catalog.get('platform') != platform.system() or catalog.get('sources') != sources:
+            return None
+        return catalog.get('apps', [])
+
+    def save_app_catalog(self, sources, apps):
+        catalog_path = self.get_app_catalog_path()
+        catalog_dir = os.path.dirname(catalog_path)
+
+        try:
+            if catalog_dir and not os.path.exists(catalog_dir):
+                os.makedirs(catalog_dir)
+
+            temp_path = f"{catalog_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({'platform': platform.system(), 'built': time.time(), 'sources': sources, 'apps': apps}, f)
+            os.replace(temp_path, catalog_path)
+        except OSError as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error saving application catalog: {e}")
+
+    def discover_system_applications(self):
+        current_os = platform.system()
+
+        with self.app_catalog_lock:
+            sources = self.get_discovery_sources()
+            if self.app_catalog is not None and self.app_catalog[0] == sources:
+                return self.app_catalog[1]
+
+            try:
+                discovered_apps = self.load_app_catalog(sources)
+                if discovered_apps is None:
+                    if current_os == "Windows":
+                        discovered_apps = self.discover_windows_apps()
+                    elif current_os == "Linux":
+                        discovered_apps = self.discover_linux_apps()
+                    else:
+                        discovered_apps = self.discover_macos_apps()
+
+                    self.save_app_catalog(sources, discovered_apps)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Discovered {len(discovered_apps)} applications")
+
+                self.app_catalog = (sources, discovered_apps)
+                return discovered_apps
+
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Error discovering applications: {e}")
+                return []
 
     def discover_windows_apps(self):
         apps = []
 
         try:
+            path_index = self.build_path_index()
             common_apps = [
                 'notepad.exe', 'calc.exe', 'mspaint.exe', 'wordpad.exe',
                 'explorer.exe', 'cmd.exe', 'powershell.exe'
             ]
 
             for app in common_apps:
-                apps.append({
-                    'type': 'command',
-                    'command': app,
-                    'name': app.replace('.exe', '')
-                })
-
-            program_paths = [
-                r"C:\Program Files",
-                r"C:\Program Files (x86)",
-                os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Programs')
-            ]
+                if app in path_index:
+                    apps.append({
+                        'type': 'command',
+                        'command': app,
+                        'name': app.replace('.exe', '')
+                    })
 
-            for path in program_paths:
+            for path in self.get_windows_program_directories():
                 if os.path.exists(path):
-                    for item in os.listdir(path)[:10]:
+                    for item in os.listdir(path):
                         item_path = os.path.join(path, item)
                         if os.path.isdir(item_path):
-                            for exe_file in os.listdir(item_path):
-                                if exe_file.endswith('.exe') and not exe_file.startswith('unins'):
+                            try:
+                                exe_files = os.listdir(item_path)
+                            except OSError:
+                                continue
+                            for exe_file in exe_files:
+                                if exe_file.lower().endswith('.exe') and not exe_file.lower().startswith('unins'):
                                     apps.append({
                                         'type': 'executable',
                                         'path': os.path.join(item_path, exe_file),
-                                        'name': exe_file.replace('.exe', '')
+                                        'name': exe_file[:-4]
                                     })
-                                    if len(apps) > 20:
-                                        break
-                        if len(apps) > 20:
-                            break
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Windows app discovery error: {e}")
 
-        return apps[:15]
+        return apps
+
+    def get_imap_server_key(self, server_config):
+        return (server_config['server'], server_config.get('port', 993 if server_config.get('use_ssl', True) else 143),
+                server_config['username'])
+
+    def open_imap_session(self, server_config):
+        import imaplib
+
+        if server_config.get('use_ssl', True):
+            mail = imaplib.IMAP4_SSL(server_config['server'], server_config.get('port', 993))
+        else:
+            mail = imaplib.IMAP4(server_config['server'], server_config.get('port', 143))
+
+        mail.login(server_config['username'], server_config['password'])
+        return mail
+
+    def close_imap_session(self, mail):
+        try:
+            mail.logout()
+        except Exception:
+            try:
+                mail.shutdown()
+            except Exception:
+                pass
+
+    def checkout_imap_session(self, server_config):
+        pool_config = self.config.get('imap_config', {}).get('session_pool', {})
+        if not pool_config.get('enabled', True):
+            return self.open_imap_session(server_config)
+
+        key = self.get_imap_server_key(server_config)
+        noop_after_seconds = pool_config.get('noop_after_seconds', 60)
+        idle_timeout_seconds = pool_config.get('idle_timeout_seconds', 900)
+
+        while True:
+            with self.imap_sessions_lock:
+                idle_sessions = self.imap_sessions.get(key, [])
+                if not idle_sessions:
+                    break
+                mail, last_used = idle_sessions.pop()
+
+            idle_time = time.time() - last_used
+            if idle_time > idle_timeout_seconds:
+                self.close_imap_session(mail)
+                continue
+            if idle_time < noop_after_seconds:
+                return mail
+
+            try:
+                if mail.noop()[0] == 'OK':
+                    return mail
+            except Exception:
+                pass
+            self.close_imap_session(mail)
+
+        return self.open_imap_session(server_config)
+
+    def release_imap_session(self, server_config, mail, broken=False):
+        pool_config = self.config.get('imap_config', {}).get('session_pool', {})
+
+        if broken or not pool_config.get('enabled', True) or not self.is_running:
+            self.close_imap_session(mail)
+            return
+
+        with self.imap_sessions_lock:
+            self.imap_sessions.setdefault(self.get_imap_server_key(server_config), []).append((mail, time.time()))
+
+    def close_imap_sessions(self):
+        with self.imap_sessions_lock:
+            sessions = [mail for idle_sessions in self.imap_sessions.values() for mail, _ in idle_sessions]
+            self.imap_sessions.clear()
+
+        for mail in sessions:
+            self.close_imap_session(mail)
 
     def imap_operations(self):
         if not self.config.get('imap_config', {}).get('enabled', False):
@@ -393,12 +1571,8 @@ class UserBehaviorSimulator:
 
             for server_config in servers:
                 try:
-                    if server_config.get('use_ssl', True):
-                        mail = imaplib.IMAP4_SSL(server_config['server'], server_config.get('port', 993))
-                    else:
-                        mail = imaplib.IMAP4(server_config['server'], server_config.get('port', 143))
-
-                    mail.login(server_config['username'], server_config['password'])
+                    mail = self.checkout_imap_session(server_config)
+                    broken = False
 
                     operations = imap_config.get('operations', ['list_folders', 'check_inbox', 'search_emails'])
                     selected_operations = random.sample(operations, min(operations_count, len(operations)))
@@ -425,11 +1599,14 @@ class UserBehaviorSimulator:
 
                             time.sleep(random.randint(5, 15))
 
+                        except imaplib.IMAP4.abort as e:
+                            print(f"[{datetime.now().strftime('%H:%M:%S')}] IMAP connection lost during {operation}: {e}")
+                            broken = True
+                            break
                         except Exception as e:
                             print(f"[{datetime.now().strftime('%H:%M:%S')}] IMAP operation {operation} error: {e}")
 
-                    mail.close()
-                    mail.logout()
+                    self.release_imap_session(server_config, mail, broken=broken)
 
                 except Exception as e:
                     print(
@@ -444,9 +1621,78 @@ class UserBehaviorSimulator:
         if not self.config.get('scheduled_tasks', {}).get('enabled', False):
             self.wait_between_tasks()
 
-    def imap_list_folders(self, mail, server_config):
-        try:
-            status, folders = mail.list()
+    def imap_message_set(self, message_ids):
+        numbers = sorted({int(msg_id) for msg_id in message_ids})
+        ranges = []
+        for number in numbers:
+            if ranges and number == ranges[-1][1] + 1:
+                ranges[-1][1] = number
+            else:
+                ranges.append([number, number])
+        return ','.join(str(start) if start == end else f"{start}:{end}" for start, end in ranges)
+
+    def imap_select(self, mail, folder='INBOX', readonly=False):
+        status, data = mail.select(folder, readonly=readonly)
+        if status != 'OK':
+            return None
+        return int(data[0]) if data and data[0] else 0
+
+    def imap_status(self, mail, folder, items=('MESSAGES', 'UNSEEN')):
+        status, data = mail.status(f'"{folder}"' if ' ' in folder else folder, f"({' '.join(items)})")
+        if status != 'OK' or not data or not data[0]:
+            return None
+
+        response = data[0].decode('utf-8', errors='ignore') if isinstance(data[0], bytes) else str(data[0])
+        match = re.search(r'\(([^)]*)\)\s*$', response)
+        if not match:
+            return None
+
+        fields = match.group(1).split()
+        return {fields[i].upper(): int(fields[i + 1]) for i in range(0, len(fields) - 1, 2)}
+
+    def imap_fetch_summaries(self, mail, message_ids, preview_bytes=500):
+        import email
+        from email.header import decode_header, make_header
+
+        if not message_ids:
+            return []
+
+        header_fields = 'FROM SUBJECT DATE'
+        status, data = mail.fetch(self.imap_message_set(message_ids),
+                                  f"(BODY.PEEK[HEADER.FIELDS ({header_fields})] BODY.PEEK[TEXT]<0.{preview_bytes}>)")
+        if status != 'OK':
+            return []
+
+        summaries = {}
+        current = None
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+
+            prefix = item[0].decode('utf-8', errors='ignore')
+            match = re.match(r'(\d+) \(', prefix)
+            if match:
+                current = summaries.setdefault(match.group(1), {'id': match.group(1)})
+            if current is None:
+                continue
+
+            if 'HEADER.FIELDS' in prefix.upper():
+                headers = email.message_from_bytes(item[1])
+                try:
+                    subject = str(make_header(decode_header(headers.get('Subject', ''))))
+                except Exception:
+                    subject = headers.get('Subject', '')
+                current['subject'] = subject
+                current['from'] = headers.get('From')
+                current['date'] = headers.get('Date')
+            elif 'TEXT' in prefix.upper():
+                current['preview'] = (item[1] or b'').decode('utf-8', errors='ignore')
+
+        return [summaries[key] for key in sorted(summaries, key=int)]
+
+    def imap_list_folders(self, mail, server_config):
+        try:
+            status, folders = mail.list()
             if status == 'OK':
                 folder_count = len(folders)
                 print(
@@ -470,26 +1716,21 @@ class UserBehaviorSimulator:
 
     def imap_check_inbox(self, mail, server_config):
         try:
-            mail.select('INBOX')
-            status, messages = mail.search(None, 'ALL')
+            counts = self.imap_status(mail, 'INBOX')
 
-            if status == 'OK':
-                message_ids = messages[0].split()
-                message_count = len(message_ids)
+            if counts is not None:
                 print(
-                    f"[{datetime.now().strftime('%H:%M:%S')}] IMAP INBOX check on {server_config['server']}: {message_count} messages")
-
-                status, unread = mail.search(None, 'UNSEEN')
-                if status == 'OK':
-                    unread_count = len(unread[0].split()) if unread[0] else 0
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] IMAP INBOX unread: {unread_count} messages")
+                    f"[{datetime.now().strftime('%H:%M:%S')}] IMAP INBOX check on {server_config['server']}: {counts.get('MESSAGES', 0)} messages")
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] IMAP INBOX unread: {counts.get('UNSEEN', 0)} messages")
 
         except Exception as e:
+            if isinstance(e, mail.abort):
+                raise
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error checking inbox: {e}")
 
     def imap_search_emails(self, mail, server_config):
         try:
-            mail.select('INBOX')
+            self.imap_select(mail, 'INBOX', readonly=True)
 
             search_criteria = [
                 'FROM "gmail.com"',
@@ -509,68 +1750,46 @@ class UserBehaviorSimulator:
                     f"[{datetime.now().strftime('%H:%M:%S')}] IMAP SEARCH '{criteria}' on {server_config['server']}: {result_count} results")
 
         except Exception as e:
+            if isinstance(e, mail.abort):
+                raise
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error searching emails: {e}")
 
     def imap_read_recent_emails(self, mail, server_config):
         try:
-            mail.select('INBOX')
-            status, messages = mail.search(None, 'ALL')
+            imap_config = self.config.get('imap_config', {})
+            message_count = self.imap_select(mail, 'INBOX', readonly=True)
 
-            if status == 'OK':
-                message_ids = messages[0].split()
-                if message_ids:
-                    recent_count = min(3, len(message_ids))
-                    recent_ids = message_ids[-recent_count:]
-
-                    for msg_id in recent_ids:
-                        status, msg_data = mail.fetch(msg_id, '(RFC822)')
-                        if status == 'OK':
-                            import email
-                            from email.header import decode_header
-
-                            email_body = msg_data[0][1]
-                            email_message = email.message_from_bytes(email_body)
-
-                            subject = decode_header(email_message["Subject"])[0][0]
-                            if isinstance(subject, bytes):
-                                subject = subject.decode()
-
-                            sender = email_message.get("From")
-
-                            log_path = self.get_save_path("ping_logs")
-                            if not os.path.exists(log_path):
-                                os.makedirs(log_path)
-
-                            log_file = os.path.join(log_path,
-                                                    f"imap_email_{msg_id.decode()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-                            with open(log_file, 'w', encoding='utf-8') as f:
-                                f.write(f"IMAP Email Read from {server_config['server']}:\n")
-                                f.write(f"Message ID: {msg_id.decode()}\n")
-                                f.write(f"From: {sender}\n")
-                                f.write(f"Subject: {subject}\n")
-                                f.write(f"Timestamp: {datetime.now()}\n\n")
-
-                                if email_message.is_multipart():
-                                    for part in email_message.walk():
-                                        if part.get_content_type() == "text/plain":
-                                            body = part.get_payload(decode=True)
-                                            if body:
-                                                f.write(body.decode('utf-8', errors='ignore')[:500])
-                                                break
-                                else:
-                                    body = email_message.get_payload(decode=True)
-                                    if body:
-                                        f.write(body.decode('utf-8', errors='ignore')[:500])
+            if message_count:
+                recent_count = min(imap_config.get('read_recent_count', 3), message_count)
+                recent_ids = range(message_count - recent_count + 1, message_count + 1)
+                summaries = self.imap_fetch_summaries(mail, recent_ids, imap_config.get('preview_bytes', 500))
 
-                    print(
-                        f"[{datetime.now().strftime('%H:%M:%S')}] IMAP READ {recent_count} recent emails from {server_config['server']}")
+                log_path = self.get_save_path("ping_logs")
+                if not os.path.exists(log_path):
+                    os.makedirs(log_path)
+
+                for summary in summaries:
+                    log_file = os.path.join(log_path,
+                                            f"imap_email_{summary['id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+                    with open(log_file, 'w', encoding='utf-8') as f:
+                        f.write(f"IMAP Email Read from {server_config['server']}:\n")
+                        f.write(f"Message ID: {summary['id']}\n")
+                        f.write(f"From: {summary.get('from')}\n")
+                        f.write(f"Subject: {summary.get('subject')}\n")
+                        f.write(f"Timestamp: {datetime.now()}\n\n")
+                        f.write(summary.get('preview', ''))
+
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] IMAP READ {len(summaries)} recent emails from {server_config['server']}")
 
         except Exception as e:
+            if isinstance(e, mail.abort):
+                raise
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error reading recent emails: {e}")
 
     def imap_mark_emails_read(self, mail, server_config):
         try:
-            mail.select('INBOX')
+            self.imap_select(mail, 'INBOX')
             status, messages = mail.search(None, 'UNSEEN')
 
             if status == 'OK' and messages[0]:
@@ -579,13 +1798,14 @@ class UserBehaviorSimulator:
                     mark_count = min(random.randint(1, 3), len(unread_ids))
                     selected_ids = random.sample(unread_ids, mark_count)
 
-                    for msg_id in selected_ids:
-                        mail.store(msg_id, '+FLAGS', '\\Seen')
+                    mail.store(self.imap_message_set(selected_ids), '+FLAGS.SILENT', '(\\Seen)')
 
                     print(
                         f"[{datetime.now().strftime('%H:%M:%S')}] IMAP MARKED {mark_count} emails as read on {server_config['server']}")
 
         except Exception as e:
+            if isinstance(e, mail.abort):
+                raise
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error marking emails as read: {e}")
 
     def imap_check_sent_folder(self, mail, server_config):
@@ -594,24 +1814,231 @@ class UserBehaviorSimulator:
 
             for folder_name in sent_folders:
                 try:
-                    status = mail.select(folder_name)
-                    if status[0] == 'OK':
-                        status, messages = mail.search(None, 'ALL')
-                        if status == 'OK':
-                            message_count = len(messages[0].split()) if messages[0] else 0
-                            print(
-                                f"[{datetime.now().strftime('%H:%M:%S')}] IMAP SENT folder '{folder_name}' on {server_config['server']}: {message_count} messages")
+                    counts = self.imap_status(mail, folder_name, ('MESSAGES',))
+                    if counts is not None:
+                        print(
+                            f"[{datetime.now().strftime('%H:%M:%S')}] IMAP SENT folder '{folder_name}' on {server_config['server']}: {counts.get('MESSAGES', 0)} messages")
                         break
-                except:
+                except mail.abort:
+                    raise
+                except Exception:
                     continue
 
         except Exception as e:
+            if isinstance(e, mail.abort):
+                raise
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error checking sent folder: {e}")
 
+    def get_imap_watchers(self):
+        imap_config = self.config.get('imap_config', {})
+        servers = imap_config.get('servers', [])
+        watch_config = imap_config.get('idle_watch', {})
+        entries = watch_config.get('watchers') or [{'server': index} for index in range(len(servers))]
+
+        watchers = []
+        for entry in entries:
+            index = entry.get('server', 0)
+            if not 0 <= index < len(servers):
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] IMAP watcher references unknown server {index}")
+                continue
+            watchers.append({
+                'server_config': servers[index],
+                'persona': entry.get('persona') or self.get_persona_name(),
+                'folder': entry.get('folder', 'INBOX'),
+                'mail': None,
+                'idle': None,
+                'busy': False,
+                'exists': 0,
+                'new_ids': [],
+                'react_at': None,
+                'idle_started': 0,
+                'retry_at': 0
+            })
+        return watchers
+
+    def imap_watcher_connect(self, watcher):
+        mail = self.open_imap_session(watcher['server_config'])
+        if 'IDLE' not in mail.capabilities:
+            self.close_imap_session(mail)
+            raise RuntimeError("server does not support IDLE")
+
+        timeout = self.config.get('imap_config', {}).get('idle_watch', {}).get('socket_timeout_seconds', 30)
+        watcher['mail'] = mail
+        watcher['idle'] = IMAPIdleConnection(mail, timeout)
+        watcher['exists'] = self.imap_select(mail, watcher['folder']) or 0
+        watcher['new_ids'] = []
+        watcher['react_at'] = None
+
+    def imap_watcher_close(self, watcher):
+        mail = watcher.get('mail')
+        if mail is None:
+            return
+
+        if watcher.get('idle') is not None:
+            watcher['idle'].close()
+            watcher['idle'] = None
+        self.close_imap_session(mail)
+        watcher['mail'] = None
+
+    def imap_watcher_drop(self, watcher, error):
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] IMAP watcher {watcher['persona']} on {watcher['server_config']['server']} error: {error}")
+        reconnect_seconds = self.config.get('imap_config', {}).get('idle_watch', {}).get('reconnect_seconds', 60)
+        try:
+            self.imap_watcher_close(watcher)
+        except Exception:
+            watcher['mail'] = None
+            watcher['idle'] = None
+        watcher['retry_at'] = time.time() + reconnect_seconds
+
+    def imap_watcher_line(self, watcher, line):
+        match = re.match(rb'\* (\d+) (EXISTS|EXPUNGE)', line, re.IGNORECASE)
+        if match:
+            number = int(match.group(1))
+            if match.group(2).upper() == b'EXISTS':
+                if number > watcher['exists']:
+                    watcher['new_ids'].extend(range(watcher['exists'] + 1, number + 1))
+                    if watcher['react_at'] is None:
+                        delay_range = self.config.get('imap_config', {}).get('idle_watch', {}).get(
+                            'reaction_delay_seconds', [5, 120])
+                        watcher['react_at'] = time.time() + random.uniform(*delay_range)
+                watcher['exists'] = number
+            else:
+                watcher['exists'] = max(0, watcher['exists'] - 1)
+                watcher['new_ids'] = [msg_id if msg_id < number else msg_id - 1
+                                      for msg_id in watcher['new_ids'] if msg_id != number]
+        elif line.startswith(b'* BYE'):
+            raise watcher['mail'].abort(line.decode('utf-8', errors='ignore').strip())
+
+    def imap_idle_start(self, watcher):
+        watcher['idle'].start(lambda line: self.imap_watcher_line(watcher, line))
+        watcher['idle_started'] = time.time()
+
+    def imap_idle_done(self, watcher):
+        watcher['idle'].done(lambda line: self.imap_watcher_line(watcher, line))
+
+    def imap_watcher_read_pending(self, watcher):
+        watcher['idle'].read_available(lambda line: self.imap_watcher_line(watcher, line))
+
+    def imap_watcher_open(self, watcher):
+        self.imap_watcher_connect(watcher)
+        self.imap_idle_start(watcher)
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] IMAP watcher {watcher['persona']} idling on {watcher['server_config']['server']}/{watcher['folder']}")
+
+    def imap_watcher_cycle(self, watcher):
+        due_reaction = watcher['react_at'] is not None and time.time() >= watcher['react_at']
+        self.imap_idle_done(watcher)
+        if due_reaction:
+            self.run_as_persona(watcher['persona'], self.imap_watcher_react, watcher)
+        self.imap_idle_start(watcher)
+
+    def imap_watcher_react(self, watcher):
+        watch_config = self.config.get('imap_config', {}).get('idle_watch', {})
+        mail = watcher['mail']
+        server_config = watcher['server_config']
+        new_ids = watcher['new_ids']
+        watcher['new_ids'] = []
+        watcher['react_at'] = None
+
+        if random.random() >= watch_config.get('read_probability', 0.8):
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] IMAP watcher {watcher['persona']}: ignoring {len(new_ids)} new emails on {server_config['server']}")
+            return
+
+        summaries = self.imap_fetch_summaries(mail, new_ids, self.config.get('imap_config', {}).get('preview_bytes', 500))
+        for summary in summaries:
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] IMAP watcher {watcher['persona']}: read '{summary.get('subject')}' from {summary.get('from')}")
+
+        to_mark = [summary['id'] for summary in summaries
+                   if random.random() < watch_config.get('mark_read_probability', 0.6)]
+        if to_mark:
+            mail.store(self.imap_message_set(to_mark), '+FLAGS.SILENT', '(\\Seen)')
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] IMAP watcher {watcher['persona']}: marked {len(to_mark)} emails as read on {server_config['server']}")
+
+    def imap_watch_loop(self, watchers):
+        watch_config = self.config.get('imap_config', {}).get('idle_watch', {})
+        idle_refresh_seconds = watch_config.get('idle_refresh_seconds', 1500)
+        selector = selectors.DefaultSelector()
+        executor = ThreadPoolExecutor(max_workers=max(1, watch_config.get('max_workers', 4)),
+                                      thread_name_prefix='imap-watcher')
+        finished = deque()
+
+        def round_trip(watcher, action):
+            try:
+                action(watcher)
+            except Exception as e:
+                self.imap_watcher_drop(watcher, e)
+            finished.append(watcher)
+
+        def dispatch(watcher, action):
+            if watcher['idle'] is not None:
+                try:
+                    selector.unregister(watcher['idle'].sock)
+                except (KeyError, ValueError):
+                    pass
+                watcher['idle'].set_blocking(True)
+            watcher['busy'] = True
+            executor.submit(round_trip, watcher, action)
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting {len(watchers)} IMAP IDLE watchers")
+
+        # Only non-blocking reads happen on this thread; connects, DONE/FETCH and
+        # re-IDLE round trips run on the worker pool so a stalled server only
+        # holds up its own watcher.
+        while self.is_running:
+            while finished:
+                watcher = finished.popleft()
+                watcher['busy'] = False
+                if watcher['idle'] is not None:
+                    watcher['idle'].set_blocking(False)
+                    selector.register(watcher['idle'].sock, selectors.EVENT_READ, watcher)
+
+            now = time.time()
+            for watcher in watchers:
+                if watcher['busy']:
+                    continue
+                if watcher['mail'] is None:
+                    if now >= watcher['retry_at']:
+                        dispatch(watcher, self.imap_watcher_open)
+                    continue
+
+                due_reaction = watcher['react_at'] is not None and now >= watcher['react_at']
+                if due_reaction or now - watcher['idle_started'] >= idle_refresh_seconds:
+                    dispatch(watcher, self.imap_watcher_cycle)
+
+            if selector.get_map():
+                ready = [key.data for key, _ in selector.select(timeout=1)]
+            else:
+                ready = []
+                time.sleep(1)
+
+            for watcher in ready:
+                try:
+                    self.imap_watcher_read_pending(watcher)
+                except Exception as e:
+                    try:
+                        selector.unregister(watcher['idle'].sock)
+                    except (KeyError, ValueError):
+                        pass
+                    self.imap_watcher_drop(watcher, e)
+
+        executor.shutdown(wait=True)
+        for watcher in watchers:
+            self.imap_watcher_close(watcher)
+        selector.close()
+
+    def start_imap_watchers(self):
+        watchers = self.get_imap_watchers()
+        return threading.Thread(target=self.imap_watch_loop, args=(watchers,))
+
     def discover_linux_apps(self):
         apps = []
 
         try:
+            path_index = self.build_path_index()
             common_commands = [
                 'gedit', 'kate', 'nano', 'vim', 'firefox', 'chromium-browser',
                 'google-chrome', 'libreoffice', 'calc', 'writer', 'terminal',
@@ -620,49 +2047,57 @@ class UserBehaviorSimulator:
             ]
 
             for cmd in common_commands:
-                result = subprocess.run(['which', cmd], capture_output=True, text=True)
-                if result.returncode == 0:
+                if cmd in path_index:
                     apps.append({
                         'type': 'command',
                         'command': cmd,
                         'name': cmd
                     })
 
-            desktop_paths = [
-                '/usr/share/applications',
-                os.path.expanduser('~/.local/share/applications')
-            ]
+            seen_entries = set()
+            for path in self.get_desktop_entry_directories():
+                if not os.path.isdir(path):
+                    continue
 
-            for path in desktop_paths:
-                if os.path.exists(path):
-                    for desktop_file in os.listdir(path):
-                        if desktop_file.endswith('.desktop'):
-                            try:
-                                with open(os.path.join(path, desktop_file), 'r') as f:
-                                    content = f.read()
-                                    if 'Exec=' in content and 'NoDisplay=true' not in content:
-                                        apps.append({
-                                            'type': 'desktop',
-                                            'name': desktop_file.replace('.desktop', ''),
-                                            'file': desktop_file
-                                        })
-                                        if len(apps) > 20:
-                                            break
-                            except:
-                                continue
+                for desktop_file in sorted(os.listdir(path)):
+                    if not desktop_file.endswith('.desktop') or desktop_file in seen_entries:
+                        continue
+                    seen_entries.add(desktop_file)
+
+                    try:
+                        entry = self.parse_desktop_entry(os.path.join(path, desktop_file))
+                    except OSError:
+                        continue
+
+                    if entry.get('Type', 'Application') != 'Application' or not entry.get('Exec'):
+                        continue
+                    if entry.get('NoDisplay', '').lower() == 'true' or entry.get('Hidden', '').lower() == 'true':
+                        continue
+
+                    try_exec = entry.get('TryExec')
+                    if try_exec and not (os.path.isabs(try_exec) and os.access(try_exec, os.X_OK)) \
+                            and try_exec not in path_index:
+                        continue
+
+                    apps.append({
+                        'type': 'desktop',
+                        'name': desktop_file[:-len('.desktop')],
+                        'file': desktop_file,
+                        'display_name': entry.get('Name', desktop_file[:-len('.desktop')]),
+                        'categories': [category for category in entry.get('Categories', '').split(';') if category],
+                        'terminal': entry.get('Terminal', '').lower() == 'true'
+                    })
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Linux app discovery error: {e}")
 
-        return apps[:15]
+        return apps
 
     def discover_macos_apps(self):
         apps = []
 
         try:
-            app_paths = ['/Applications', os.path.expanduser('~/Applications')]
-
-            for path in app_paths:
+            for path in self.get_macos_application_directories():
                 if os.path.exists(path):
                     for item in os.listdir(path):
                         if item.endswith('.app'):
@@ -671,13 +2106,11 @@ class UserBehaviorSimulator:
                                 'name': item.replace('.app', ''),
                                 'path': os.path.join(path, item)
                             })
-                            if len(apps) > 15:
-                                break
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] macOS app discovery error: {e}")
 
-        return apps[:15]
+        return apps
 
     def get_next_scheduled_task(self):
         if not self.config.get('scheduled_tasks', {}).get('enabled', False):
@@ -708,8 +2141,13 @@ class UserBehaviorSimulator:
         return None
 
     def wait_between_tasks(self):
-        task_wait_minutes = self.config.get('task_wait_minutes', [2, 8])
-        wait_time = random.randint(*task_wait_minutes) * 60
+        wait_time = getattr(self.persona_context, 'dwell_seconds', None)
+        if wait_time is None:
+            task_wait_minutes = self.config.get('task_wait_minutes', [2, 8])
+            wait_time = random.randint(*task_wait_minutes) * 60
+        task_name = getattr(self.persona_context, 'task', None)
+        if task_name:
+            wait_time *= self.get_think_multiplier(task_name)
         time.sleep(wait_time)
 
     def get_random_text_from_api(self):
@@ -761,6 +2199,8 @@ class UserBehaviorSimulator:
             return os.path.join(self.get_desktop_path(), "ping_logs")
         elif path_type == "received_files":
             return os.path.join(self.get_desktop_path(), "received")
+        elif path_type == "data":
+            return os.path.join(self.get_desktop_path(), "simulator_data")
         else:
             return self.get_desktop_path()
 
@@ -773,6 +2213,7 @@ class UserBehaviorSimulator:
             }
 
             response = requests.get(url, headers=headers, timeout=10)
+            self.record_metric('http_requests')
             if response.status_code != 200:
                 return []
 
@@ -887,6 +2328,12 @@ class UserBehaviorSimulator:
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Scrolling error: {e}")
 
+    def open_url(self, url):
+        webbrowser.open(url)
+        self.record_metric('http_requests')
+        with self.visited_urls_lock:
+            self.visited_urls.append([time.time(), self.get_persona_name(), url])
+
     def simulate_page_reading(self, base_time):
         reading_time = random.randint(int(base_time * 0.7), int(base_time * 1.3))
 
@@ -918,7 +2365,7 @@ class UserBehaviorSimulator:
 
             try:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] Opening main site: {main_site}")
-                webbrowser.open(main_site)
+                self.open_url(main_site)
 
                 time.sleep(random.randint(3, 6))
 
@@ -939,7 +2386,7 @@ class UserBehaviorSimulator:
                     for link in selected_links:
                         try:
                             print(f"[{datetime.now().strftime('%H:%M:%S')}] Opening additional link: {link}")
-                            webbrowser.open(link)
+                            self.open_url(link)
 
                             time.sleep(random.randint(2, 5))
 
@@ -952,7 +2399,7 @@ class UserBehaviorSimulator:
                                 if sub_links:
                                     sub_link = random.choice(sub_links)
                                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Opening sub-link: {sub_link}")
-                                    webbrowser.open(sub_link)
+                                    self.open_url(sub_link)
 
                                     time.sleep(random.randint(2, 4))
                                     sub_link_time = random.randint(10, 60)
@@ -1029,6 +2476,7 @@ class UserBehaviorSimulator:
             if platform.system() == "Windows":
                 try:
                     response = requests.get(video_url, headers=headers, timeout=20)
+                    self.record_metric('http_requests')
                     content = response.text
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Successfully fetched video page on Windows")
                 except Exception as e:
@@ -1045,6 +2493,7 @@ class UserBehaviorSimulator:
             else:
                 try:
                     response = requests.get(video_url, headers=headers, timeout=20)
+                    self.record_metric('http_requests')
                     content = response.text
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Successfully fetched video page on Linux/Mac")
                 except Exception as e:
@@ -1280,7 +2729,7 @@ class UserBehaviorSimulator:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Opened in Firefox: {firefox_path}")
                 else:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Firefox not found, using default browser")
-                    webbrowser.open(url)
+                    self.open_url(url)
 
             elif current_os == "Linux":
                 try:
@@ -1288,7 +2737,7 @@ class UserBehaviorSimulator:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Opened in Firefox (Linux)")
                 except FileNotFoundError:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Firefox not found, using default browser")
-                    webbrowser.open(url)
+                    self.open_url(url)
 
             else:
                 try:
@@ -1296,11 +2745,11 @@ class UserBehaviorSimulator:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Opened in Firefox (macOS)")
                 except:
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Firefox not found, using default browser")
-                    webbrowser.open(url)
+                    self.open_url(url)
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Firefox launch error: {e}, using default browser")
-            webbrowser.open(url)
+            self.open_url(url)
 
     def create_text_files(self):
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting text file creation task")
@@ -1332,31 +2781,36 @@ class UserBehaviorSimulator:
             return self.config.get('target_ips', [])
 
         try:
-            import ipaddress
-
-            start_ip = self.config['ip_range'].get('start_ip', '192.168.1.100')
-            end_ip = self.config['ip_range'].get('end_ip', '192.168.1.200')
-            exclude_ips = set(self.config['ip_range'].get('exclude_ips', []))
+            ip_range_config = self.config['ip_range']
 
-            start = ipaddress.IPv4Address(start_ip)
-            end = ipaddress.IPv4Address(end_ip)
-
-            ip_list = []
-            current = start
+            include_specs = []
+            if ip_range_config.get('start_ip') and ip_range_config.get('end_ip'):
+                include_specs.append({'start': ip_range_config['start_ip'], 'end': ip_range_config['end_ip']})
+            include_specs.extend(ip_range_config.get('cidrs', []))
+            include_specs.extend(ip_range_config.get('ranges', []))
 
-            while current <= end:
-                ip_str = str(current)
-                if ip_str not in exclude_ips:
-                    ip_list.append(ip_str)
-                current += 1
+            exclude_specs = ip_range_config.get('exclude_ips', []) + ip_range_config.get('exclude_ranges', [])
 
-            return ip_list
+            return IPRangeSet(include_specs, exclude_specs)
 
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Error generating IP range: {e}")
             return self.config.get('target_ips', [])
 
+    def count_ips(self, ip_pool):
+        if isinstance(ip_pool, IPRangeSet):
+            return ip_pool.size
+        return len(ip_pool)
+
+    def sample_ips(self, ip_pool, count):
+        if isinstance(ip_pool, IPRangeSet):
+            return ip_pool.sample(count)
+        return random.sample(ip_pool, min(count, len(ip_pool)))
+
     def ping_ip_to_check_availability(self, ip):
+        return self.probe_hosts([ip]).get(ip, False)
+
+    def ping_ip_subprocess(self, ip):
         try:
             if platform.system() == "Windows":
                 cmd = ['ping', '-n', '1', '-w', '1000', ip]
@@ -1368,37 +2822,207 @@ class UserBehaviorSimulator:
         except:
             return False
 
-    def send_file_to_ip_with_retry(self, ip, filepath, max_retries=3):
+    def get_probe_kind(self):
+        method = self.config.get('liveness_probe', {}).get('method', 'tcp')
+        if method == 'ping' or (method == 'icmp' and not self.icmp_unavailable):
+            return 'icmp'
+        return self.get_tcp_probe_kind()
+
+    def get_tcp_probe_kind(self):
+        ports = self.config.get('liveness_probe', {}).get('tcp_ports') or [self.config.get('file_share_port', 8888)]
+        return 'tcp/' + ','.join(str(port) for port in ports)
+
+    def get_cached_reachability(self, ip, kind):
+        ttl = self.config.get('liveness_probe', {}).get('cache_ttl_seconds', 60)
+
+        with self.reachability_lock:
+            entry = self.reachability_cache.get((ip, kind))
+            if entry and time.monotonic() - entry[1] >= ttl:
+                del self.reachability_cache[(ip, kind)]
+                entry = None
+
+        return entry[0] if entry else None
+
+    def update_reachability(self, ip, alive, kind):
+        probe_config = self.config.get('liveness_probe', {})
+        ttl = probe_config.get('cache_ttl_seconds', 60)
+        max_entries = max(1, probe_config.get('max_cache_entries', 65536))
+        now = time.monotonic()
+
+        with self.reachability_lock:
+            cache = self.reachability_cache
+            cache[(ip, kind)] = (alive, now)
+            cache.move_to_end((ip, kind))
+            while len(cache) > max_entries:
+                cache.popitem(last=False)
+            while cache:
+                key, (_, updated) = next(iter(cache.items()))
+                if now - updated < ttl:
+                    break
+                del cache[key]
+
+    def tcp_probe(self, ip, port, timeout):
+        try:
+            sock = socket.create_connection((ip, port), timeout=timeout)
+            sock.close()
+            return True
+        except ConnectionRefusedError:
+            return True
+        except OSError:
+            return False
+
+    def icmp_checksum(self, data):
+        if len(data) % 2:
+            data += b'\x00'
+        total = sum((data[i] << 8) + data[i + 1] for i in range(0, len(data), 2))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def parse_icmp_reply_type(self, data):
+        # Linux delivers datagram ICMP replies without the IP header, macOS/BSD include it
+        if len(data) >= 20 and data[0] >> 4 == 4:
+            data = data[(data[0] & 0x0F) * 4:]
+        return data[0] if data else None
+
+    def icmp_probe_batch(self, ips, timeout):
+        import struct
+        import select
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        try:
+            sock.setblocking(False)
+            identifier = os.getpid() & 0xFFFF
+            payload = b'ubs-liveness'
+
+            for seq, ip in enumerate(ips):
+                header = struct.pack('!BBHHH', 8, 0, 0, identifier, seq & 0xFFFF)
+                checksum = self.icmp_checksum(header + payload)
+                packet = struct.pack('!BBHHH', 8, 0, checksum, identifier, seq & 0xFFFF) + payload
+                try:
+                    sock.sendto(packet, (ip, 0))
+                except OSError:
+                    continue
+
+            alive = set()
+            deadline = time.monotonic() + timeout
+            while len(alive) < len(ips):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([sock], [], [], remaining)
+                if not readable:
+                    break
+                try:
+                    data, addr = sock.recvfrom(1024)
+                except BlockingIOError:
+                    continue
+                if self.parse_icmp_reply_type(data) == 0:
+                    alive.add(addr[0])
+
+            return {ip: ip in alive for ip in ips}
+        finally:
+            sock.close()
+
+    def probe_hosts(self, ips):
+        probe_config = self.config.get('liveness_probe', {})
+        method = probe_config.get('method', 'tcp')
+        timeout = probe_config.get('timeout', 1.0)
+        max_workers = max(1, probe_config.get('max_workers', 32))
+        ports = probe_config.get('tcp_ports') or [self.config.get('file_share_port', 8888)]
+        kind = self.get_probe_kind()
+
+        results = {}
+        pending = []
+        for ip in ips:
+            cached = self.get_cached_reachability(ip, kind)
+            if cached is None:
+                if ip not in pending:
+                    pending.append(ip)
+            else:
+                results[ip] = cached
+
+        if not pending:
+            return results
+
+        if method == 'icmp' and not self.icmp_unavailable:
+            ipv4_hosts = [ip for ip in pending if ':' not in ip]
+            try:
+                probed = self.icmp_probe_batch(ipv4_hosts, timeout) if ipv4_hosts else {}
+                for ip, alive in probed.items():
+                    results[ip] = alive
+                    self.update_reachability(ip, alive, 'icmp')
+                pending = [ip for ip in pending if ip not in probed]
+            except OSError as e:
+                self.icmp_unavailable = True
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] ICMP probing not permitted ({e}), falling back to TCP probes")
+            kind = self.get_tcp_probe_kind()
+
+        if method == 'ping':
+            probe = self.ping_ip_subprocess
+        else:
+            def probe(ip):
+                return any(self.tcp_probe(ip, port, timeout) for port in ports)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                for ip, alive in zip(pending, executor.map(probe, pending)):
+                    results[ip] = alive
+                    self.update_reachability(ip, alive, kind)
+
+        return results
+
+    def send_file_to_ip(self, ip, filepath, limiter=None):
+        shaper = self.get_bandwidth_limiter('file_share')
+        file_share_port = self.config.get('file_share_port', 8888)
+        sock = socket.create_connection((ip, file_share_port), timeout=10)
+        try:
+
+            filename = os.path.basename(filepath)
+            filesize = os.path.getsize(filepath)
+
+            header = f"{filename}|{filesize}"
+            sock.sendall(header.encode())
+
+            time.sleep(0.1)
+
+            bytes_sent = 0
+            with open(filepath, 'rb') as f:
+                while bytes_sent < filesize:
+                    data = f.read(65536)
+                    if not data:
+                        break
+                    if limiter:
+                        limiter.consume(len(data))
+                    if shaper:
+                        shaper.consume(len(data))
+                    sock.sendall(data)
+                    bytes_sent += len(data)
+
+            self.record_metric('file_share_bytes', bytes_sent)
+            return bytes_sent
+        finally:
+            sock.close()
+
+    def send_file_to_ip_with_retry(self, ip, filepath, max_retries=3, limiter=None, stats=None):
         for attempt in range(max_retries):
+            if stats is not None:
+                stats['attempts'] = attempt + 1
+
             try:
                 if not self.ping_ip_to_check_availability(ip):
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] IP {ip} not reachable, skipping")
                     return False
 
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(10)
-                file_share_port = self.config.get('file_share_port', 8888)
-                sock.connect((ip, file_share_port))
-
-                filename = os.path.basename(filepath)
-                filesize = os.path.getsize(filepath)
-
-                header = f"{filename}|{filesize}"
-                sock.send(header.encode())
+                start_time = time.time()
+                bytes_sent = self.send_file_to_ip(ip, filepath, limiter)
 
-                time.sleep(0.1)
+                if stats is not None:
+                    stats['bytes'] = bytes_sent
+                    stats['seconds'] = time.time() - start_time
 
-                with open(filepath, 'rb') as f:
-                    bytes_sent = 0
-                    while bytes_sent < filesize:
-                        data = f.read(4096)
-                        if not data:
-                            break
-                        sock.send(data)
-                        bytes_sent += len(data)
-
-                sock.close()
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] Successfully sent {filename} to {ip}")
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Successfully sent {os.path.basename(filepath)} to {ip}")
                 return True
 
             except socket.timeout:
@@ -1410,6 +3034,7 @@ class UserBehaviorSimulator:
             except OSError as e:
                 if "Network is unreachable" in str(e) or "No route to host" in str(e):
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Network unreachable to {ip}")
+                    self.update_reachability(ip, False, self.get_probe_kind())
                     return False
                 else:
                     print(
@@ -1423,6 +3048,380 @@ class UserBehaviorSimulator:
 
         return False
 
+    def share_file_sequentially(self, file_to_share, target_ips):
+        successful_transfers = 0
+        max_attempts = min(5, len(target_ips))
+
+        selected_ips = random.sample(target_ips, min(max_attempts, len(target_ips)))
+
+        for ip in selected_ips:
+            success = self.send_file_to_ip_with_retry(ip, file_to_share)
+            if success:
+                successful_transfers += 1
+                if successful_transfers >= 2:
+                    break
+            time.sleep(random.randint(1, 3))
+
+        if successful_transfers == 0:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] File sharing failed to all targets")
+
+            fallback_ips = [ip for ip in self.config.get('target_ips', []) if ip not in selected_ips]
+            if fallback_ips:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Trying fallback IPs...")
+                for fallback_ip in fallback_ips[:2]:
+                    if self.send_file_to_ip_with_retry(fallback_ip, file_to_share):
+                        successful_transfers += 1
+                        break
+
+        return successful_transfers
+
+    def share_file_fan_out(self, filepath, target_ips):
+        fan_out_config = self.config.get('file_share_fan_out', {})
+        max_peers = fan_out_config.get('max_peers', 10)
+        max_concurrency = max(1, fan_out_config.get('max_concurrency', 5))
+        max_bandwidth_kbps = fan_out_config.get('max_bandwidth_kbps', 0)
+
+        peers = random.sample(target_ips, min(max_peers, len(target_ips)))
+        if not peers:
+            return {}
+
+        limiter = TokenBucket(max_bandwidth_kbps * 1024 / 8) if max_bandwidth_kbps > 0 else None
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Fan-out sharing {os.path.basename(filepath)} to {len(peers)} peers, concurrency {max_concurrency}")
+
+        results = {}
+        persona = self.get_persona_name()
+        start_time = time.time()
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(peers))) as executor:
+            futures = {}
+            for ip in peers:
+                stats = {'bytes': 0, 'seconds': 0.0, 'attempts': 0}
+                future = executor.submit(self.run_as_persona, persona, self.send_file_to_ip_with_retry,
+                                         ip, filepath, 3, limiter, stats)
+                futures[future] = (ip, stats)
+
+            for future in as_completed(futures):
+                ip, stats = futures[future]
+                try:
+                    stats['success'] = future.result()
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Fan-out error for {ip}: {e}")
+                    stats['success'] = False
+                stats['throughput_kbps'] = (stats['bytes'] * 8 / 1024 / stats['seconds']) if stats['seconds'] > 0 else 0.0
+                results[ip] = stats
+
+        elapsed = time.time() - start_time
+        total_bytes = sum(stats['bytes'] for stats in results.values())
+        successful = sum(1 for stats in results.values() if stats['success'])
+
+        for ip, stats in sorted(results.items()):
+            status = "SUCCESS" if stats['success'] else "FAILED"
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Fan-out {ip}: {status}, {stats['bytes']} bytes in {stats['seconds']:.2f}s ({stats['throughput_kbps']:.1f} kbit/s, {stats['attempts']} attempts)")
+
+        aggregate_kbps = (total_bytes * 8 / 1024 / elapsed) if elapsed > 0 else 0.0
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Fan-out complete: {successful}/{len(peers)} peers, {total_bytes} bytes in {elapsed:.2f}s ({aggregate_kbps:.1f} kbit/s aggregate)")
+
+        return results
+
+    def get_results_db_path(self):
+        configured_path = self.config.get('results_store', {}).get('path', '')
+        if configured_path:
+            return configured_path
+        return os.path.join(self.get_save_path("data"), "simulator_results.db")
+
+    def init_results_schema(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ping_results ("
+            "ts REAL NOT NULL, ip TEXT NOT NULL, persona TEXT, transmitted INTEGER, received INTEGER, "
+            "loss_pct REAL, rtt_min REAL, rtt_avg REAL, rtt_max REAL, rtt_mdev REAL, returncode INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ping_results_ip_ts ON ping_results (ip, ts)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS transfers ("
+            "ts REAL NOT NULL, protocol TEXT NOT NULL, persona TEXT, host TEXT, operation TEXT, name TEXT, "
+            "bytes INTEGER, seconds REAL, throughput_kbps REAL, resumes INTEGER, success INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_transfers_protocol_ts ON transfers (protocol, ts)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ssh_commands ("
+            "ts REAL NOT NULL, persona TEXT, host TEXT NOT NULL, username TEXT, command TEXT, exit_status INTEGER, "
+            "duration REAL, stdout_bytes INTEGER, stderr_bytes INTEGER, truncated INTEGER, timed_out INTEGER, "
+            "stdout BLOB, stderr BLOB)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ssh_commands_host_ts ON ssh_commands (host, ts)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS app_runs ("
+            "ts REAL NOT NULL, persona TEXT, app TEXT, exit_code INTEGER, wall_seconds REAL, cpu_seconds REAL, "
+            "peak_rss_kb INTEGER, output_bytes INTEGER, terminated INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_app_runs_app_ts ON app_runs (app, ts)")
+
+    def get_results_db(self):
+        if self.results_db is None:
+            db_path = self.get_results_db_path()
+            db_dir = os.path.dirname(db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir)
+
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.init_results_schema(conn)
+            conn.commit()
+            self.results_db = conn
+
+        return self.results_db
+
+    def rotate_results_db(self):
+        store_config = self.config.get('results_store', {})
+        backups = store_config.get('backups', 3)
+        db_path = self.get_results_db_path()
+
+        self.results_db.close()
+        self.results_db = None
+
+        for index in range(backups - 1, 0, -1):
+            older = f"{db_path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{db_path}.{index + 1}")
+
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+        if backups > 0:
+            os.replace(db_path, f"{db_path}.1")
+        else:
+            os.remove(db_path)
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Rotated results store {db_path}")
+
+    def store_results(self, sql, rows):
+        if not rows:
+            return
+
+        max_size_mb = self.config.get('results_store', {}).get('max_size_mb', 256)
+
+        with self.results_db_lock:
+            conn = self.get_results_db()
+            conn.executemany(sql, rows)
+            conn.commit()
+
+            self.results_db_writes += 1
+            if max_size_mb and self.results_db_writes % 100 == 0:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                if os.path.getsize(self.get_results_db_path()) > max_size_mb * 1024 * 1024:
+                    self.rotate_results_db()
+
+    def query_results(self, sql, params=()):
+        with self.results_db_lock:
+            cursor = self.get_results_db().execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_state_db_path(self):
+        configured_path = self.config.get('checkpoint', {}).get('path', '')
+        if configured_path:
+            return configured_path
+        return os.path.join(self.get_save_path("data"), "simulator_state.db")
+
+    def get_state_db(self):
+        if self.state_db is None:
+            db_path = self.get_state_db_path()
+            db_dir = os.path.dirname(db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir)
+
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "persona TEXT NOT NULL, key TEXT NOT NULL, value TEXT, updated REAL, PRIMARY KEY (persona, key))")
+            conn.commit()
+            self.state_db = conn
+
+        return self.state_db
+
+    def save_state(self, key, value, persona=None):
+        if not self.config.get('checkpoint', {}).get('enabled', False):
+            return
+
+        persona = persona or self.get_persona_name()
+        try:
+            with self.state_db_lock:
+                conn = self.get_state_db()
+                conn.execute("INSERT OR REPLACE INTO state (persona, key, value, updated) VALUES (?, ?, ?, ?)",
+                             (persona, key, json.dumps(value), time.time()))
+                conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Checkpoint error for {key}: {e}")
+
+    def load_state(self, key, default=None, persona=None):
+        if not self.config.get('checkpoint', {}).get('enabled', False):
+            return default
+
+        persona = persona or self.get_persona_name()
+        try:
+            with self.state_db_lock:
+                row = self.get_state_db().execute(
+                    "SELECT value FROM state WHERE persona = ? AND key = ?", (persona, key)).fetchone()
+            return json.loads(row[0]) if row else default
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Could not restore {key}: {e}")
+            return default
+
+    def checkpoint_state(self):
+        with self.visited_urls_lock:
+            visited_urls = list(self.visited_urls)
+        self.save_state('metrics', self.metrics.snapshot(), persona='*')
+        self.save_state('visited_urls', visited_urls, persona='*')
+
+    def restore_state(self):
+        totals = self.load_state('metrics', {}, persona='*')
+        self.metrics.restore(totals)
+        with self.visited_urls_lock:
+            self.visited_urls.extend(self.load_state('visited_urls', [], persona='*'))
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Restored checkpoint from {self.get_state_db_path()}: {len(totals)} counters, {len(self.visited_urls)} visited URLs")
+
+    def start_checkpointer(self):
+        def checkpointer():
+            interval = self.config.get('checkpoint', {}).get('interval_seconds', 30)
+            next_checkpoint = time.time() + interval
+
+            while self.is_running:
+                time.sleep(1)
+                if time.time() < next_checkpoint:
+                    continue
+                next_checkpoint = time.time() + interval
+                self.checkpoint_state()
+
+        thread = threading.Thread(target=checkpointer)
+        thread.daemon = True
+        return thread
+
+    def parse_ping_output(self, output):
+        stats = {
+            'transmitted': None, 'received': None, 'loss_pct': None,
+            'rtt_min': None, 'rtt_avg': None, 'rtt_max': None, 'rtt_mdev': None
+        }
+
+        match = re.search(r'(\d+) packets transmitted, (\d+) (?:packets )?received', output)
+        if match:
+            stats['transmitted'] = int(match.group(1))
+            stats['received'] = int(match.group(2))
+        else:
+            match = re.search(r'Sent = (\d+), Received = (\d+)', output)
+            if match:
+                stats['transmitted'] = int(match.group(1))
+                stats['received'] = int(match.group(2))
+
+        match = re.search(r'([\d.]+)% (?:packet )?loss', output)
+        if match:
+            stats['loss_pct'] = float(match.group(1))
+        elif stats['transmitted']:
+            stats['loss_pct'] = 100.0 * (stats['transmitted'] - stats['received']) / stats['transmitted']
+
+        match = re.search(r'= ([\d.]+)/([\d.]+)/([\d.]+)(?:/([\d.]+))? ms', output)
+        if match:
+            stats['rtt_min'] = float(match.group(1))
+            stats['rtt_avg'] = float(match.group(2))
+            stats['rtt_max'] = float(match.group(3))
+            if match.group(4):
+                stats['rtt_mdev'] = float(match.group(4))
+        else:
+            match = re.search(r'Minimum = (\d+)ms, Maximum = (\d+)ms, Average = (\d+)ms', output)
+            if match:
+                stats['rtt_min'] = float(match.group(1))
+                stats['rtt_max'] = float(match.group(2))
+                stats['rtt_avg'] = float(match.group(3))
+
+        return stats
+
+    def run_ping(self, ip, ping_count):
+        if platform.system() == "Windows":
+            cmd = ['ping', '-n', str(ping_count), ip]
+        else:
+            cmd = ['ping', '-c', str(ping_count), ip]
+
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+
+    def ping_host_stats(self, ip, ping_count):
+        timestamp = time.time()
+        try:
+            result = self.run_ping(ip, ping_count)
+            stats = self.parse_ping_output(result.stdout)
+            stats['returncode'] = result.returncode
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error pinging {ip}: {e}")
+            stats = self.parse_ping_output('')
+            stats['returncode'] = -1
+
+        stats['ts'] = timestamp
+        stats['ip'] = ip
+        return stats
+
+    def ping_sweep(self, target_ips):
+        sweep_config = self.config.get('ping_sweep', {})
+        max_workers = max(1, sweep_config.get('max_workers', 16))
+        ping_count = self.config.get('ping_count', 4)
+        persona = self.get_persona_name()
+
+        targets = [ip for ip in target_ips if self.get_cached_reachability(ip, 'icmp') is not False]
+        skipped = len(target_ips) - len(targets)
+        if not targets:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Ping sweep: all {skipped} targets recently unreachable")
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(targets))) as executor:
+            rows = list(executor.map(lambda ip: self.ping_host_stats(ip, ping_count), targets))
+
+        for row in rows:
+            self.update_reachability(row['ip'], row['returncode'] == 0, 'icmp')
+
+        try:
+            self.store_results(
+                "INSERT INTO ping_results (ts, ip, persona, transmitted, received, loss_pct, rtt_min, rtt_avg, "
+                "rtt_max, rtt_mdev, returncode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(row['ts'], row['ip'], persona, row['transmitted'], row['received'], row['loss_pct'],
+                  row['rtt_min'], row['rtt_avg'], row['rtt_max'], row['rtt_mdev'], row['returncode'])
+                 for row in rows])
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error storing ping results: {e}")
+
+        reachable = sum(1 for row in rows if row['returncode'] == 0)
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Ping sweep: {reachable}/{len(rows)} reachable, {skipped} skipped as recently unreachable")
+        return rows
+
+    def query_ping_latency(self, ip=None, since=None, until=None, bucket_minutes=60):
+        conditions = []
+        params = []
+        if ip:
+            conditions.append("ip = ?")
+            params.append(ip)
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since.timestamp() if isinstance(since, datetime) else since)
+        if until is not None:
+            conditions.append("ts < ?")
+            params.append(until.timestamp() if isinstance(until, datetime) else until)
+
+        bucket_seconds = max(1, int(bucket_minutes * 60))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = self.query_results(
+            f"SELECT ip, CAST(ts / {bucket_seconds} AS INTEGER) * {bucket_seconds} AS bucket, COUNT(*) AS samples, "
+            f"AVG(rtt_avg) AS rtt_avg, MIN(rtt_min) AS rtt_min, MAX(rtt_max) AS rtt_max, AVG(loss_pct) AS loss_pct "
+            f"FROM ping_results {where} GROUP BY ip, bucket ORDER BY bucket, ip",
+            params)
+
+        for row in rows:
+            row['bucket'] = datetime.fromtimestamp(row['bucket'])
+        return rows
+
     def ping_target_ips(self):
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting ping task")
 
@@ -1430,21 +3429,30 @@ class UserBehaviorSimulator:
         ping_count = self.config.get('ping_count', 4)
 
         if self.config.get('ip_range', {}).get('enabled', False):
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Pinging IP range with {len(target_ips)} addresses")
-            target_ips = random.sample(target_ips, min(10, len(target_ips)))
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Pinging IP range with {self.count_ips(target_ips)} addresses")
+            target_ips = self.sample_ips(target_ips, 10)
 
+        if self.config.get('ping_sweep', {}).get('enabled', False):
+            self.ping_sweep(list(target_ips))
+        else:
+            self.ping_targets_sequentially(target_ips, ping_count)
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Completed ping task")
+        if not self.config.get('scheduled_tasks', {}).get('enabled', False):
+            self.wait_between_tasks()
+
+    def ping_targets_sequentially(self, target_ips, ping_count):
         log_path = self.get_save_path("ping_logs")
         if not os.path.exists(log_path):
             os.makedirs(log_path)
 
         for ip in target_ips:
-            try:
-                if platform.system() == "Windows":
-                    cmd = ['ping', '-n', str(ping_count), ip]
-                else:
-                    cmd = ['ping', '-c', str(ping_count), ip]
+            if self.get_cached_reachability(ip, 'icmp') is False:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] Ping {ip}: skipped, recently unreachable")
+                continue
 
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            try:
+                result = self.run_ping(ip, ping_count)
 
                 log_file = os.path.join(log_path, f"ping_{ip}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
                 with open(log_file, 'w') as f:
@@ -1456,16 +3464,14 @@ class UserBehaviorSimulator:
                         f.write("\nSTDERR:\n")
                         f.write(result.stderr)
 
+                self.update_reachability(ip, result.returncode == 0, 'icmp')
+
                 status = "SUCCESS" if result.returncode == 0 else "FAILED"
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] Ping {ip}: {status}")
                 time.sleep(random.randint(5, 15))
             except Exception as e:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] Error pinging {ip}: {e}")
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Completed ping task")
-        if not self.config.get('scheduled_tasks', {}).get('enabled', False):
-            self.wait_between_tasks()
-
     def get_desktop_path(self):
         if platform.system() == "Windows":
             return os.path.join(os.path.expanduser("~"), "Desktop")
@@ -1510,15 +3516,20 @@ class UserBehaviorSimulator:
         for url in media_urls:
             try:
                 response = requests.get(url, stream=True, timeout=60)
+                self.record_metric('http_requests')
                 if response.status_code == 200:
                     filename = os.path.basename(urlparse(url).path)
                     if not filename:
                         filename = f"media_{int(time.time())}"
 
                     filepath = os.path.join(download_path, filename)
+                    shaper = self.get_bandwidth_limiter('http')
                     with open(filepath, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
+                        for chunk in response.iter_content(chunk_size=65536 if shaper else 8192):
+                            if shaper:
+                                shaper.consume(len(chunk))
                             f.write(chunk)
+                            self.record_metric('http_bytes', len(chunk))
 
                     print(f"[{datetime.now().strftime('%H:%M:%S')}] Downloaded: {filepath}")
                     time.sleep(random.randint(5, 15))
@@ -1534,13 +3545,10 @@ class UserBehaviorSimulator:
         target_ips = self.generate_ip_range()
 
         if self.config.get('ip_range', {}).get('enabled', False):
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Generated {len(target_ips)} IPs from range")
-            available_ips = []
-
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Generated {self.count_ips(target_ips)} IPs from range")
             print(f"[{datetime.now().strftime('%H:%M:%S')}] Checking IP availability...")
-            for ip in random.sample(target_ips, min(10, len(target_ips))):
-                if self.ping_ip_to_check_availability(ip):
-                    available_ips.append(ip)
+            probe_results = self.probe_hosts(self.sample_ips(target_ips, 10))
+            available_ips = [ip for ip, alive in probe_results.items() if alive]
 
             if available_ips:
                 target_ips = available_ips
@@ -1565,29 +3573,11 @@ class UserBehaviorSimulator:
                 file_to_share = random.choice(all_files)
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] Sharing file: {os.path.basename(file_to_share)}")
 
-                successful_transfers = 0
-                max_attempts = min(5, len(target_ips))
-
-                selected_ips = random.sample(target_ips, min(max_attempts, len(target_ips)))
-
-                for ip in selected_ips:
-                    success = self.send_file_to_ip_with_retry(ip, file_to_share)
-                    if success:
-                        successful_transfers += 1
-                        if successful_transfers >= 2:
-                            break
-                    time.sleep(random.randint(1, 3))
-
-                if successful_transfers == 0:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] File sharing failed to all targets")
-
-                    fallback_ips = [ip for ip in self.config.get('target_ips', []) if ip not in selected_ips]
-                    if fallback_ips:
-                        print(f"[{datetime.now().strftime('%H:%M:%S')}] Trying fallback IPs...")
-                        for fallback_ip in fallback_ips[:2]:
-                            if self.send_file_to_ip_with_retry(fallback_ip, file_to_share):
-                                successful_transfers += 1
-                                break
+                if self.config.get('file_share_fan_out', {}).get('enabled', False):
+                    results = self.share_file_fan_out(file_to_share, target_ips)
+                    successful_transfers = sum(1 for stats in results.values() if stats['success'])
+                else:
+                    successful_transfers = self.share_file_sequentially(file_to_share, target_ips)
 
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] Successfully shared to {successful_transfers} targets")
             else:
@@ -1599,13 +3589,31 @@ class UserBehaviorSimulator:
         if not self.config.get('scheduled_tasks', {}).get('enabled', False):
             self.wait_between_tasks()
 
+    def open_file_share_listener(self, port):
+        if socket.has_ipv6:
+            try:
+                server_sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+                try:
+                    server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    server_sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+                    server_sock.bind(('::', port))
+                    return server_sock
+                except OSError:
+                    server_sock.close()
+                    raise
+            except OSError as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] IPv6 unavailable for file receiver ({e}), listening on IPv4 only")
+
+        server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_sock.bind(('0.0.0.0', port))
+        return server_sock
+
     def start_file_receiver(self):
         def receiver():
             try:
-                server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 file_share_port = self.config.get('file_share_port', 8888)
-                server_sock.bind(('0.0.0.0', file_share_port))
+                server_sock = self.open_file_share_listener(file_share_port)
                 server_sock.listen(5)
                 server_sock.settimeout(1)
 
@@ -1648,76 +3656,418 @@ class UserBehaviorSimulator:
         thread.daemon = True
         return thread
 
-    def ftp_operations(self):
-        if not self.config.get('ftp_config', {}).get('enabled', False):
-            return
+    def get_ftp_server_key(self, server):
+        return server['host'], server.get('port', 21), server.get('username', '')
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting FTP operations")
+    def open_ftp_session(self, server):
+        import ftplib
 
-        try:
-            import ftplib
+        ftp = ftplib.FTP()
+        ftp.connect(server['host'], server.get('port', 21), timeout=30)
+        ftp.login(server['username'], server['password'])
 
-            servers = self.config['ftp_config'].get('servers', [])
-            operations = self.config['ftp_config'].get('operations', ['list'])
-            files_per_session_range = self.config['ftp_config'].get('files_per_session', [1, 3])
-            files_count = random.randint(*files_per_session_range)
+        if server.get('passive', True):
+            ftp.set_pasv(True)
 
-            for _ in range(files_count):
-                server = random.choice(servers)
-                operation = random.choice(operations)
+        return ftp
 
-                try:
-                    ftp = ftplib.FTP()
-                    ftp.connect(server['host'], server['port'], timeout=30)
-                    ftp.login(server['username'], server['password'])
+    def close_ftp_session(self, ftp):
+        try:
+            ftp.quit()
+        except Exception:
+            try:
+                ftp.close()
+            except Exception:
+                pass
 
-                    if server.get('passive', True):
-                        ftp.set_pasv(True)
+    def checkout_ftp_session(self, server):
+        pool_config = self.config.get('ftp_config', {}).get('session_pool', {})
+        if not pool_config.get('enabled', True):
+            return self.open_ftp_session(server)
 
-                    if operation == "list":
-                        files = ftp.nlst()
-                        print(
-                            f"[{datetime.now().strftime('%H:%M:%S')}] FTP LIST on {server['host']}: {len(files)} files")
-
-                    elif operation == "upload":
-                        text_files_path = self.get_save_path("text_files")
-                        if os.path.exists(text_files_path):
-                            local_files = [f for f in os.listdir(text_files_path) if f.endswith('.txt')]
-                            if local_files:
-                                local_file = random.choice(local_files)
-                                local_path = os.path.join(text_files_path, local_file)
-                                remote_name = f"uploaded_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{local_file}"
-
-                                with open(local_path, 'rb') as f:
-                                    ftp.storbinary(f'STOR {remote_name}', f)
-                                print(
-                                    f"[{datetime.now().strftime('%H:%M:%S')}] FTP UPLOAD to {server['host']}: {remote_name}")
-
-                    elif operation == "download":
-                        try:
-                            files = ftp.nlst()
-                            if files:
-                                remote_file = random.choice(files)
-                                download_path = self.get_save_path("downloads")
-                                if not os.path.exists(download_path):
-                                    os.makedirs(download_path)
-
-                                local_path = os.path.join(download_path, f"ftp_{remote_file}")
-                                with open(local_path, 'wb') as f:
-                                    ftp.retrbinary(f'RETR {remote_file}', f.write)
-                                print(
-                                    f"[{datetime.now().strftime('%H:%M:%S')}] FTP DOWNLOAD from {server['host']}: {remote_file}")
-                        except:
-                            pass
+        keepalive_seconds = pool_config.get('keepalive_seconds', 60)
+        key = self.get_ftp_server_key(server)
 
-                    ftp.quit()
-                    time.sleep(random.randint(10, 30))
+        while True:
+            with self.ftp_sessions_lock:
+                idle_sessions = self.ftp_sessions.get(key, [])
+                if not idle_sessions:
+                    break
+                ftp, last_used = idle_sessions.pop()
 
-                except Exception as e:
-                    print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP error with {server['host']}: {e}")
+            if time.time() - last_used < keepalive_seconds:
+                return ftp
 
-        except ImportError:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP operations require ftplib (should be built-in)")
+            try:
+                ftp.voidcmd('NOOP')
+                return ftp
+            except Exception:
+                self.close_ftp_session(ftp)
+
+        return self.open_ftp_session(server)
+
+    def release_ftp_session(self, server, ftp, broken=False):
+        pool_config = self.config.get('ftp_config', {}).get('session_pool', {})
+        if broken or not pool_config.get('enabled', True) or not self.is_running:
+            self.close_ftp_session(ftp)
+            return
+
+        key = self.get_ftp_server_key(server)
+        with self.ftp_sessions_lock:
+            idle_sessions = self.ftp_sessions.setdefault(key, [])
+            if len(idle_sessions) < pool_config.get('max_idle_per_server', 4):
+                idle_sessions.append((ftp, time.time()))
+                return
+
+        self.close_ftp_session(ftp)
+
+    def close_ftp_sessions(self):
+        with self.ftp_sessions_lock:
+            sessions = [ftp for idle_sessions in self.ftp_sessions.values() for ftp, _ in idle_sessions]
+            self.ftp_sessions.clear()
+            self.ftp_listing_cache.clear()
+
+        for ftp in sessions:
+            self.close_ftp_session(ftp)
+
+    def start_ftp_keepalive(self):
+        def keepalive():
+            pool_config = self.config.get('ftp_config', {}).get('session_pool', {})
+            keepalive_seconds = pool_config.get('keepalive_seconds', 60)
+            max_idle_seconds = pool_config.get('max_idle_seconds', 600)
+            next_check = time.time() + keepalive_seconds
+
+            while self.is_running:
+                time.sleep(1)
+                if time.time() < next_check:
+                    continue
+                next_check = time.time() + keepalive_seconds
+
+                with self.ftp_sessions_lock:
+                    idle = [(key, session) for key, sessions in self.ftp_sessions.items() for session in sessions]
+                    for key, session in idle:
+                        self.ftp_sessions[key].remove(session)
+
+                for key, (ftp, last_used) in idle:
+                    if time.time() - last_used > max_idle_seconds:
+                        self.close_ftp_session(ftp)
+                        continue
+
+                    try:
+                        ftp.voidcmd('NOOP')
+                    except Exception:
+                        self.close_ftp_session(ftp)
+                        continue
+
+                    with self.ftp_sessions_lock:
+                        self.ftp_sessions.setdefault(key, []).append((ftp, last_used))
+
+            self.close_ftp_sessions()
+
+        thread = threading.Thread(target=keepalive)
+        thread.daemon = True
+        return thread
+
+    def ftp_list_files(self, server, ftp):
+        ttl = self.config.get('ftp_config', {}).get('session_pool', {}).get('listing_ttl_seconds', 30)
+        key = self.get_ftp_server_key(server)
+
+        with self.ftp_sessions_lock:
+            cached = self.ftp_listing_cache.get(key)
+        if cached and time.time() - cached[1] < ttl:
+            return cached[0]
+
+        files = ftp.nlst()
+        with self.ftp_sessions_lock:
+            self.ftp_listing_cache[key] = (files, time.time())
+        return files
+
+    def invalidate_ftp_listing(self, server):
+        with self.ftp_sessions_lock:
+            self.ftp_listing_cache.pop(self.get_ftp_server_key(server), None)
+
+    def perform_ftp_operation(self, ftp, server, operation):
+        if operation == "list":
+            files = self.ftp_list_files(server, ftp)
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] FTP LIST on {server['host']}: {len(files)} files")
+
+        elif operation == "upload":
+            text_files_path = self.get_save_path("text_files")
+            if os.path.exists(text_files_path):
+                local_files = [f for f in os.listdir(text_files_path) if f.endswith('.txt')]
+                if local_files:
+                    local_file = random.choice(local_files)
+                    local_path = os.path.join(text_files_path, local_file)
+                    remote_name = f"uploaded_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{local_file}"
+
+                    shaper = self.get_bandwidth_limiter('ftp')
+                    with open(local_path, 'rb') as f:
+                        if shaper:
+                            ftp.storbinary(f'STOR {remote_name}', f, 65536,
+                                           lambda block: shaper.consume(len(block)))
+                        else:
+                            ftp.storbinary(f'STOR {remote_name}', f)
+                    self.invalidate_ftp_listing(server)
+                    print(
+                        f"[{datetime.now().strftime('%H:%M:%S')}] FTP UPLOAD to {server['host']}: {remote_name}")
+
+        elif operation == "download":
+            files = self.ftp_list_files(server, ftp)
+            if files:
+                remote_file = random.choice(files)
+                download_path = self.get_save_path("downloads")
+                if not os.path.exists(download_path):
+                    os.makedirs(download_path)
+
+                local_path = os.path.join(download_path, f"ftp_{os.path.basename(remote_file)}")
+                shaper = self.get_bandwidth_limiter('ftp')
+                with open(local_path, 'wb') as f:
+                    if shaper:
+                        def write_block(block):
+                            shaper.consume(len(block))
+                            f.write(block)
+
+                        ftp.retrbinary(f'RETR {remote_file}', write_block, 65536)
+                    else:
+                        ftp.retrbinary(f'RETR {remote_file}', f.write)
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] FTP DOWNLOAD from {server['host']}: {remote_file}")
+
+    def record_transfer(self, protocol, host, operation, name, transferred, seconds, resumes=0, success=True):
+        throughput_kbps = (transferred * 8 / 1024 / seconds) if seconds > 0 else 0.0
+        self.record_metric(f"{protocol}_bytes", transferred)
+        if not success:
+            self.record_metric(f"{protocol}_errors")
+        try:
+            self.store_results(
+                "INSERT INTO transfers (ts, protocol, persona, host, operation, name, bytes, seconds, "
+                "throughput_kbps, resumes, success) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(time.time(), protocol, self.get_persona_name(), host, operation, name, transferred, seconds,
+                  throughput_kbps, resumes, int(success))])
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error recording transfer: {e}")
+        return throughput_kbps
+
+    def ftp_upload_resumable(self, server, remote_name, payload, blocksize, max_resumes):
+        import ftplib
+
+        connection_errors = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply)
+        shaper = self.get_bandwidth_limiter('ftp')
+        resumes = 0
+
+        def on_block(block):
+            if shaper:
+                shaper.consume(len(block))
+
+        while True:
+            ftp = self.checkout_ftp_session(server)
+            try:
+                offset = 0
+                if resumes:
+                    ftp.voidcmd('TYPE I')
+                    try:
+                        offset = ftp.size(remote_name) or 0
+                    except ftplib.error_perm:
+                        # 550: nothing was stored before the drop, or SIZE is refused.
+                        offset = 0
+                payload.seek(offset)
+                ftp.storbinary(f'STOR {remote_name}', payload, blocksize, on_block, rest=offset or None)
+                self.release_ftp_session(server, ftp)
+                self.invalidate_ftp_listing(server)
+                return resumes
+            except connection_errors as e:
+                self.release_ftp_session(server, ftp, broken=True)
+                if resumes >= max_resumes or not self.is_running:
+                    raise
+                resumes += 1
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] FTP upload of {remote_name} to {server['host']} interrupted ({e}), resuming")
+            except Exception:
+                self.release_ftp_session(server, ftp)
+                raise
+
+    def ftp_download_resumable(self, server, remote_name, local_path, blocksize, max_resumes):
+        import ftplib
+
+        connection_errors = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply)
+        shaper = self.get_bandwidth_limiter('ftp')
+        resumes = 0
+
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+        while True:
+            ftp = self.checkout_ftp_session(server)
+            try:
+                offset = os.path.getsize(local_path) if os.path.exists(local_path) else 0
+                with open(local_path, 'ab') as f:
+                    def on_block(block):
+                        if shaper:
+                            shaper.consume(len(block))
+                        f.write(block)
+
+                    ftp.retrbinary(f'RETR {remote_name}', on_block, blocksize, rest=offset or None)
+                self.release_ftp_session(server, ftp)
+                return resumes
+            except connection_errors as e:
+                self.release_ftp_session(server, ftp, broken=True)
+                if resumes >= max_resumes or not self.is_running:
+                    raise
+                resumes += 1
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] FTP download of {remote_name} from {server['host']} interrupted ({e}), resuming")
+            except Exception:
+                self.release_ftp_session(server, ftp)
+                raise
+
+    def ftp_workload_worker(self, server, deadline, totals, totals_lock):
+        workload_config = self.config['ftp_config'].get('workload', {})
+        operations = workload_config.get('operations', ['upload', 'download'])
+        size_range_mb = workload_config.get('payload_size_mb', [10, 100])
+        blocksize = workload_config.get('chunk_size_kb', 256) * 1024
+        max_resumes = workload_config.get('max_resume_attempts', 3) if workload_config.get('resume', True) else 0
+        keep_downloads = workload_config.get('keep_downloads', False)
+
+        while self.is_running and time.time() < deadline:
+            operation = random.choice(operations)
+            remote_name = None
+            transferred = 0
+            start_time = time.time()
+
+            try:
+                if operation == 'upload':
+                    size = int(random.uniform(*size_range_mb) * 1024 * 1024)
+                    remote_name = f"ubs_load_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.getrandbits(32):08x}.bin"
+                    resumes = self.ftp_upload_resumable(server, remote_name, GeneratedPayload(size), blocksize,
+                                                        max_resumes)
+                    transferred = size
+
+                else:
+                    ftp = self.checkout_ftp_session(server)
+                    try:
+                        files = self.ftp_list_files(server, ftp)
+                    finally:
+                        self.release_ftp_session(server, ftp)
+
+                    candidates = [f for f in files if os.path.basename(f).startswith('ubs_load_')] or files
+                    if not candidates:
+                        time.sleep(1)
+                        continue
+
+                    remote_name = random.choice(candidates)
+                    download_path = self.get_save_path("downloads")
+                    if not os.path.exists(download_path):
+                        os.makedirs(download_path)
+
+                    local_path = os.path.join(download_path, f"ftp_load_{threading.get_ident()}_{os.path.basename(remote_name)}")
+                    resumes = self.ftp_download_resumable(server, remote_name, local_path, blocksize, max_resumes)
+                    transferred = os.path.getsize(local_path)
+                    if not keep_downloads:
+                        os.remove(local_path)
+
+                elapsed = time.time() - start_time
+                throughput_kbps = self.record_transfer('ftp', server['host'], operation, remote_name, transferred,
+                                                       elapsed, resumes)
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] FTP {operation.upper()} {remote_name} on {server['host']}: {transferred} bytes in {elapsed:.1f}s ({throughput_kbps:.1f} kbit/s, {resumes} resumes)")
+
+                with totals_lock:
+                    totals['transfers'] += 1
+                    totals['bytes'] += transferred
+
+            except Exception as e:
+                self.record_transfer('ftp', server['host'], operation, remote_name, transferred,
+                                     time.time() - start_time, success=False)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP workload {operation} error with {server['host']}: {e}")
+                with totals_lock:
+                    totals['failures'] += 1
+                time.sleep(1)
+
+    def ftp_workload(self):
+        workload_config = self.config['ftp_config'].get('workload', {})
+        servers = self.config['ftp_config'].get('servers', [])
+        workers_per_server = max(1, workload_config.get('workers_per_server', 2))
+        duration = workload_config.get('duration_seconds', 300)
+
+        if not servers:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP workload has no servers configured")
+            return
+
+        deadline = time.time() + duration
+        totals = {'transfers': 0, 'failures': 0, 'bytes': 0}
+        totals_lock = threading.Lock()
+        persona = self.get_persona_name()
+        start_time = time.time()
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] FTP workload: {workers_per_server} workers on each of {len(servers)} servers for {duration}s")
+
+        with ThreadPoolExecutor(max_workers=workers_per_server * len(servers)) as executor:
+            futures = [executor.submit(self.run_as_persona, persona, self.ftp_workload_worker,
+                                       server, deadline, totals, totals_lock)
+                       for server in servers for _ in range(workers_per_server)]
+            for future in futures:
+                future.result()
+
+        elapsed = time.time() - start_time
+        aggregate_kbps = (totals['bytes'] * 8 / 1024 / elapsed) if elapsed > 0 else 0.0
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] FTP workload complete: {totals['transfers']} transfers, {totals['failures']} failures, {totals['bytes']} bytes ({aggregate_kbps:.1f} kbit/s aggregate)")
+
+    def ftp_random_operations(self):
+        import ftplib
+
+        servers = self.config['ftp_config'].get('servers', [])
+        operations = self.config['ftp_config'].get('operations', ['list'])
+        files_per_session_range = self.config['ftp_config'].get('files_per_session', [1, 3])
+        files_count = random.randint(*files_per_session_range)
+        connection_errors = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply)
+
+        for _ in range(files_count):
+            server = random.choice(servers)
+            operation = random.choice(operations)
+
+            try:
+                for attempt in range(2):
+                    ftp = self.checkout_ftp_session(server)
+                    try:
+                        self.perform_ftp_operation(ftp, server, operation)
+                    except connection_errors as e:
+                        self.release_ftp_session(server, ftp, broken=True)
+                        if attempt == 0:
+                            print(
+                                f"[{datetime.now().strftime('%H:%M:%S')}] FTP session to {server['host']} lost ({e}), reconnecting")
+                            continue
+                        raise
+                    except Exception:
+                        self.release_ftp_session(server, ftp)
+                        raise
+
+                    self.release_ftp_session(server, ftp)
+                    break
+
+                time.sleep(random.randint(10, 30))
+
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP error with {server['host']}: {e}")
+
+    def ftp_operations(self):
+        if not self.config.get('ftp_config', {}).get('enabled', False):
+            return
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting FTP operations")
+
+        try:
+            import ftplib
+
+            if self.config['ftp_config'].get('workload', {}).get('enabled', False):
+                self.ftp_workload()
+            else:
+                self.ftp_random_operations()
+
+        except ImportError:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP operations require ftplib (should be built-in)")
         except Exception as e:
             print(f"[{datetime.now().strftime('%H:%M:%S')}] FTP operations error: {e}")
 
@@ -1725,98 +4075,437 @@ class UserBehaviorSimulator:
         if not self.config.get('scheduled_tasks', {}).get('enabled', False):
             self.wait_between_tasks()
 
-    def send_smtp_email(self):
-        if not self.config.get('smtp_config', {}).get('enabled', False):
+    def open_smtp_session(self, server_config):
+        import smtplib
+
+        server = smtplib.SMTP(server_config['server'], server_config['port'], timeout=30)
+        server.set_debuglevel(0)
+
+        if server_config.get('use_tls', True):
+            server.starttls()
+
+        if server_config.get('username') and server_config.get('password'):
+            server.login(server_config['username'], server_config['password'])
+
+        return server
+
+    def close_smtp_session(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def checkout_smtp_session(self, provider, server_config):
+        pool_config = self.config.get('smtp_config', {}).get('session_pool', {})
+        if not pool_config.get('enabled', True):
+            return self.open_smtp_session(server_config), 0
+
+        noop_after_seconds = pool_config.get('noop_after_seconds', 30)
+        idle_timeout_seconds = pool_config.get('idle_timeout_seconds', 120)
+
+        while True:
+            with self.smtp_sessions_lock:
+                idle_sessions = self.smtp_sessions.get(provider, [])
+                if not idle_sessions:
+                    break
+                server, sent_count, last_used = idle_sessions.pop()
+
+            idle_time = time.time() - last_used
+            if idle_time > idle_timeout_seconds:
+                self.close_smtp_session(server)
+                continue
+            if idle_time < noop_after_seconds:
+                return server, sent_count
+
+            try:
+                if server.noop()[0] == 250:
+                    return server, sent_count
+            except Exception:
+                pass
+            self.close_smtp_session(server)
+
+        return self.open_smtp_session(server_config), 0
+
+    def release_smtp_session(self, provider, server, sent_count, broken=False):
+        pool_config = self.config.get('smtp_config', {}).get('session_pool', {})
+        max_messages = pool_config.get('max_messages_per_session', 100)
+
+        if broken or not pool_config.get('enabled', True) or sent_count >= max_messages or not self.is_running:
+            self.close_smtp_session(server)
             return
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting SMTP email task")
+        with self.smtp_sessions_lock:
+            self.smtp_sessions.setdefault(provider, []).append((server, sent_count, time.time()))
+
+    def close_smtp_sessions(self):
+        with self.smtp_sessions_lock:
+            sessions = [server for idle_sessions in self.smtp_sessions.values() for server, _, _ in idle_sessions]
+            self.smtp_sessions.clear()
 
+        for server in sessions:
+            self.close_smtp_session(server)
+
+    def is_smtp_session_limit(self, error):
+        message = error.smtp_error.decode('utf-8', errors='ignore') if isinstance(error.smtp_error, bytes) else str(error.smtp_error)
+        return error.smtp_code == 421 or (400 <= error.smtp_code < 500 and 'too many' in message.lower())
+
+    def deliver_smtp_message(self, provider, server_config, msg):
         try:
-            import smtplib
-            from email.mime.multipart import MIMEMultipart
-            from email.mime.text import MIMEText
-            from email.mime.base import MIMEBase
-            from email import encoders
+            self.send_smtp_message_with_retry(provider, server_config, msg)
+        finally:
+            self.release_message_attachments(msg)
 
-            smtp_config = self.config['smtp_config']
-            provider = smtp_config.get('provider', 'gmail')
+    def send_smtp_message_with_retry(self, provider, server_config, msg):
+        import smtplib
 
-            if provider in smtp_config:
-                server_config = smtp_config[provider]
-            else:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] SMTP provider '{provider}' not configured")
-                return
+        for attempt in range(2):
+            server, sent_count = self.checkout_smtp_session(provider, server_config)
+            try:
+                if any(getattr(part, 'stream_path', None) for part in msg.walk()):
+                    self.send_streamed_message(server, msg)
+                else:
+                    server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self.release_smtp_session(provider, server, sent_count, broken=True)
+                if attempt == 0:
+                    continue
+                raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                if isinstance(e, smtplib.SMTPResponseException) and self.is_smtp_session_limit(e):
+                    self.release_smtp_session(provider, server, sent_count, broken=True)
+                    if attempt == 0:
+                        print(
+                            f"[{datetime.now().strftime('%H:%M:%S')}] SMTP session limit on {provider} ({e.smtp_code}), reconnecting")
+                        continue
+                    raise
 
-            recipients = smtp_config.get('recipients', [])
+                try:
+                    server.rset()
+                    self.release_smtp_session(provider, server, sent_count + 1)
+                except Exception:
+                    self.release_smtp_session(provider, server, sent_count, broken=True)
+                raise
+            except Exception:
+                self.release_smtp_session(provider, server, sent_count, broken=True)
+                raise
 
-            if not recipients:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] No SMTP recipients configured")
-                return
+            self.release_smtp_session(provider, server, sent_count + 1)
+            self.record_metric('emails_sent')
+            return
 
-            recipient = random.choice(recipients)
+    def get_smtp_server_config(self):
+        smtp_config = self.config['smtp_config']
+        provider = smtp_config.get('provider', 'gmail')
 
-            msg = MIMEMultipart()
-            msg['From'] = server_config['username']
-            msg['To'] = recipient
-            msg['Subject'] = f"Automated Message - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        if provider in smtp_config:
+            return provider, smtp_config[provider]
 
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] SMTP provider '{provider}' not configured")
+        return provider, None
+
+    def get_attachment_candidates(self):
+        attachment_config = self.config['smtp_config'].get('attachment_sources', {})
+        specific_files = []
+        generated_files = []
+
+        if attachment_config.get('use_specific_files', False):
+            specific_files = [f for f in attachment_config.get('specific_files', []) if os.path.exists(f)]
+
+        if attachment_config.get('use_generated_files', True):
+            file_types = tuple(attachment_config.get('file_types', ['.txt']))
+            text_files_path = self.get_save_path("text_files")
+
+            if os.path.exists(text_files_path):
+                for search_path in (text_files_path, self.get_save_path("downloads")):
+                    if os.path.exists(search_path):
+                        generated_files.extend(os.path.join(search_path, f) for f in os.listdir(search_path)
+                                               if f.endswith(file_types))
+
+        return specific_files, generated_files
+
+    def build_smtp_message(self, server_config, recipient, body_text=None, subject=None, candidates=None,
+                           attachments_count=None):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        smtp_config = self.config['smtp_config']
+
+        msg = MIMEMultipart()
+        msg['From'] = server_config['username']
+        msg['To'] = recipient
+        msg['Subject'] = subject or f"Automated Message - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
+        if body_text is None:
             body_text = self.get_random_text_from_api()
-            msg.attach(MIMEText(body_text, 'plain'))
+        msg.attach(MIMEText(body_text, 'plain'))
 
+        if attachments_count is None:
             attachments_per_email_range = smtp_config.get('attachments_per_email', [1, 2])
             attachments_count = random.randint(*attachments_per_email_range)
-            attachment_config = smtp_config.get('attachment_sources', {})
 
-            attached_files = []
+        specific_files, generated_files = candidates if candidates is not None else self.get_attachment_candidates()
+        attached_files = []
+
+        if specific_files:
+            selected_files = random.sample(specific_files, min(attachments_count, len(specific_files)))
+            for filepath in selected_files:
+                self.attach_file_to_email(msg, filepath)
+                attached_files.append(os.path.basename(filepath))
+
+        remaining_attachments = attachments_count - len(attached_files)
+        if generated_files and remaining_attachments > 0:
+            selected_files = random.sample(generated_files, min(remaining_attachments, len(generated_files)))
+            for filepath in selected_files:
+                self.attach_file_to_email(msg, filepath)
+                attached_files.append(os.path.basename(filepath))
+
+        return msg, attached_files
+
+    def build_campaign_bodies(self, pool_size):
+        api_texts = [self.get_random_text_from_api() for _ in range(min(5, pool_size))]
+        greetings = ["Hi", "Hello", "Good morning", "Hey team", "Dear colleague"]
+        closings = ["Thanks", "Best regards", "Cheers", "Kind regards", "Talk soon"]
+
+        bodies = []
+        for index in range(pool_size):
+            paragraphs = [self.generate_random_text() for _ in range(random.randint(1, 3))]
+            if api_texts:
+                paragraphs.insert(random.randint(0, len(paragraphs)), api_texts[index % len(api_texts)])
+            bodies.append(f"{random.choice(greetings)},\n\n" + "\n\n".join(paragraphs) +
+                          f"\n\n{random.choice(closings)}")
+        return bodies
+
+    def run_email_campaign(self, provider, server_config):
+        import smtplib
+
+        smtp_config = self.config['smtp_config']
+        campaign_config = smtp_config.get('campaign', {})
+        recipients = smtp_config.get('recipients', [])
+        total_messages = campaign_config.get('messages', 10000)
+        sessions = max(1, campaign_config.get('sessions', 8))
+        rate_per_second = campaign_config.get('rate_per_second', 0)
+        duration = campaign_config.get('duration_seconds', 3600)
+        attachment_probability = campaign_config.get('attachment_probability', 0.3)
+        attachments_range = smtp_config.get('attachments_per_email', [1, 2])
+
+        bodies = self.build_campaign_bodies(campaign_config.get('body_pool_size', 50))
+        subjects = ["Quarterly report", "Meeting notes", "Re: project update", "Invoice", "Follow-up",
+                    "Weekly summary", "Action items", "Fwd: documents", "Schedule change", "Question"]
+        candidates = self.get_attachment_candidates()
+        has_candidates = bool(candidates[0] or candidates[1])
+        limiter = TokenBucket(rate_per_second, sessions) if rate_per_second > 0 else None
+
+        state = {'next': 0, 'sent': 0, 'rejected': 0, 'errors': 0}
+        latencies = []
+        state_lock = threading.Lock()
+        persona = self.get_persona_name()
+        start_time = time.time()
+        deadline = start_time + duration
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Email campaign via {provider}: {total_messages} messages over {sessions} sessions")
+
+        def worker():
+            while self.is_running and time.time() < deadline:
+                with state_lock:
+                    if state['next'] >= total_messages:
+                        return
+                    index = state['next']
+                    state['next'] += 1
+
+                if limiter:
+                    limiter.consume(1)
+
+                recipient = recipients[index % len(recipients)]
+                attachments_count = 0
+                if has_candidates and random.random() < attachment_probability:
+                    attachments_count = random.randint(*attachments_range)
+                msg, _ = self.build_smtp_message(
+                    server_config, recipient, random.choice(bodies),
+                    f"{random.choice(subjects)} #{index + 1}", candidates, attachments_count)
+
+                send_start = time.time()
+                try:
+                    self.deliver_smtp_message(provider, server_config, msg)
+                    outcome = 'sent'
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    outcome = 'rejected'
+                except Exception as e:
+                    outcome = 'errors'
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Campaign message {index + 1} failed: {e}")
+                latency = time.time() - send_start
+
+                with state_lock:
+                    state[outcome] += 1
+                    if outcome == 'sent':
+                        latencies.append(latency)
+                    done = state['sent'] + state['rejected'] + state['errors']
+
+                if done % 1000 == 0:
+                    elapsed = time.time() - start_time
+                    print(
+                        f"[{datetime.now().strftime('%H:%M:%S')}] Campaign progress: {done}/{total_messages} ({done / elapsed:.1f} msg/s)")
+
+        with ThreadPoolExecutor(max_workers=sessions) as executor:
+            futures = [executor.submit(self.run_as_persona, persona, worker) for _ in range(sessions)]
+            for future in futures:
+                future.result()
+
+        elapsed = time.time() - start_time
+        latencies.sort()
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+        report = {
+            'sent': state['sent'],
+            'rejected': state['rejected'],
+            'errors': state['errors'],
+            'seconds': elapsed,
+            'messages_per_second': state['sent'] / elapsed if elapsed > 0 else 0.0,
+            'latency_p50_ms': percentile(0.50),
+            'latency_p95_ms': percentile(0.95),
+            'latency_p99_ms': percentile(0.99)
+        }
 
-            if attachment_config.get('use_specific_files', False):
-                specific_files = attachment_config.get('specific_files', [])
-                available_specific = [f for f in specific_files if os.path.exists(f)]
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Email campaign complete: {report['sent']} sent, {report['rejected']} rejected, {report['errors']} errors in {elapsed:.1f}s ({report['messages_per_second']:.1f} msg/s)")
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Email campaign latency: p50 {report['latency_p50_ms']:.1f} ms, p95 {report['latency_p95_ms']:.1f} ms, p99 {report['latency_p99_ms']:.1f} ms")
+        return report
+
+    @staticmethod
+    def start_smtp_sink(host='127.0.0.1', port=2525):
+        import socketserver
+
+        counters = {'messages': 0, 'bytes': 0}
+        counters_lock = threading.Lock()
+
+        class SMTPSinkHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.wfile.write(b"220 user-behavior-simulator SMTP sink ready\r\n")
+                while True:
+                    line = self.rfile.readline(65536)
+                    if not line:
+                        return
+
+                    command = line[:4].upper()
+                    if command in (b'EHLO', b'HELO'):
+                        self.wfile.write(b"250-localhost\r\n250-8BITMIME\r\n250 SIZE 0\r\n")
+                    elif command == b'DATA':
+                        self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                        size = 0
+                        while True:
+                            data_line = self.rfile.readline(1024 * 1024)
+                            if not data_line or data_line in (b".\r\n", b".\n"):
+                                break
+                            size += len(data_line)
+                        with counters_lock:
+                            counters['messages'] += 1
+                            counters['bytes'] += size
+                        self.wfile.write(b"250 OK queued\r\n")
+                    elif command == b'QUIT':
+                        self.wfile.write(b"221 Bye\r\n")
+                        return
+                    elif command in (b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                        self.wfile.write(b"250 OK\r\n")
+                    else:
+                        self.wfile.write(b"502 Command not implemented\r\n")
+
+        class SMTPSinkServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
 
-                if available_specific:
-                    selected_files = random.sample(available_specific, min(attachments_count, len(available_specific)))
-                    for filepath in selected_files:
-                        self.attach_file_to_email(msg, filepath)
-                        attached_files.append(os.path.basename(filepath))
+        server = SMTPSinkServer((host, port), SMTPSinkHandler)
+        server.counters = counters
 
-            if attachment_config.get('use_generated_files', True) and len(attached_files) < attachments_count:
-                remaining_attachments = attachments_count - len(attached_files)
-                text_files_path = self.get_save_path("text_files")
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
 
-                if os.path.exists(text_files_path):
-                    file_types = attachment_config.get('file_types', ['.txt'])
-                    available_files = []
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] SMTP sink listening on {host}:{server.server_address[1]}")
+        return server
 
-                    for file_type in file_types:
-                        files = [f for f in os.listdir(text_files_path) if f.endswith(file_type)]
-                        available_files.extend([os.path.join(text_files_path, f) for f in files])
+    def send_smtp_batch(self, provider, server_config):
+        import smtplib
 
-                    downloads_path = self.get_save_path("downloads")
-                    if os.path.exists(downloads_path):
-                        for file_type in file_types:
-                            files = [f for f in os.listdir(downloads_path) if f.endswith(file_type)]
-                            available_files.extend([os.path.join(downloads_path, f) for f in files])
+        smtp_config = self.config['smtp_config']
+        batch_config = smtp_config.get('batch', {})
+        recipients = smtp_config.get('recipients', [])
+        message_count = random.randint(*batch_config.get('messages', [5, 20]))
+        rate_per_minute = batch_config.get('rate_per_minute', 30)
+        interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
 
-                    if available_files:
-                        selected_files = random.sample(available_files,
-                                                       min(remaining_attachments, len(available_files)))
-                        for filepath in selected_files:
-                            self.attach_file_to_email(msg, filepath)
-                            attached_files.append(os.path.basename(filepath))
+        base_text = self.get_random_text_from_api()
+        candidates = self.get_attachment_candidates()
+        sent = 0
+        failed = 0
+        start_time = time.time()
+
+        for index in range(message_count):
+            if not self.is_running:
+                break
 
-            server = smtplib.SMTP(server_config['server'], server_config['port'])
-            server.set_debuglevel(0)
+            next_slot = start_time + index * interval
+            if next_slot > time.time():
+                time.sleep(next_slot - time.time())
 
-            if server_config.get('use_tls', True):
-                server.starttls()
+            recipient = recipients[index % len(recipients)]
+            body_text = f"{base_text}\n\n{self.generate_random_text()}"
+            msg, attached_files = self.build_smtp_message(server_config, recipient, body_text, candidates=candidates)
 
             try:
-                server.login(server_config['username'], server_config['password'])
-                server.send_message(msg)
-                server.quit()
+                self.deliver_smtp_message(provider, server_config, msg)
+                sent += 1
+            except smtplib.SMTPAuthenticationError:
+                raise
+            except Exception as e:
+                failed += 1
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] SMTP batch message to {recipient} failed: {e}")
 
-                print(
-                    f"[{datetime.now().strftime('%H:%M:%S')}] SMTP email sent via {provider} to {recipient} with {len(attached_files)} attachments: {', '.join(attached_files)}")
+        elapsed = time.time() - start_time
+        rate = sent * 60 / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] SMTP batch via {provider}: {sent}/{message_count} sent, {failed} failed in {elapsed:.1f}s ({rate:.1f} msg/min)")
+
+    def send_smtp_email(self):
+        if not self.config.get('smtp_config', {}).get('enabled', False):
+            return
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting SMTP email task")
+
+        try:
+            import smtplib
+
+            smtp_config = self.config['smtp_config']
+            provider, server_config = self.get_smtp_server_config()
+
+            if server_config is None:
+                return
+
+            recipients = smtp_config.get('recipients', [])
+
+            if not recipients:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] No SMTP recipients configured")
+                return
+
+            try:
+                if smtp_config.get('campaign', {}).get('enabled', False):
+                    self.run_email_campaign(provider, server_config)
+                elif smtp_config.get('batch', {}).get('enabled', False):
+                    self.send_smtp_batch(provider, server_config)
+                else:
+                    recipient = random.choice(recipients)
+                    msg, attached_files = self.build_smtp_message(server_config, recipient)
+                    self.deliver_smtp_message(provider, server_config, msg)
+
+                    print(
+                        f"[{datetime.now().strftime('%H:%M:%S')}] SMTP email sent via {provider} to {recipient} with {len(attached_files)} attachments: {', '.join(attached_files)}")
 
             except smtplib.SMTPAuthenticationError as e:
                 print(f"[{datetime.now().strftime('%H:%M:%S')}] SMTP Authentication failed for {provider}: {e}")
@@ -1834,40 +4523,427 @@ class UserBehaviorSimulator:
         if not self.config.get('scheduled_tasks', {}).get('enabled', False):
             self.wait_between_tasks()
 
+    def get_attachment_cache_dir(self):
+        cache_dir = self.config.get('smtp_config', {}).get('attachment_cache', {}).get('cache_dir', '')
+        if not cache_dir:
+            cache_dir = os.path.join(tempfile.gettempdir(), 'user_behavior_simulator_attachments')
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        return cache_dir
+
+    def stream_encode_attachment(self, filepath, encoded_path):
+        import base64
+
+        partial_path = f"{encoded_path}.{threading.get_ident()}.partial"
+        with open(filepath, 'rb') as source, open(partial_path, 'wb') as target:
+            while True:
+                chunk = source.read(57 * 1152)
+                if not chunk:
+                    break
+                target.write(base64.encodebytes(chunk).replace(b'\n', b'\r\n'))
+        os.replace(partial_path, encoded_path)
+        return os.path.getsize(encoded_path)
+
+    def build_attachment_part(self, filepath, size):
+        import mimetypes
+        import hashlib
+        from email.mime.base import MIMEBase
+        from email.mime.text import MIMEText
+        from email.mime.image import MIMEImage
+        from email.mime.audio import MIMEAudio
+        from email import encoders
+
+        content_type, encoding = mimetypes.guess_type(filepath)
+
+        if content_type is None or encoding is not None:
+            content_type = 'application/octet-stream'
+
+        main_type, sub_type = content_type.split('/', 1)
+        cache_config = self.config.get('smtp_config', {}).get('attachment_cache', {})
+        stream_threshold = cache_config.get('stream_threshold_kb', 1024) * 1024
+
+        if size > stream_threshold:
+            key_hash = hashlib.sha1(f"{os.path.abspath(filepath)}|{size}|{os.path.getmtime(filepath)}".encode()).hexdigest()
+            encoded_path = os.path.join(self.get_attachment_cache_dir(), f"{key_hash}.b64")
+            if not os.path.exists(encoded_path):
+                self.stream_encode_attachment(filepath, encoded_path)
+
+            attachment = MIMEBase(main_type, sub_type)
+            attachment.stream_marker = f"UBS-STREAMED-ATTACHMENT-{key_hash}"
+            attachment.stream_path = encoded_path
+            attachment.set_payload(attachment.stream_marker)
+            attachment['Content-Transfer-Encoding'] = 'base64'
+            return attachment, len(attachment.stream_marker)
+
+        with open(filepath, "rb") as fp:
+            data = fp.read()
+
+        attachment = None
+        if main_type == 'text':
+            try:
+                attachment = MIMEText(data.decode('utf-8'), _subtype=sub_type, _charset='utf-8')
+            except UnicodeDecodeError:
+                attachment = None
+        elif main_type == 'image':
+            attachment = MIMEImage(data, _subtype=sub_type)
+        elif main_type == 'audio':
+            attachment = MIMEAudio(data, _subtype=sub_type)
+
+        if attachment is None:
+            attachment = MIMEBase(main_type, sub_type)
+            attachment.set_payload(data)
+            encoders.encode_base64(attachment)
+
+        return attachment, len(attachment.get_payload())
+
+    def remove_attachment_stream(self, stream_path):
+        try:
+            os.remove(stream_path)
+        except OSError:
+            pass
+
+    def evict_attachment_cache(self, max_bytes, keep=None):
+        # Caller holds attachment_cache_lock. Stream files still referenced by unsent
+        # messages are only deleted once release_message_attachments drops the last one.
+        for key in list(self.attachment_cache):
+            if self.attachment_cache_bytes <= max_bytes:
+                break
+            if key == keep:
+                continue
+
+            part, cached_size = self.attachment_cache.pop(key)
+            self.attachment_cache_bytes -= cached_size
+            stream_path = getattr(part, 'stream_path', None)
+            if not stream_path:
+                continue
+            if self.attachment_stream_refs.get(stream_path):
+                self.attachment_streams_evicted.add(stream_path)
+            else:
+                self.remove_attachment_stream(stream_path)
+
+    def checkout_attachment_part(self, part):
+        import copy
+
+        # Caller holds attachment_cache_lock
+        stream_path = getattr(part, 'stream_path', None)
+        if stream_path:
+            self.attachment_stream_refs[stream_path] = self.attachment_stream_refs.get(stream_path, 0) + 1
+        return copy.deepcopy(part)
+
+    def release_message_attachments(self, msg):
+        with self.attachment_cache_lock:
+            for part in msg.walk():
+                stream_path = getattr(part, 'stream_path', None)
+                if not stream_path or stream_path not in self.attachment_stream_refs:
+                    continue
+
+                self.attachment_stream_refs[stream_path] -= 1
+                if self.attachment_stream_refs[stream_path] > 0:
+                    continue
+
+                del self.attachment_stream_refs[stream_path]
+                if stream_path in self.attachment_streams_evicted:
+                    self.attachment_streams_evicted.discard(stream_path)
+                    self.remove_attachment_stream(stream_path)
+
+    def get_attachment_part(self, filepath):
+        stat = os.stat(filepath)
+        key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+        cache_config = self.config.get('smtp_config', {}).get('attachment_cache', {})
+        max_bytes = cache_config.get('max_cache_mb', 64) * 1024 * 1024
+
+        with self.attachment_cache_lock:
+            cached = self.attachment_cache.get(key)
+            stream_path = getattr(cached[0], 'stream_path', None) if cached else None
+            if cached and (not stream_path or os.path.exists(stream_path)):
+                self.attachment_cache.move_to_end(key)
+                return self.checkout_attachment_part(cached[0])
+
+        part, cached_size = self.build_attachment_part(filepath, stat.st_size)
+        part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(filepath))
+
+        stream_path = getattr(part, 'stream_path', None)
+        with self.attachment_cache_lock:
+            if stream_path:
+                if not os.path.exists(stream_path):
+                    self.stream_encode_attachment(filepath, stream_path)
+                cached_size = os.path.getsize(stream_path)
+                self.attachment_streams_evicted.discard(stream_path)
+
+            if key not in self.attachment_cache:
+                self.attachment_cache[key] = (part, cached_size)
+                self.attachment_cache_bytes += cached_size
+            self.attachment_cache.move_to_end(key)
+            self.evict_attachment_cache(max_bytes, keep=key)
+
+            return self.checkout_attachment_part(part)
+
     def attach_file_to_email(self, msg, filepath):
         try:
-            import mimetypes
-            from email.mime.base import MIMEBase
-            from email.mime.text import MIMEText
-            from email.mime.image import MIMEImage
-            from email.mime.audio import MIMEAudio
-            from email import encoders
+            msg.attach(self.get_attachment_part(filepath))
 
-            filename = os.path.basename(filepath)
-            content_type, encoding = mimetypes.guess_type(filepath)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error attaching file {filepath}: {e}")
 
-            if content_type is None or encoding is not None:
-                content_type = 'application/octet-stream'
+    def send_streamed_message(self, server, msg):
+        import smtplib
+        from email.generator import BytesGenerator
+        from email.utils import getaddresses
+        import io
+
+        streamed_parts = [part for part in msg.walk() if getattr(part, 'stream_path', None)]
+        from_addr = msg['From']
+        to_addrs = [address for _, address in getaddresses(msg.get_all('To', []) + msg.get_all('Cc', []))]
+
+        buffer = io.BytesIO()
+        BytesGenerator(buffer, policy=msg.policy.clone(linesep='\r\n')).flatten(msg)
+        flattened = re.sub(rb'(?m)^\.', b'..', buffer.getvalue())
+
+        server.ehlo_or_helo_if_needed()
+        code, response = server.mail(from_addr)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, response, from_addr)
+
+        refused = {}
+        for address in to_addrs:
+            code, response = server.rcpt(address)
+            if code not in (250, 251):
+                refused[address] = (code, response)
+        if len(refused) == len(to_addrs):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, response = server.docmd('DATA')
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, response)
+
+        position = 0
+        for part in streamed_parts:
+            marker = part.stream_marker.encode()
+            index = flattened.index(marker, position)
+            server.send(flattened[position:index])
+            with open(part.stream_path, 'rb') as encoded:
+                while True:
+                    chunk = encoded.read(65536)
+                    if not chunk:
+                        break
+                    server.send(chunk)
+            position = index + len(marker)
+            if flattened[position:position + 2] == b'\r\n':
+                position += 2
+
+        tail = flattened[position:]
+        if not tail.endswith(b'\r\n'):
+            tail += b'\r\n'
+        server.send(tail + b'.\r\n')
+
+        code, response = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+        return refused
+
+    def get_ssh_server_key(self, server_config):
+        return (server_config['host'], server_config.get('port', 22), server_config['username'])
+
+    def open_ssh_client(self, server_config):
+        import paramiko
+
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+        if server_config.get('key_file'):
+            key = paramiko.RSAKey.from_private_key_file(server_config['key_file'])
+            ssh.connect(
+                server_config['host'],
+                port=server_config.get('port', 22),
+                username=server_config['username'],
+                pkey=key,
+                timeout=30
+            )
+        else:
+            ssh.connect(
+                server_config['host'],
+                port=server_config.get('port', 22),
+                username=server_config['username'],
+                password=server_config['password'],
+                timeout=30
+            )
+
+        keepalive_seconds = self.config.get('ssh_config', {}).get('session_pool', {}).get('keepalive_seconds', 30)
+        if keepalive_seconds:
+            ssh.get_transport().set_keepalive(keepalive_seconds)
+        return ssh
+
+    def get_ssh_client(self, server_config):
+        pool_config = self.config.get('ssh_config', {}).get('session_pool', {})
+        if not pool_config.get('enabled', True):
+            return self.open_ssh_client(server_config)
+
+        key = self.get_ssh_server_key(server_config)
+        with self.ssh_clients_lock:
+            connect_lock = self.ssh_connect_locks.setdefault(key, threading.Lock())
+
+        with connect_lock:
+            with self.ssh_clients_lock:
+                ssh = self.ssh_clients.get(key)
+
+            if ssh is not None:
+                transport = ssh.get_transport()
+                if transport is not None and transport.is_active():
+                    return ssh
+                self.close_ssh_client(server_config)
+
+            ssh = self.open_ssh_client(server_config)
+            with self.ssh_clients_lock:
+                self.ssh_clients[key] = ssh
+            return ssh
+
+    def close_ssh_client(self, server_config):
+        with self.ssh_clients_lock:
+            ssh = self.ssh_clients.pop(self.get_ssh_server_key(server_config), None)
+
+        if ssh is not None:
+            try:
+                ssh.close()
+            except Exception:
+                pass
 
-            main_type, sub_type = content_type.split('/', 1)
+    def close_ssh_clients(self):
+        with self.ssh_clients_lock:
+            clients = list(self.ssh_clients.values())
+            self.ssh_clients.clear()
 
-            with open(filepath, "rb") as fp:
-                if main_type == 'text':
-                    attachment = MIMEText(fp.read().decode('utf-8'), _subtype=sub_type)
-                elif main_type == 'image':
-                    attachment = MIMEImage(fp.read(), _subtype=sub_type)
-                elif main_type == 'audio':
-                    attachment = MIMEAudio(fp.read(), _subtype=sub_type)
-                else:
-                    attachment = MIMEBase(main_type, sub_type)
-                    attachment.set_payload(fp.read())
-                    encoders.encode_base64(attachment)
+        for ssh in clients:
+            try:
+                ssh.close()
+            except Exception:
+                pass
 
-            attachment.add_header('Content-Disposition', 'attachment', filename=filename)
-            msg.attach(attachment)
+    def ssh_run_command(self, ssh, server_config, command):
+        import select
 
+        output_config = self.config.get('ssh_config', {}).get('output', {})
+        capture_bytes = int(output_config.get('capture_kb', 256) * 1024)
+        chunk_size = max(1024, int(output_config.get('chunk_kb', 32) * 1024))
+        command_timeout = output_config.get('command_timeout_seconds', 300)
+
+        channel = ssh.get_transport().open_session(timeout=30)
+        start_time = time.monotonic()
+        deadline = start_time + command_timeout
+        streams = {
+            'stdout': {'data': bytearray(), 'total': 0, 'read': channel.recv, 'ready': channel.recv_ready},
+            'stderr': {'data': bytearray(), 'total': 0, 'read': channel.recv_stderr, 'ready': channel.recv_stderr_ready}
+        }
+        timed_out = False
+
+        try:
+            channel.exec_command(command)
+
+            while True:
+                progressed = False
+                for stream in streams.values():
+                    if stream['ready']():
+                        chunk = stream['read'](chunk_size)
+                        stream['total'] += len(chunk)
+                        room = capture_bytes - len(stream['data'])
+                        if room > 0:
+                            stream['data'] += chunk[:room]
+                        progressed = True
+
+                if progressed:
+                    continue
+                if channel.eof_received or channel.closed or channel.exit_status_ready():
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                # The channel's pipe is signalled on stdout/stderr data and on EOF.
+                select.select([channel], [], [], remaining)
+
+            exit_status = None if timed_out else channel.recv_exit_status()
+        finally:
+            channel.close()
+
+        duration = time.monotonic() - start_time
+        stdout, stderr = streams['stdout'], streams['stderr']
+        truncated = stdout['total'] > len(stdout['data']) or stderr['total'] > len(stderr['data'])
+
+        self.store_results(
+            "INSERT INTO ssh_commands (ts, persona, host, username, command, exit_status, duration, stdout_bytes, "
+            "stderr_bytes, truncated, timed_out, stdout, stderr) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(time.time(), self.get_persona_name(), server_config['host'], server_config['username'], command,
+              exit_status, duration, stdout['total'], stderr['total'], int(truncated), int(timed_out),
+              zlib.compress(bytes(stdout['data'])), zlib.compress(bytes(stderr['data'])))])
+
+        status_text = 'timed out' if timed_out else f"exit {exit_status}"
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] SSH command '{command}' executed on {server_config['host']} ({status_text}, {stdout['total']} bytes, {duration:.1f}s)")
+
+    def query_ssh_commands(self, host=None, since=None, limit=50, include_output=False):
+        conditions = []
+        params = []
+        if host:
+            conditions.append("host = ?")
+            params.append(host)
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since.timestamp() if isinstance(since, datetime) else since)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        columns = "ts, persona, host, username, command, exit_status, duration, stdout_bytes, stderr_bytes, truncated, timed_out"
+        if include_output:
+            columns += ", stdout, stderr"
+
+        rows = self.query_results(
+            f"SELECT {columns} FROM ssh_commands {where} ORDER BY ts DESC LIMIT ?", params + [limit])
+
+        for row in rows:
+            row['ts'] = datetime.fromtimestamp(row['ts'])
+            if include_output:
+                row['stdout'] = zlib.decompress(row['stdout']).decode('utf-8', errors='replace')
+                row['stderr'] = zlib.decompress(row['stderr']).decode('utf-8', errors='replace')
+        return rows
+
+    def ssh_server_session(self, server_config, selected_commands):
+        ssh_config = self.config['ssh_config']
+        pool_config = ssh_config.get('session_pool', {})
+        max_channels = max(1, pool_config.get('max_channels_per_host', 4))
+        delay_range = ssh_config.get('command_delay_seconds', [5, 15])
+        persona = self.get_persona_name()
+
+        try:
+            ssh = self.get_ssh_client(server_config)
+        except ImportError:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] SSH operations require paramiko: pip install paramiko")
+            return
         except Exception as e:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Error attaching file {filepath}: {e}")
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] SSH connection error to {server_config['host']}: {e}")
+            return
+
+        def run_channel(command):
+            try:
+                self.ssh_run_command(ssh, server_config, command)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] SSH command error: {e}")
+                transport = ssh.get_transport()
+                if transport is None or not transport.is_active():
+                    self.close_ssh_client(server_config)
+                    return
+            if self.is_running:
+                time.sleep(random.randint(*delay_range))
+
+        with ThreadPoolExecutor(max_workers=min(max_channels, len(selected_commands))) as executor:
+            futures = [executor.submit(self.run_as_persona, persona, run_channel, command)
+                       for command in selected_commands]
+            for future in futures:
+                future.result()
+
+        if not pool_config.get('enabled', True):
+            ssh.close()
 
     def ssh_operations(self):
         if not self.config.get('ssh_config', {}).get('enabled', False):
@@ -1876,85 +4952,339 @@ class UserBehaviorSimulator:
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting SSH operations")
 
         try:
-            import paramiko
-
             servers = self.config['ssh_config'].get('servers', [])
             commands = self.config['ssh_config'].get('commands', ['whoami'])
             commands_per_session_range = self.config['ssh_config'].get('commands_per_session', [2, 5])
             commands_count = random.randint(*commands_per_session_range)
+            max_parallel_servers = max(1, self.config['ssh_config'].get('session_pool', {}).get('max_parallel_servers', 4))
+            persona = self.get_persona_name()
 
-            for server_config in servers:
+            if servers:
+                with ThreadPoolExecutor(max_workers=min(max_parallel_servers, len(servers))) as executor:
+                    futures = [executor.submit(self.run_as_persona, persona, self.ssh_server_session, server_config,
+                                               random.sample(commands, min(commands_count, len(commands))))
+                               for server_config in servers]
+                    for future in futures:
+                        future.result()
+
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] SSH operations error: {e}")
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Completed SSH operations")
+        if not self.config.get('scheduled_tasks', {}).get('enabled', False):
+            self.wait_between_tasks()
+
+    def open_sftp_client(self, server_config):
+        import paramiko
+
+        sftp_config = self.config.get('sftp_config', {})
+        transport = self.get_ssh_client(server_config).get_transport()
+        return paramiko.SFTPClient.from_transport(
+            transport,
+            window_size=int(sftp_config.get('window_size_mb', 8) * 1024 * 1024),
+            max_packet_size=int(sftp_config.get('max_packet_size_kb', 32) * 1024)
+        )
+
+    def sftp_remote_path(self, name):
+        remote_dir = self.config.get('sftp_config', {}).get('remote_dir', '.')
+        return name if remote_dir in ('', '.') else f"{remote_dir.rstrip('/')}/{name}"
+
+    def sftp_list_files(self, sftp):
+        import stat
+
+        remote_dir = self.config.get('sftp_config', {}).get('remote_dir', '.') or '.'
+        return [entry for entry in sftp.listdir_attr(remote_dir) if stat.S_ISREG(entry.st_mode or 0)]
+
+    def sftp_pick_file(self, sftp):
+        files = self.sftp_list_files(sftp)
+        candidates = [entry for entry in files if entry.filename.startswith('ubs_sftp_')] or files
+        return random.choice(candidates) if candidates else None
+
+    def sftp_upload(self, sftp, size):
+        chunk_size = self.config['sftp_config'].get('chunk_size_kb', 256) * 1024
+        shaper = self.get_bandwidth_limiter('sftp')
+        name = f"ubs_sftp_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.getrandbits(32):08x}.bin"
+        payload = GeneratedPayload(size)
+
+        with sftp.open(self.sftp_remote_path(name), 'wb') as remote_file:
+            remote_file.set_pipelined(True)
+            while self.is_running:
+                chunk = payload.read(chunk_size)
+                if not chunk:
+                    break
+                if shaper:
+                    shaper.consume(len(chunk))
+                remote_file.write(chunk)
+
+        return name, payload.tell()
+
+    def sftp_download(self, sftp, entry):
+        sftp_config = self.config['sftp_config']
+        chunk_size = sftp_config.get('chunk_size_kb', 256) * 1024
+        shaper = self.get_bandwidth_limiter('sftp')
+        transferred = 0
+
+        download_path = self.get_save_path("downloads")
+        if not os.path.exists(download_path):
+            os.makedirs(download_path)
+        local_path = os.path.join(download_path, f"sftp_{threading.get_ident()}_{entry.filename}")
+
+        with sftp.open(self.sftp_remote_path(entry.filename), 'rb') as remote_file, open(local_path, 'wb') as f:
+            try:
+                remote_file.prefetch(entry.st_size, sftp_config.get('max_concurrent_requests', 64))
+            except TypeError:
+                # paramiko < 3.3 has no max_concurrent_requests argument
+                remote_file.prefetch(entry.st_size)
+            while self.is_running:
+                chunk = remote_file.read(chunk_size)
+                if not chunk:
+                    break
+                if shaper:
+                    shaper.consume(len(chunk))
+                f.write(chunk)
+                transferred += len(chunk)
+
+        if not sftp_config.get('keep_downloads', False):
+            os.remove(local_path)
+        return transferred
+
+    def sftp_random_read(self, sftp, entry):
+        sftp_config = self.config['sftp_config']
+        read_size = sftp_config.get('random_read_kb', 64) * 1024
+        read_count = sftp_config.get('random_reads', 16)
+        size = entry.st_size or 0
+        if size <= 0:
+            return 0
+
+        chunks = []
+        for _ in range(read_count):
+            length = min(read_size, size)
+            chunks.append((random.randint(0, size - length), length))
+        chunks.sort()
+
+        with sftp.open(self.sftp_remote_path(entry.filename), 'rb') as remote_file:
+            return sum(len(data) for data in remote_file.readv(chunks))
+
+    def sftp_server_session(self, server_config, selected_operations):
+        size_range_mb = self.config['sftp_config'].get('payload_size_mb', [1, 20])
+        host = server_config['host']
+
+        try:
+            sftp = self.open_sftp_client(server_config)
+        except ImportError:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] SFTP operations require paramiko: pip install paramiko")
+            return
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] SFTP connection error to {host}: {e}")
+            self.close_ssh_client(server_config)
+            return
+
+        try:
+            for operation in selected_operations:
+                if not self.is_running:
+                    break
+
+                name = None
+                transferred = 0
+                start_time = time.time()
                 try:
-                    ssh = paramiko.SSHClient()
-                    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-                    if server_config.get('key_file'):
-                        key = paramiko.RSAKey.from_private_key_file(server_config['key_file'])
-                        ssh.connect(
-                            server_config['host'],
-                            port=server_config['port'],
-                            username=server_config['username'],
-                            pkey=key,
-                            timeout=30
-                        )
+                    if operation == 'upload':
+                        name, transferred = self.sftp_upload(sftp, int(random.uniform(*size_range_mb) * 1024 * 1024))
+
+                    elif operation == 'list':
+                        files = self.sftp_list_files(sftp)
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] SFTP LIST on {host}: {len(files)} files")
+                        continue
+
                     else:
-                        ssh.connect(
-                            server_config['host'],
-                            port=server_config['port'],
-                            username=server_config['username'],
-                            password=server_config['password'],
-                            timeout=30
-                        )
+                        entry = self.sftp_pick_file(sftp)
+                        if entry is None:
+                            print(f"[{datetime.now().strftime('%H:%M:%S')}] SFTP {operation} skipped on {host}: no files")
+                            continue
+                        name = entry.filename
+                        if operation == 'download':
+                            transferred = self.sftp_download(sftp, entry)
+                        else:
+                            transferred = self.sftp_random_read(sftp, entry)
 
-                    selected_commands = random.sample(commands, min(commands_count, len(commands)))
+                    elapsed = time.time() - start_time
+                    throughput_kbps = self.record_transfer('sftp', host, operation, name, transferred, elapsed)
+                    print(
+                        f"[{datetime.now().strftime('%H:%M:%S')}] SFTP {operation.upper()} {name} on {host}: {transferred} bytes in {elapsed:.1f}s ({throughput_kbps:.1f} kbit/s)")
 
-                    for command in selected_commands:
-                        try:
-                            stdin, stdout, stderr = ssh.exec_command(command, timeout=30)
-                            output = stdout.read().decode('utf-8')
-                            error = stderr.read().decode('utf-8')
-
-                            log_path = self.get_save_path("ping_logs")
-                            if not os.path.exists(log_path):
-                                os.makedirs(log_path)
-
-                            log_file = os.path.join(log_path,
-                                                    f"ssh_{server_config['host']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-                            with open(log_file, 'w') as f:
-                                f.write(f"SSH Command: {command}\n")
-                                f.write(f"Host: {server_config['host']}\n")
-                                f.write(f"User: {server_config['username']}\n")
-                                f.write(f"Timestamp: {datetime.now()}\n\n")
-                                f.write("STDOUT:\n")
-                                f.write(output)
-                                if error:
-                                    f.write("\nSTDERR:\n")
-                                    f.write(error)
+                except Exception as e:
+                    self.record_transfer('sftp', host, operation, name, transferred, time.time() - start_time,
+                                         success=False)
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] SFTP {operation} error with {host}: {e}")
+                    transport = sftp.get_channel().get_transport()
+                    if not transport.is_active():
+                        self.close_ssh_client(server_config)
+                        break
 
-                            print(
-                                f"[{datetime.now().strftime('%H:%M:%S')}] SSH command '{command}' executed on {server_config['host']}")
-                            time.sleep(random.randint(5, 15))
+                time.sleep(random.randint(*self.config['sftp_config'].get('operation_delay_seconds', [2, 8])))
+        finally:
+            try:
+                sftp.close()
+            except Exception:
+                pass
 
-                        except Exception as e:
-                            print(f"[{datetime.now().strftime('%H:%M:%S')}] SSH command error: {e}")
+    def sftp_operations(self):
+        if not self.config.get('sftp_config', {}).get('enabled', False):
+            return
 
-                    ssh.close()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Starting SFTP operations")
 
-                except Exception as e:
-                    print(
-                        f"[{datetime.now().strftime('%H:%M:%S')}] SSH connection error to {server_config['host']}: {e}")
+        try:
+            sftp_config = self.config['sftp_config']
+            servers = sftp_config.get('servers') or self.config.get('ssh_config', {}).get('servers', [])
+            operations = sftp_config.get('operations', ['upload', 'download', 'list', 'random_read'])
+            operations_per_session_range = sftp_config.get('operations_per_session', [2, 5])
+            max_parallel_servers = max(1, self.config.get('ssh_config', {}).get('session_pool', {}).get('max_parallel_servers', 4))
+            persona = self.get_persona_name()
+
+            if servers:
+                with ThreadPoolExecutor(max_workers=min(max_parallel_servers, len(servers))) as executor:
+                    futures = [executor.submit(self.run_as_persona, persona, self.sftp_server_session, server_config,
+                                               [random.choice(operations)
+                                                for _ in range(random.randint(*operations_per_session_range))])
+                               for server_config in servers]
+                    for future in futures:
+                        future.result()
 
-        except ImportError:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] SSH operations require paramiko: pip install paramiko")
         except Exception as e:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] SSH operations error: {e}")
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] SFTP operations error: {e}")
 
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Completed SSH operations")
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Completed SFTP operations")
         if not self.config.get('scheduled_tasks', {}).get('enabled', False):
             self.wait_between_tasks()
 
-    def execute_task_by_name(self, task_name):
-        task_methods = {
+    def record_metric(self, name, value=1):
+        self.metrics.record(name, value)
+
+    def get_think_multiplier(self, task_name):
+        with self.load_control_lock:
+            return self.think_multipliers.get(task_name, 1.0)
+
+    def get_load_concurrency(self):
+        with self.load_control_lock:
+            return self.load_concurrency
+
+    def get_load_targets(self):
+        targets = []
+        for spec in self.config.get('load_targets', {}).get('targets', []):
+            if 'per_second' in spec:
+                rate = spec['per_second']
+            elif 'per_minute' in spec:
+                rate = spec['per_minute'] / 60.0
+            elif 'per_hour' in spec:
+                rate = spec['per_hour'] / 3600.0
+            elif 'mbit_per_second' in spec:
+                rate = spec['mbit_per_second'] * 1000000 / 8.0
+            else:
+                continue
+
+            if rate > 0 and spec.get('metric'):
+                targets.append({'metric': spec['metric'], 'rate': float(rate), 'tasks': spec.get('tasks', [])})
+        return targets
+
+    def load_worker_loop(self, index):
+        while self.is_running and index < self.get_load_concurrency():
+            with self.load_control_lock:
+                tasks = [task for target in self.load_status.get('targets', [])
+                         if target['ratio'] < 1.0 for task in target['tasks']]
+            tasks = tasks or [task for target in self.get_load_targets() for task in target['tasks']]
+            enabled_tasks = set(self.get_enabled_tasks())
+            tasks = [task for task in tasks if task in enabled_tasks]
+
+            if tasks:
+                self.run_task(random.choice(tasks))
+            else:
+                time.sleep(1)
+
+    def adjust_load(self, targets):
+        load_config = self.config.get('load_targets', {})
+        window_seconds = load_config.get('window_seconds', 60)
+        gain = load_config.get('gain', 0.5)
+        tolerance = load_config.get('tolerance', 0.1)
+        min_multiplier = load_config.get('min_multiplier', 0.01)
+        max_multiplier = load_config.get('max_multiplier', 10.0)
+        max_concurrency = load_config.get('max_concurrency', 16)
+
+        status = []
+        saturated_below = False
+        all_above = bool(targets)
+
+        with self.load_control_lock:
+            for target in targets:
+                achieved = self.metrics.rate(target['metric'], window_seconds)
+                ratio = achieved / target['rate']
+                adjustment = max(ratio, 0.1) ** gain
+
+                for task in target['tasks']:
+                    multiplier = self.think_multipliers.get(task, 1.0) * adjustment
+                    self.think_multipliers[task] = min(max(multiplier, min_multiplier), max_multiplier)
+
+                if ratio < 1.0 - tolerance:
+                    all_above = False
+                    if all(self.think_multipliers.get(task, 1.0) <= min_multiplier for task in target['tasks']):
+                        saturated_below = True
+                elif ratio <= 1.0 + tolerance:
+                    all_above = False
+
+                status.append({'metric': target['metric'], 'target': target['rate'], 'achieved': achieved,
+                               'ratio': ratio, 'tasks': target['tasks']})
+
+            if saturated_below and self.load_concurrency < max_concurrency:
+                self.load_concurrency += 1
+            elif all_above and self.load_concurrency > load_config.get('initial_concurrency', 0):
+                self.load_concurrency -= 1
+
+            self.load_status = {'targets': status, 'concurrency': self.load_concurrency,
+                                'multipliers': dict(self.think_multipliers), 'updated': time.time()}
+
+        return status
+
+    def start_load_workers(self, workers, persona):
+        for index in range(self.get_load_concurrency()):
+            worker = workers.get(index)
+            if worker is None or not worker.is_alive():
+                worker = threading.Thread(target=self.run_as_persona,
+                                          args=(persona, self.load_worker_loop, index))
+                worker.daemon = True
+                workers[index] = worker
+                worker.start()
+
+    def start_load_controller(self):
+        def controller():
+            load_config = self.config.get('load_targets', {})
+            interval_seconds = load_config.get('interval_seconds', 15)
+            persona = self.get_persona_name()
+            with self.load_control_lock:
+                self.load_concurrency = load_config.get('initial_concurrency', 0)
+            workers = {}
+            next_adjust = time.time() + interval_seconds
+
+            while self.is_running:
+                time.sleep(1)
+                if time.time() < next_adjust:
+                    continue
+                next_adjust = time.time() + interval_seconds
+
+                targets = self.get_load_targets()
+                status = self.adjust_load(targets)
+                self.start_load_workers(workers, persona)
+
+                summary = ', '.join(f"{item['metric']} {item['achieved']:.2f}/{item['target']:.2f} per s"
+                                    for item in status)
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] Load targets: {summary} (concurrency {self.get_load_concurrency()})")
+
+        thread = threading.Thread(target=controller)
+        thread.daemon = True
+        return thread
+
+    def get_task_methods(self):
+        return {
             'browse_websites': self.browse_websites,
             'watch_youtube': self.watch_youtube,
             'create_text_files': self.create_text_files,
@@ -1964,18 +5294,740 @@ class UserBehaviorSimulator:
             'ftp_operations': self.ftp_operations,
             'send_smtp_email': self.send_smtp_email,
             'ssh_operations': self.ssh_operations,
+            'sftp_operations': self.sftp_operations,
             'run_random_applications': self.run_random_applications,
             'imap_operations': self.imap_operations
         }
 
-        if task_name in task_methods:
+    def get_enabled_tasks(self):
+        tasks = [
+            'browse_websites',
+            'watch_youtube',
+            'create_text_files',
+            'download_media',
+            'share_files_with_network',
+            'ping_target_ips'
+        ]
+
+        if self.config.get('ftp_config', {}).get('enabled', False):
+            tasks.append('ftp_operations')
+        if self.config.get('smtp_config', {}).get('enabled', False):
+            tasks.append('send_smtp_email')
+        if self.config.get('ssh_config', {}).get('enabled', False):
+            tasks.append('ssh_operations')
+        if self.config.get('sftp_config', {}).get('enabled', False):
+            tasks.append('sftp_operations')
+        if self.config.get('app_execution', {}).get('enabled', False):
+            tasks.append('run_random_applications')
+        if self.config.get('imap_config', {}).get('enabled', False):
+            tasks.append('imap_operations')
+
+        return tasks
+
+    def get_activity_model(self, persona=None):
+        persona = persona or self.get_persona_name()
+        tasks = tuple(self.get_enabled_tasks())
+
+        with self.activity_models_lock:
+            cached = self.activity_models.get(persona)
+            if cached is not None and cached[0] == tasks:
+                return cached[1]
+
+            profiles = self.config.get('activity_model', {}).get('profiles', {})
+            profile = profiles.get(persona, profiles.get('default', {}))
+            model = ActivityModel(
+                tasks,
+                weights=profile.get('weights'),
+                transitions=profile.get('transitions'),
+                dwell=profile.get('dwell'),
+                default_weight=profile.get('default_weight', 1.0)
+            )
+            self.activity_models[persona] = (tasks, model)
+            return model
+
+    def get_activity_mix(self, persona=None):
+        return self.get_activity_model(persona).stationary_mix()
+
+    def draw_timings(self, spec, size, rng, np=None):
+        if size <= 0:
+            return []
+
+        distribution = spec.get('distribution', 'uniform')
+        if np is not None:
+            if distribution == 'fixed':
+                values = np.full(size, float(spec.get('value', 0)))
+            elif distribution == 'lognormal':
+                values = rng.lognormal(math.log(max(spec.get('median', 1), 1e-9)), spec.get('sigma', 0.5), size)
+            elif distribution == 'exponential':
+                values = rng.exponential(spec.get('mean', 1), size)
+            elif distribution == 'poisson':
+                values = rng.poisson(spec.get('mean', 1), size).astype(float)
+            elif distribution == 'normal':
+                values = rng.normal(spec.get('mean', 0), spec.get('stddev', 1), size)
+            else:
+                values = rng.uniform(spec.get('min', 0), spec.get('max', 1), size)
+            values = np.clip(values, spec.get('min', 0), spec.get('max', np.inf))
+            return values.tolist()
+
+        if distribution == 'fixed':
+            values = [float(spec.get('value', 0))] * size
+        elif distribution == 'lognormal':
+            mu = math.log(max(spec.get('median', 1), 1e-9))
+            values = [rng.lognormvariate(mu, spec.get('sigma', 0.5)) for _ in range(size)]
+        elif distribution == 'exponential':
+            values = [rng.expovariate(1.0 / max(spec.get('mean', 1), 1e-9)) for _ in range(size)]
+        elif distribution == 'poisson':
+            limit = math.exp(-spec.get('mean', 1))
+            values = []
+            for _ in range(size):
+                count, product = 0, rng.random()
+                while product > limit:
+                    count += 1
+                    product *= rng.random()
+                values.append(float(count))
+        elif distribution == 'normal':
+            values = [rng.gauss(spec.get('mean', 0), spec.get('stddev', 1)) for _ in range(size)]
+        else:
+            values = [rng.uniform(spec.get('min', 0), spec.get('max', 1)) for _ in range(size)]
+
+        low, high = spec.get('min', 0), spec.get('max', float('inf'))
+        return [min(max(value, low), high) for value in values]
+
+    def get_diurnal_weights(self):
+        curve = self.config.get('day_planner', {}).get('diurnal_curve') or [1.0] * 24
+        weights = [float(curve[hour % len(curve)]) for hour in range(24)]
+
+        active_hours = self.config.get('active_hours', {})
+        if active_hours.get('enabled', False):
+            start_hour = active_hours.get('start_hour', 0)
+            end_hour = active_hours.get('end_hour', 23)
+            for hour in range(24):
+                if start_hour <= end_hour:
+                    active = start_hour <= hour < end_hour
+                else:
+                    active = hour >= start_hour or hour < end_hour
+                if not active:
+                    weights[hour] = 0.0
+
+        if not any(weights):
+            weights = [1.0] * 24
+        return weights
+
+    def build_day_plan(self, persona=None, day=None):
+        planner_config = self.config.get('day_planner', {})
+        persona = persona or self.get_persona_name()
+        day = day or datetime.now().date()
+        day_start = datetime(day.year, day.month, day.day).timestamp()
+        seed = planner_config.get('seed')
+        if seed is not None:
+            seed = zlib.crc32(f"{seed}:{persona}:{day.isoformat()}".encode('utf-8'))
+
+        try:
+            import numpy as np
+            rng = np.random.default_rng(seed)
+        except ImportError:
+            np = None
+            rng = random.Random(seed)
+
+        session_count = int(self.draw_timings(
+            planner_config.get('sessions', {'distribution': 'poisson', 'mean': 3, 'min': 1, 'max': 6}), 1, rng, np)[0])
+        weights = self.get_diurnal_weights()
+        total_weight = sum(weights)
+
+        if np is not None:
+            hours = rng.choice(24, size=session_count, p=np.array(weights) / total_weight)
+            starts = (day_start + (hours + rng.random(session_count)) * 3600).tolist()
+        else:
+            hours = rng.choices(range(24), weights=weights, k=session_count)
+            starts = [day_start + (hour + rng.random()) * 3600 for hour in hours]
+        starts.sort()
+
+        durations = self.draw_timings(
+            planner_config.get('session_minutes', {'distribution': 'lognormal', 'median': 55, 'sigma': 0.4,
+                                                   'min': 10, 'max': 180}), session_count, rng, np)
+        min_break = planner_config.get('min_break_minutes', 15) * 60
+        think_spec = planner_config.get('think_seconds', {'distribution': 'lognormal', 'median': 180, 'sigma': 0.6,
+                                                          'min': 20, 'max': 900})
+        day_end = day_start + 86400
+
+        sessions = []
+        previous_end = day_start - min_break
+        for start, duration in zip(starts, durations):
+            start = max(start, previous_end + min_break)
+            end = min(start + duration * 60, day_end)
+            if end - start < 60:
+                continue
+            sessions.append({'start': start, 'end': end})
+            previous_end = end
+
+        think_floor = max(think_spec.get('min', 0), 1)
+        counts = [int((session['end'] - session['start']) / think_floor) + 1 for session in sessions]
+        counts = [min(count, planner_config.get('max_tasks_per_session', 500)) for count in counts]
+        think_times = self.draw_timings(think_spec, sum(counts), rng, np)
+
+        offset = 0
+        for session, count in zip(sessions, counts):
+            session['think_seconds'] = [round(value, 3) for value in think_times[offset:offset + count]]
+            offset += count
+
+        return {'persona': persona, 'date': day.isoformat(), 'sessions': sessions}
+
+    def sleep_until(self, timestamp):
+        while self.is_running:
+            remaining = timestamp - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 30))
+
+    def run_day_plan(self, plan):
+        model_enabled = self.config.get('activity_model', {}).get('enabled', False)
+        model = self.get_activity_model() if model_enabled else None
+        activities = self.get_enabled_tasks()
+        sessions = [session for session in plan['sessions'] if session['end'] > time.time()]
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Day plan for {plan['persona']} on {plan['date']}: {len(sessions)} sessions remaining")
+
+        for index, session in enumerate(sessions):
+            self.sleep_until(session['start'])
+            if not self.is_running:
+                break
+
+            duration_minutes = int((session['end'] - max(session['start'], time.time())) / 60)
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Starting planned session {index + 1}/{len(sessions)} for {duration_minutes} minutes")
+
+            think_times = iter(session['think_seconds'])
+            current_task = None
+            while time.time() < session['end'] and self.is_running and self.is_within_active_hours():
+                if model:
+                    current_task = model.next_task(current_task)
+                else:
+                    current_task = random.choice(activities)
+
+                dwell_seconds = next(think_times, None)
+                if dwell_seconds is None and model:
+                    dwell_seconds = model.sample_dwell(current_task)
+                self.dispatch_task(current_task, dwell_seconds)
+
+    def planned_behavior_cycle(self):
+        print("Running in planned mode")
+        while self.is_running:
+            today = datetime.now().date()
+            plan = self.load_state('day_plan')
+            if not plan or plan.get('date') != today.isoformat():
+                plan = self.build_day_plan(day=today)
+                self.save_state('day_plan', plan)
+            self.run_day_plan(plan)
+
+            tomorrow = datetime(today.year, today.month, today.day) + timedelta(days=1)
+            self.sleep_until(tomorrow.timestamp())
+
+    def run_task(self, task_name, dwell_seconds=None):
+        task_method = self.get_task_methods().get(task_name)
+        if task_method is None:
+            return
+
+        previous = (getattr(self.persona_context, 'task', None), getattr(self.persona_context, 'dwell_seconds', None))
+        self.persona_context.task = task_name
+        self.persona_context.dwell_seconds = dwell_seconds
+        timings = self.task_timings
+        if timings is not None:
+            started = (time.perf_counter(), time.thread_time())
+        thread_id = threading.get_ident()
+        persona = self.get_persona_name()
+        task_started = time.time()
+        with self.metrics.lock:
+            outer_task = self.current_tasks.get(thread_id)
+            self.current_tasks[thread_id] = (persona, task_name, task_started)
+        succeeded = False
+        try:
+            task_method()
+            succeeded = True
+            self.record_metric('tasks_completed')
+        except Exception:
+            self.record_metric('task_errors')
+        finally:
+            self.persona_context.task, self.persona_context.dwell_seconds = previous
+            with self.metrics.lock:
+                if outer_task is None:
+                    del self.current_tasks[thread_id]
+                else:
+                    self.current_tasks[thread_id] = outer_task
+                self.recent_tasks.append((time.time(), persona, task_name, time.time() - task_started, succeeded))
+            if timings is not None:
+                self.record_task_timing(timings, task_name, started)
+
+    def get_background_pool(self):
+        with self.background_lock:
+            if self.background_pool is None:
+                max_workers = self.config.get('concurrency', {}).get('max_workers', 32)
+                self.background_pool = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                                          thread_name_prefix='background-task')
+            return self.background_pool
+
+    def submit_background_task(self, task_name):
+        concurrency_config = self.config.get('concurrency', {})
+        if not concurrency_config.get('enabled', False) or not self.is_running:
+            return False
+        if task_name not in concurrency_config.get('background_tasks', []):
+            return False
+
+        persona = self.get_persona_name()
+        with self.background_lock:
+            slots = self.persona_semaphores.get(persona)
+            if slots is None:
+                slots = threading.BoundedSemaphore(max(1, concurrency_config.get('max_background_per_persona', 2)))
+                self.persona_semaphores[persona] = slots
+
+        if not slots.acquire(blocking=False):
+            return False
+
+        def run_background():
             try:
-                task_methods[task_name]()
-            except:
+                self.run_as_persona(persona, self.run_task, task_name, 0)
+            finally:
+                with self.background_lock:
+                    self.background_tasks[persona].remove(task_name)
+                slots.release()
+
+        with self.background_lock:
+            self.background_tasks.setdefault(persona, []).append(task_name)
+
+        try:
+            self.get_background_pool().submit(run_background)
+        except RuntimeError:
+            with self.background_lock:
+                self.background_tasks[persona].remove(task_name)
+            slots.release()
+            return False
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Running {task_name} in the background for {persona}")
+        return True
+
+    def dispatch_task(self, task_name, dwell_seconds=None):
+        if not self.submit_background_task(task_name):
+            self.run_task(task_name, dwell_seconds)
+            return
+
+        previous = (getattr(self.persona_context, 'task', None), getattr(self.persona_context, 'dwell_seconds', None))
+        self.persona_context.task = task_name
+        self.persona_context.dwell_seconds = dwell_seconds
+        try:
+            self.wait_between_tasks()
+        finally:
+            self.persona_context.task, self.persona_context.dwell_seconds = previous
+
+    def get_background_status(self):
+        with self.background_lock:
+            return {persona: list(tasks) for persona, tasks in self.background_tasks.items() if tasks}
+
+    def record_task_timing(self, timings, task_name, started):
+        wall_seconds = time.perf_counter() - started[0]
+        cpu_seconds = time.thread_time() - started[1]
+        with self.profiling_lock:
+            entry = timings.setdefault(task_name, {'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                   'max_wall_seconds': 0.0})
+            entry['runs'] += 1
+            entry['wall_seconds'] += wall_seconds
+            entry['cpu_seconds'] += cpu_seconds
+            entry['max_wall_seconds'] = max(entry['max_wall_seconds'], wall_seconds)
+
+    def get_profile_path(self, kind, extension):
+        output_dir = self.config.get('profiling', {}).get('output_dir', '') or \
+            os.path.join(self.get_save_path("data"), "profiles")
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        return os.path.join(output_dir, f"{kind}-{os.getpid()}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.{extension}")
+
+    def start_cpu_profile(self):
+        with self.profiling_lock:
+            if self.profiler is not None:
+                return {'cpu': 'running'}
+            interval_ms = self.config.get('profiling', {}).get('sample_interval_ms', 10)
+            self.profiler = SamplingProfiler(interval=interval_ms / 1000.0)
+            self.profiler.start()
+        return {'cpu': 'started'}
+
+    def stop_cpu_profile(self):
+        with self.profiling_lock:
+            profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return {'cpu': 'stopped'}
+
+        summary = profiler.stop()
+        cpu_path = self.get_profile_path('cpu', 'folded')
+        wall_path = self.get_profile_path('wall', 'folded')
+        profiler.write_folded(cpu_path, profiler.cpu_stacks)
+        profiler.write_folded(wall_path, profiler.wall_stacks)
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] CPU profile: {summary['samples']} samples over {summary['seconds']:.0f}s written to {cpu_path}")
+        return {'cpu': 'stopped', 'samples': summary['samples'], 'files': [cpu_path, wall_path]}
+
+    def start_task_timing(self):
+        with self.profiling_lock:
+            if self.task_timings is None:
+                self.task_timings = {}
+                self.task_timings_started = time.time()
+        return {'timing': 'started'}
+
+    def stop_task_timing(self):
+        with self.profiling_lock:
+            timings, self.task_timings = self.task_timings, None
+            started = self.task_timings_started
+        if timings is None:
+            return {'timing': 'stopped'}
+
+        path = self.get_profile_path('tasks', 'json')
+        with open(path, 'w') as f:
+            json.dump({'started': started, 'stopped': time.time(), 'tasks': timings}, f, indent=4)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Task timings for {len(timings)} tasks written to {path}")
+        return {'timing': 'stopped', 'files': [path]}
+
+    def take_memory_snapshot(self):
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.config.get('profiling', {}).get('tracemalloc_frames', 25))
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Started tracemalloc, next snapshot will be written to disk")
+            return {'memory': 'started'}
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snapshot_path = self.get_profile_path('memory', 'tracemalloc')
+        snapshot.dump(snapshot_path)
+
+        current, peak = tracemalloc.get_traced_memory()
+        report_path = self.get_profile_path('memory', 'txt')
+        with open(report_path, 'w') as f:
+            f.write(f"traced: {current} bytes, peak: {peak} bytes\n\n")
+            for stat in snapshot.statistics('lineno')[:50]:
+                f.write(f"{stat}\n")
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Memory snapshot ({current / 1024 / 1024:.1f} MB traced) written to {snapshot_path}")
+        return {'memory': 'snapshot', 'traced_bytes': current, 'peak_bytes': peak,
+                'files': [snapshot_path, report_path]}
+
+    def stop_memory_tracing(self):
+        import tracemalloc
+
+        tracemalloc.stop()
+        return {'memory': 'stopped'}
+
+    def get_profiling_status(self):
+        import tracemalloc
+
+        with self.profiling_lock:
+            return {'cpu': 'running' if self.profiler is not None else 'stopped',
+                    'timing': 'running' if self.task_timings is not None else 'stopped',
+                    'memory': 'running' if tracemalloc.is_tracing() else 'stopped'}
+
+    def toggle_profiling(self):
+        if self.profiler is None:
+            self.start_task_timing()
+            return self.start_cpu_profile()
+        self.stop_task_timing()
+        return self.stop_cpu_profile()
+
+    def profiling_command(self, command):
+        commands = {
+            'cpu start': self.start_cpu_profile,
+            'cpu stop': self.stop_cpu_profile,
+            'timing start': self.start_task_timing,
+            'timing stop': self.stop_task_timing,
+            'memory snapshot': self.take_memory_snapshot,
+            'memory stop': self.stop_memory_tracing,
+            'toggle': self.toggle_profiling,
+            'status': self.get_profiling_status,
+        }
+        handler = commands.get(' '.join(command.lower().split()))
+        if handler is None:
+            return {'error': f"unknown command {command!r}", 'commands': sorted(commands)}
+
+        try:
+            return handler()
+        except Exception as e:
+            return {'error': str(e)}
+
+    def install_profiling_signals(self):
+        import signal
+
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+
+        # The handlers only queue the request; file I/O and locking happen on the
+        # profiling request thread, never in signal context.
+        try:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profiling_requests.append('toggle'))
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.profiling_requests.append('memory snapshot'))
+        except ValueError:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] Profiling signals can only be installed from the main thread")
+            return False
+
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Profiling signals ready: kill -USR1 {os.getpid()} toggles CPU/task profiling, kill -USR2 {os.getpid()} snapshots memory")
+        return True
+
+    def start_profiling_request_handler(self):
+        def handle_requests():
+            while self.is_running:
+                time.sleep(0.5)
+                while self.profiling_requests:
+                    reply = self.profiling_command(self.profiling_requests.popleft())
+                    if 'error' in reply:
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] Profiling request failed: {reply['error']}")
+
+        thread = threading.Thread(target=handle_requests)
+        thread.daemon = True
+        return thread
+
+    def start_control_server(self):
+        import socketserver
+
+        simulator = self
+        port = self.config.get('profiling', {}).get('control_port', 0)
+
+        class ControlHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    line = self.rfile.readline(4096)
+                    if not line:
+                        return
+                    command = line.decode('utf-8', 'replace').strip()
+                    if command in ('quit', 'exit'):
+                        return
+                    if command:
+                        reply = simulator.profiling_command(command)
+                        self.wfile.write(json.dumps(reply).encode('utf-8') + b"\n")
+
+        class ControlServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        server = ControlServer(('127.0.0.1', port), ControlHandler)
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Profiling control listening on 127.0.0.1:{server.server_address[1]}")
+        return server
+
+    def get_status(self):
+        now = time.time()
+        window_seconds = self.config.get('dashboard', {}).get('window_seconds', 60)
+        if self.started_at:
+            window_seconds = min(window_seconds, max(int(now - self.started_at), 1))
+        background = self.get_background_status()
+        background_threads = {thread.ident for thread in threading.enumerate()
+                              if thread.name.startswith('background-task')}
+        with self.metrics.lock:
+            current_tasks = list(self.current_tasks.items())
+            recent_tasks = list(self.recent_tasks)
+
+        personas = {}
+        for thread_id, (persona, task_name, since) in current_tasks:
+            entry = personas.setdefault(persona, {'task': None, 'since': None, 'background_running': [],
+                                                  'background_queued': 0})
+            if thread_id in background_threads:
+                entry['background_running'].append(task_name)
+            else:
+                entry['task'] = task_name
+                entry['since'] = round(now - since, 1)
+
+        for persona, tasks in background.items():
+            entry = personas.setdefault(persona, {'task': None, 'since': None, 'background_running': [],
+                                                  'background_queued': 0})
+            entry['background_queued'] = max(len(tasks) - len(entry['background_running']), 0)
+
+        durations = {}
+        for finished, persona, task_name, seconds, succeeded in recent_tasks:
+            entry = durations.setdefault(task_name, {'runs': 0, 'errors': 0, 'seconds': []})
+            entry['runs'] += 1
+            entry['errors'] += 0 if succeeded else 1
+            entry['seconds'].append(seconds)
+
+        task_durations = {}
+        for task_name, entry in sorted(durations.items()):
+            seconds = sorted(entry['seconds'])
+            task_durations[task_name] = {
+                'runs': entry['runs'],
+                'errors': entry['errors'],
+                'avg_seconds': round(sum(seconds) / len(seconds), 3),
+                'p95_seconds': round(seconds[min(int(len(seconds) * 0.95), len(seconds) - 1)], 3),
+                'max_seconds': round(seconds[-1], 3),
+            }
+
+        totals = self.metrics.snapshot()
+        protocols = {}
+        for name in sorted(totals):
+            if name == 'task_errors':
+                continue
+            for suffix, key in (('_bytes', 'bytes'), ('_errors', 'errors')):
+                if name.endswith(suffix):
+                    entry = protocols.setdefault(name[:-len(suffix)], {'bytes': 0, 'bytes_per_second': 0.0,
+                                                                       'errors': 0, 'errors_per_minute': 0.0})
+                    entry[key] = totals[name]
+                    if key == 'bytes':
+                        entry['bytes_per_second'] = round(self.metrics.rate(name, window_seconds), 1)
+                    else:
+                        entry['errors_per_minute'] = round(self.metrics.rate(name, window_seconds) * 60, 2)
+
+        completed = self.metrics.total('tasks_completed', window_seconds)
+        failed = self.metrics.total('task_errors', window_seconds)
+        with self.load_control_lock:
+            load = {'concurrency': self.load_concurrency, 'targets': self.load_status.get('targets', [])}
+
+        return {
+            'generated': now,
+            'uptime_seconds': round(now - self.started_at, 1) if self.started_at else 0,
+            'window_seconds': window_seconds,
+            'personas': personas,
+            'load': load,
+            'tasks': {'completed': completed, 'errors': failed,
+                      'error_rate': round(failed / (completed + failed), 3) if completed + failed else 0.0},
+            'task_durations': task_durations,
+            'protocols': protocols,
+            'recent_tasks': [{'finished': finished, 'persona': persona, 'task': task_name,
+                              'seconds': round(seconds, 3), 'ok': succeeded}
+                             for finished, persona, task_name, seconds, succeeded in recent_tasks[-20:]],
+            'totals': totals,
+        }
+
+    def render_status_html(self, status):
+        from html import escape
+
+        def table(headers, rows):
+            head = ''.join(f"<th>{escape(str(header))}</th>" for header in headers)
+            body = ''.join('<tr>' + ''.join(f"<td>{escape(str(cell))}</td>" for cell in row) + '</tr>'
+                           for row in rows)
+            return f"<table><tr>{head}</tr>{body}</table>"
+
+        sections = [
+            ('Personas', table(['persona', 'task', 'for (s)', 'background', 'queued'], [
+                [persona, entry['task'] or 'idle', entry['since'] if entry['since'] is not None else '',
+                 ', '.join(entry['background_running']), entry['background_queued']]
+                for persona, entry in sorted(status['personas'].items())])),
+            (f"Tasks (last {status['window_seconds']}s)", table(['completed', 'errors', 'error rate'], [
+                [status['tasks']['completed'], status['tasks']['errors'], status['tasks']['error_rate']]])),
+            ('Task durations', table(['task', 'runs', 'errors', 'avg (s)', 'p95 (s)', 'max (s)'], [
+                [task_name, entry['runs'], entry['errors'], entry['avg_seconds'], entry['p95_seconds'],
+                 entry['max_seconds']] for task_name, entry in status['task_durations'].items()])),
+            ('Protocols', table(['protocol', 'bytes', 'bytes/s', 'errors', 'errors/min'], [
+                [name, entry['bytes'], entry['bytes_per_second'], entry['errors'], entry['errors_per_minute']]
+                for name, entry in status['protocols'].items()])),
+            ('Load targets', table(['metric', 'target/s', 'achieved/s', 'ratio'], [
+                [target['metric'], round(target['target'], 2), round(target['achieved'], 2), round(target['ratio'], 2)]
+                for target in status['load']['targets']])),
+            ('Recent tasks', table(['finished', 'persona', 'task', 'seconds', 'ok'], [
+                [datetime.fromtimestamp(entry['finished']).strftime('%H:%M:%S'), entry['persona'], entry['task'],
+                 entry['seconds'], entry['ok']] for entry in reversed(status['recent_tasks'])])),
+        ]
+
+        body = ''.join(f"<h2>{escape(title)}</h2>{content}" for title, content in sections)
+        return (
+            "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><meta http-equiv=\"refresh\" content=\"5\">"
+            "<title>User Behavior Simulator</title><style>"
+            "body{font-family:sans-serif;margin:1em 2em}table{border-collapse:collapse}"
+            "th,td{border:1px solid #ccc;padding:2px 8px;text-align:left}"
+            "</style></head><body>"
+            f"<h1>User Behavior Simulator</h1><p>Up {int(status['uptime_seconds'])}s, "
+            f"updated {datetime.fromtimestamp(status['generated']).strftime('%H:%M:%S')}, "
+            "<a href=\"/status.json\">JSON</a></p>"
+            f"{body}</body></html>")
+
+    def start_dashboard(self):
+        import socketserver
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        simulator = self
+        dashboard_config = self.config.get('dashboard', {})
+        host = dashboard_config.get('host', '127.0.0.1')
+        port = dashboard_config.get('port', 8765)
+
+        class DashboardHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/status.json':
+                    body = json.dumps(simulator.get_status()).encode('utf-8')
+                    content_type = 'application/json'
+                elif path == '/':
+                    body = simulator.render_status_html(simulator.get_status()).encode('utf-8')
+                    content_type = 'text/html; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
                 pass
 
+        class DashboardServer(socketserver.ThreadingMixIn, HTTPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        server = DashboardServer((host, port), DashboardHandler)
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Status dashboard at http://{host}:{server.server_address[1]}/")
+        return server
+
+    def execute_task_by_name(self, task_name):
+        self.run_task(task_name)
+
+    def get_scheduled_task_key(self, task_config):
+        return f"{task_config.get('time', '00:00')} {task_config['task']}"
+
+    def get_missed_scheduled_tasks(self, scheduled_runs):
+        catch_up_seconds = self.config.get('checkpoint', {}).get('catch_up_minutes', 60) * 60
+        now = datetime.now()
+        today = now.date().isoformat()
+        missed_tasks = []
+
+        for task_config in self.config.get('scheduled_tasks', {}).get('tasks', []):
+            if not task_config.get('enabled', False):
+                continue
+            if scheduled_runs.get(self.get_scheduled_task_key(task_config)) == today:
+                continue
+
+            target_time = datetime.strptime(task_config.get('time', '00:00'), "%H:%M")
+            target_datetime = now.replace(hour=target_time.hour, minute=target_time.minute, second=0, microsecond=0)
+            if 0 <= (now - target_datetime).total_seconds() <= catch_up_seconds:
+                missed_tasks.append(task_config)
+
+        return missed_tasks
+
+    def run_scheduled_task(self, task_config, scheduled_runs):
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] Executing scheduled task: {task_config['task']}")
+        self.execute_task_by_name(task_config['task'])
+        scheduled_runs[self.get_scheduled_task_key(task_config)] = datetime.now().date().isoformat()
+        self.save_state('scheduled_runs', scheduled_runs)
+
     def scheduled_behavior_cycle(self):
         print("Running in scheduled mode")
+        scheduled_runs = self.load_state('scheduled_runs', {})
+        if self.config.get('checkpoint', {}).get('enabled', False):
+            self.wait_for_active_hours()
+            for task_config in self.get_missed_scheduled_tasks(scheduled_runs):
+                if not self.is_running or not self.is_within_active_hours():
+                    break
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] Catching up on task '{task_config['task']}' missed at {task_config['time']}")
+                self.run_scheduled_task(task_config, scheduled_runs)
+
         while self.is_running:
             self.wait_for_active_hours()
 
@@ -2000,87 +6052,152 @@ class UserBehaviorSimulator:
                             break
 
                 if self.is_running and self.is_within_active_hours():
-                    if self.should_run_scheduled_task(task_config):
-                        print(
-                            f"[{datetime.now().strftime('%H:%M:%S')}] Executing scheduled task: {task_config['task']}")
-                        self.execute_task_by_name(task_config['task'])
+                    task_key = self.get_scheduled_task_key(task_config)
+                    if self.should_run_scheduled_task(task_config) and \
+                            scheduled_runs.get(task_key) != datetime.now().date().isoformat():
+                        self.run_scheduled_task(task_config, scheduled_runs)
 
             time.sleep(30)
 
     def random_behavior_cycle(self):
         print("Running in random mode")
+        resume_seconds = self.config.get('checkpoint', {}).get('resume_window_hours', 12) * 3600
+        cycle = self.load_state('random_cycle')
+        if cycle and cycle.get('until') and cycle['until'] < time.time() - resume_seconds:
+            cycle = None
+        if cycle:
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Resuming random cycle at session {cycle['session'] + 1}/{cycle['daily_sessions']} ({cycle['phase']})")
+
         while self.is_running:
-            daily_sessions = self.config.get('daily_sessions', 3)
-            for session in range(daily_sessions):
+            if not cycle:
+                cycle = {'session': 0, 'daily_sessions': self.config.get('daily_sessions', 3),
+                         'phase': 'session', 'until': None}
+
+            if cycle['phase'] != 'session':
+                self.sleep_until(cycle['until'])
                 if not self.is_running:
                     break
+                if cycle['phase'] == 'night':
+                    cycle = None
+                else:
+                    cycle = dict(cycle, session=cycle['session'] + 1, phase='session', until=None)
+                continue
 
-                self.wait_for_active_hours()
+            self.wait_for_active_hours()
 
-                if not self.is_running:
-                    break
+            if not self.is_running:
+                break
 
+            session = cycle['session']
+            daily_sessions = cycle['daily_sessions']
+            if cycle['until'] is None:
                 session_duration_range = self.config.get('session_duration_minutes', [30, 90])
                 session_duration = random.randint(*session_duration_range)
-                session_end_time = datetime.now() + timedelta(minutes=session_duration)
-
-                activities = [
-                    self.browse_websites,
-                    self.watch_youtube,
-                    self.create_text_files,
-                    self.download_media,
-                    self.share_files_with_network,
-                    self.ping_target_ips
-                ]
+                cycle['until'] = time.time() + session_duration * 60
+                self.save_state('random_cycle', cycle)
+            else:
+                session_duration = max(int((cycle['until'] - time.time()) / 60), 0)
 
-                if self.config.get('ftp_config', {}).get('enabled', False):
-                    activities.append(self.ftp_operations)
-                if self.config.get('smtp_config', {}).get('enabled', False):
-                    activities.append(self.send_smtp_email)
-                if self.config.get('ssh_config', {}).get('enabled', False):
-                    activities.append(self.ssh_operations)
-                if self.config.get('app_execution', {}).get('enabled', False):
-                    activities.append(self.run_random_applications)
-                if self.config.get('imap_config', {}).get('enabled', False):
-                    activities.append(self.imap_operations)
+            model_enabled = self.config.get('activity_model', {}).get('enabled', False)
+            model = self.get_activity_model() if model_enabled else None
+            activities = self.get_enabled_tasks()
+            current_task = None
 
-                print(
-                    f"[{datetime.now().strftime('%H:%M:%S')}] Starting session {session + 1}/{daily_sessions} for {session_duration} minutes")
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Starting session {session + 1}/{daily_sessions} for {session_duration} minutes")
 
-                while datetime.now() < session_end_time and self.is_running and self.is_within_active_hours():
-                    activity = random.choice(activities)
-                    try:
-                        activity()
-                    except:
-                        pass
+            while time.time() < cycle['until'] and self.is_running and self.is_within_active_hours():
+                if model:
+                    current_task = model.next_task(current_task)
+                    self.dispatch_task(current_task, model.sample_dwell(current_task))
+                else:
+                    self.dispatch_task(random.choice(activities))
 
-                if self.is_running and session < daily_sessions - 1:
-                    session_break = random.randint(1800, 7200)
-                    print(
-                        f"[{datetime.now().strftime('%H:%M:%S')}] Session break for {int(session_break / 60)} minutes")
-                    time.sleep(session_break)
+            if not self.is_running:
+                break
 
-            if self.is_running:
+            if session < daily_sessions - 1:
+                session_break = random.randint(1800, 7200)
+                print(
+                    f"[{datetime.now().strftime('%H:%M:%S')}] Session break for {int(session_break / 60)} minutes")
+                cycle = dict(cycle, phase='break', until=time.time() + session_break)
+            else:
                 next_day_sleep = random.randint(18000, 28800)
                 print(
                     f"[{datetime.now().strftime('%H:%M:%S')}] Daily cycle complete, sleeping for {int(next_day_sleep / 3600)} hours")
-                time.sleep(next_day_sleep)
+                cycle = dict(cycle, phase='night', until=time.time() + next_day_sleep)
+            self.save_state('random_cycle', cycle)
 
     def start(self):
         self.is_running = True
+        self.started_at = time.time()
 
         receiver_thread = self.start_file_receiver()
         self.threads.append(receiver_thread)
         receiver_thread.start()
 
+        ftp_config = self.config.get('ftp_config', {})
+        if ftp_config.get('enabled', False) and ftp_config.get('session_pool', {}).get('enabled', True):
+            keepalive_thread = self.start_ftp_keepalive()
+            self.threads.append(keepalive_thread)
+            keepalive_thread.start()
+
+        imap_config = self.config.get('imap_config', {})
+        if imap_config.get('enabled', False) and imap_config.get('idle_watch', {}).get('enabled', False):
+            watcher_thread = self.start_imap_watchers()
+            self.threads.append(watcher_thread)
+            watcher_thread.start()
+
+        app_config = self.config.get('app_execution', {})
+        if app_config.get('enabled', False) and app_config.get('auto_discover', False):
+            self.discover_system_applications()
+
+        if self.config.get('dashboard', {}).get('enabled', False):
+            self.dashboard_server = self.start_dashboard()
+
+        profiling_config = self.config.get('profiling', {})
+        if profiling_config.get('signals', False) and self.install_profiling_signals():
+            profiling_thread = self.start_profiling_request_handler()
+            self.threads.append(profiling_thread)
+            profiling_thread.start()
+        if profiling_config.get('control_port'):
+            self.control_server = self.start_control_server()
+
+        if self.config.get('checkpoint', {}).get('enabled', False):
+            self.restore_state()
+            checkpoint_thread = self.start_checkpointer()
+            self.threads.append(checkpoint_thread)
+            checkpoint_thread.start()
+
+        if self.config.get('load_targets', {}).get('enabled', False):
+            controller_thread = self.start_load_controller()
+            self.threads.append(controller_thread)
+            controller_thread.start()
+
+        if self.config.get('bandwidth_shaping', {}).get('enabled', False):
+            reporter_thread = self.start_bandwidth_reporter()
+            self.threads.append(reporter_thread)
+            reporter_thread.start()
+
+        model_personas = self.config.get('activity_model', {}).get('personas', [])
+        if self.config.get('day_planner', {}).get('enabled', False):
+            behavior_cycle = self.planned_behavior_cycle
+        else:
+            behavior_cycle = self.random_behavior_cycle
+
         if self.config.get('scheduled_tasks', {}).get('enabled', False):
-            behavior_thread = threading.Thread(target=self.scheduled_behavior_cycle)
+            behavior_threads = [threading.Thread(target=self.scheduled_behavior_cycle)]
+        elif self.config.get('activity_model', {}).get('enabled', False) and model_personas:
+            behavior_threads = [threading.Thread(target=self.run_as_persona, args=(persona, behavior_cycle))
+                                for persona in model_personas]
         else:
-            behavior_thread = threading.Thread(target=self.random_behavior_cycle)
+            behavior_threads = [threading.Thread(target=behavior_cycle)]
 
-        behavior_thread.daemon = True
-        self.threads.append(behavior_thread)
-        behavior_thread.start()
+        for behavior_thread in behavior_threads:
+            behavior_thread.daemon = True
+            self.threads.append(behavior_thread)
+            behavior_thread.start()
 
         print(f"User behavior simulation started at {datetime.now().strftime('%H:%M:%S')}. Press Ctrl+C to stop.")
 
@@ -2099,6 +6216,25 @@ class UserBehaviorSimulator:
         self.is_running = False
         print("Stopping user behavior simulation...")
 
+        if self.background_pool is not None:
+            self.background_pool.shutdown(wait=False)
+
+        self.close_smtp_sessions()
+        self.close_imap_sessions()
+        self.close_ssh_clients()
+
+        if self.config.get('checkpoint', {}).get('enabled', False):
+            self.checkpoint_state()
+
+        if self.profiler is not None:
+            self.stop_cpu_profile()
+        if self.task_timings is not None:
+            self.stop_task_timing()
+        if self.control_server is not None:
+            self.control_server.shutdown()
+        if self.dashboard_server is not None:
+            self.dashboard_server.shutdown()
+
         for thread in self.threads:
             if thread.is_alive():
                 thread.join(timeout=1)
\ No newline at end of file